@@ -253,6 +253,129 @@ CORS_ALLOW_HEADERS = [
 
 MAPMYINDIA_API_KEY = os.getenv('MAPMYINDIA_API_KEY')
 
+# Outbound HTTP (complaints.http_client): timeouts in seconds, retries for
+# idempotent calls, and keep-alive pool sizes (hosts, connections per host).
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+
+# Keyset pagination for complaint listings (?cursor=...&page_size=...)
+COMPLAINT_PAGE_SIZE = int(os.getenv('COMPLAINT_PAGE_SIZE', '20'))
+COMPLAINT_MAX_PAGE_SIZE = int(os.getenv('COMPLAINT_MAX_PAGE_SIZE', '100'))
+
+# Complaint search ranking: one unit of log-relevance is worth this much recency
+SEARCH_RECENCY_SECONDS = int(os.getenv('SEARCH_RECENCY_SECONDS', str(7 * 24 * 3600)))
+
+# Trending feed: an upvote loses half its weight every this many hours
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+
+# Seconds a cached complaint list/detail response may live; writes invalidate
+# it earlier through version counters. 0 disables the response cache.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Offline reverse geocoding (built with `manage.py build_gazetteer`). GPS
+# points further than GAZETTEER_MAX_DISTANCE_KM from every gazetteer place,
+# or all points when no gazetteer is built, go to MapmyIndia unless the
+# fallback is turned off.
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', str(BASE_DIR / 'data' / 'gazetteer'))
+GAZETTEER_MAX_DISTANCE_KM = float(os.getenv('GAZETTEER_MAX_DISTANCE_KM', '20'))
+GEOCODE_MAPMYINDIA_FALLBACK = os.getenv('GEOCODE_MAPMYINDIA_FALLBACK', 'True').lower() == 'true'
+
+# GPS complaints the gazetteer cannot place are geocoded in the background
+# (`manage.py geocode_complaints --loop`); give up after this many tries.
+# Where no such worker runs (Railway starts only gunicorn) leave
+# ADDRESS_ENRICHMENT_INLINE on, and the web process geocodes each new pending
+# complaint on a background thread after it is committed.
+ADDRESS_ENRICHMENT_MAX_ATTEMPTS = int(os.getenv('ADDRESS_ENRICHMENT_MAX_ATTEMPTS', '8'))
+ADDRESS_ENRICHMENT_INLINE = os.getenv('ADDRESS_ENRICHMENT_INLINE', 'True').lower() == 'true'
+
+# Reverse geocoding cache: results are keyed by geohash cell of this many
+# characters (8 is about 38m x 19m). An in-process LRU of GEOCODE_LRU_SIZE
+# entries sits in front of the default cache. Timeouts are in seconds; a
+# GEOCODE_CACHE_TIMEOUT of 0 disables caching.
+GEOCODE_CACHE_PRECISION = int(os.getenv('GEOCODE_CACHE_PRECISION', '8'))
+GEOCODE_CACHE_TIMEOUT = int(os.getenv('GEOCODE_CACHE_TIMEOUT', str(30 * 24 * 3600)))
+GEOCODE_CACHE_NOT_FOUND_TIMEOUT = int(os.getenv('GEOCODE_CACHE_NOT_FOUND_TIMEOUT', '3600'))
+GEOCODE_LRU_SIZE = int(os.getenv('GEOCODE_LRU_SIZE', '4096'))
+GEOCODE_LRU_TIMEOUT = int(os.getenv('GEOCODE_LRU_TIMEOUT', '3600'))
+
+# Weather forecasts for the prediction pipeline are cached per pincode (or
+# grid cell of WEATHER_COORDINATE_PRECISION decimals) for this many seconds;
+# 0 disables the cache. `manage.py prefetch_weather --loop` refreshes them
+# for pincodes with open complaints using WEATHER_PREFETCH_WORKERS threads.
+WEATHER_CACHE_TIMEOUT = int(os.getenv('WEATHER_CACHE_TIMEOUT', str(3 * 3600)))
+WEATHER_COORDINATE_PRECISION = int(os.getenv('WEATHER_COORDINATE_PRECISION', '1'))
+WEATHER_PREFETCH_WORKERS = int(os.getenv('WEATHER_PREFETCH_WORKERS', '4'))
+
+# ML prediction pipeline time limits in seconds. YOLO and weather are optional
+# and dropped when late; severity and time prediction fail the request. The
+# budget bounds the whole run and stays under gunicorn's 120s timeout.
+PREDICTION_YOLO_TIMEOUT = float(os.getenv('PREDICTION_YOLO_TIMEOUT', '20'))
+PREDICTION_WEATHER_TIMEOUT = float(os.getenv('PREDICTION_WEATHER_TIMEOUT', '8'))
+PREDICTION_SEVERITY_TIMEOUT = float(os.getenv('PREDICTION_SEVERITY_TIMEOUT', '60'))
+PREDICTION_TIME_TIMEOUT = float(os.getenv('PREDICTION_TIME_TIMEOUT', '45'))
+PREDICTION_PIPELINE_BUDGET = float(os.getenv('PREDICTION_PIPELINE_BUDGET', '100'))
+# Stored predictions are reused while this matches; by default it is derived
+# from GROQ_MODEL and the file name of the YOLO model in use.
+PREDICTION_MODEL_VERSION = os.getenv('PREDICTION_MODEL_VERSION', '')
+# A prediction made while YOLO or weather failed or timed out is only reused
+# for PREDICTION_PARTIAL_TTL seconds, then run again.
+PREDICTION_PARTIAL_TTL = float(os.getenv('PREDICTION_PARTIAL_TTL', '600'))
+# Concurrent predictions of one complaint run once: the others wait up to
+# PREDICTION_WAIT_TIMEOUT seconds for the result. The lease outlives the
+# pipeline budget and frees the complaint if a worker dies mid-run.
+PREDICTION_LEASE_TIMEOUT = float(os.getenv('PREDICTION_LEASE_TIMEOUT', '130'))
+PREDICTION_WAIT_TIMEOUT = float(os.getenv('PREDICTION_WAIT_TIMEOUT', '100'))
+
+# With ML_PRELOAD the WSGI module imports the ML modules at startup; gunicorn
+# (gunicorn.conf.py) turns it on by default and preloads the app in the master
+# so workers share them. Otherwise they are imported by the first request that
+# needs them.
+ML_PRELOAD = os.getenv('ML_PRELOAD', 'False').lower() == 'true'
+
+# The road damage model is loaded from YOLO_MODEL_PATH, or from the ONNX or
+# OpenVINO export next to it (`manage.py export_yolo`) when YOLO_BACKEND is
+# auto; OpenVINO needs `pip install openvino`. With YOLO_WARMUP the ML worker
+# loads it and runs one inference at startup instead of on the first road
+# complaint; web workers only ping the model server, if there is one, and load
+# the model themselves at startup only with YOLO_WARMUP_WEB.
+YOLO_WARMUP = os.getenv('YOLO_WARMUP', 'True').lower() == 'true'
+YOLO_WARMUP_WEB = os.getenv('YOLO_WARMUP_WEB', 'False').lower() == 'true'
+
+# With MODEL_SERVER_SOCKET set, web and ML workers send road images to
+# `manage.py serve_models` on that UNIX socket instead of loading YOLO
+# themselves. The server batches images arriving within MODEL_SERVER_MAX_WAIT_MS
+# of each other, up to MODEL_SERVER_MAX_BATCH. Clients give up after
+# MODEL_SERVER_TIMEOUT seconds and skip YOLO, or run it in-process with
+# MODEL_SERVER_LOCAL_FALLBACK.
+MODEL_SERVER_SOCKET = os.getenv('MODEL_SERVER_SOCKET', '')
+MODEL_SERVER_TIMEOUT = float(os.getenv('MODEL_SERVER_TIMEOUT', '15'))
+MODEL_SERVER_MAX_BATCH = int(os.getenv('MODEL_SERVER_MAX_BATCH', '8'))
+MODEL_SERVER_MAX_WAIT_MS = float(os.getenv('MODEL_SERVER_MAX_WAIT_MS', '10'))
+MODEL_SERVER_LOCAL_FALLBACK = os.getenv('MODEL_SERVER_LOCAL_FALLBACK', 'False').lower() == 'true'
+
+# Groq responses of the ML chains are cached by a hash of model, temperature,
+# prompt and image for LLM_CACHE_TIMEOUT seconds (0 disables the cache) in the
+# LLM_CACHE_ALIAS cache, falling back to files in LLM_CACHE_DIR when it is down.
+# LLM_CACHE_BYPASS skips cache reads, e.g. while evaluating a prompt change.
+LLM_CACHE_TIMEOUT = int(os.getenv('LLM_CACHE_TIMEOUT', str(7 * 24 * 3600)))
+LLM_CACHE_ALIAS = os.getenv('LLM_CACHE_ALIAS', 'default')
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', str(BASE_DIR / 'data' / 'llm_cache'))
+LLM_CACHE_BYPASS = os.getenv('LLM_CACHE_BYPASS', 'False').lower() == 'true'
+
+# Predictions and department suggestions posted with `Prefer: respond-async`
+# (or all of them, with ML_JOBS_ASYNC_BY_DEFAULT) are queued for
+# `manage.py run_ml_jobs --loop`; a job whose worker dies is retried up to
+# ML_JOB_MAX_ATTEMPTS times.
+ML_JOBS_ASYNC_BY_DEFAULT = os.getenv('ML_JOBS_ASYNC_BY_DEFAULT', 'False').lower() == 'true'
+ML_JOB_MAX_ATTEMPTS = int(os.getenv('ML_JOB_MAX_ATTEMPTS', '3'))
+
+# Buffer upvote toggles in Redis and write them to the database in batches
+# (run `manage.py flush_upvotes --loop` alongside the web workers).
+UPVOTE_BUFFERING = os.getenv('UPVOTE_BUFFERING', 'False').lower() == 'true'
+
 try:
     cloudinary.config(
         cloud_name=CLOUDINARY_STORAGE['CLOUD_NAME'],
@@ -33,3 +33,14 @@ CACHES = {
     }
     
 }
+
+# Tests read back their own writes immediately and mock external APIs per
+# test; the ones covering the response, geocode, weather and LLM caches turn
+# them on.
+RESPONSE_CACHE_TIMEOUT = 0
+GEOCODE_CACHE_TIMEOUT = 0
+WEATHER_CACHE_TIMEOUT = 0
+LLM_CACHE_TIMEOUT = 0
+GAZETTEER_PATH = None
+# no background geocoding threads; the enrichment tests turn it on
+ADDRESS_ENRICHMENT_INLINE = False
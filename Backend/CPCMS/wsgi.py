@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CPCMS.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.ML_PRELOAD:
+    # Under gunicorn's preload_app this runs in the master; the model itself
+    # is warmed up in each worker after the fork (gunicorn.conf.py)
+    from complaints.services import ml
+
+    ml.preload()
+elif settings.YOLO_WARMUP:
+    # Check the model server, or with YOLO_WARMUP_WEB load the model here
+    from complaints.ml.road_yolo_detector import warm_up_detector
+
+    warm_up_detector(load_local=settings.YOLO_WARMUP_WEB)
@@ -0,0 +1,132 @@
+"""
+Streaming export of a department's complaints as NDJSON or CSV.
+
+Rows are read with ``values_list().iterator()`` (a server-side cursor on
+PostgreSQL) and encoded a chunk at a time, so memory use does not grow with
+the size of the export.
+"""
+
+import csv
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+EXPORT_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+# (output column, queryset lookup)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('posted_at', 'posted_at'),
+    ('status', 'status'),
+    ('content', 'content'),
+    ('address', 'address'),
+    ('pincode', 'pincode'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('upvotes_count', 'upvotes_count'),
+    ('images_count', 'images_count'),
+    ('fake_confidence', 'fake_confidence'),
+    ('posted_by', 'posted_by__username'),
+    ('assigned_fieldworker', 'assigned_to_fieldworker__username'),
+    ('resolution_deadline', 'resolution_deadline'),
+    ('resolution_approved_at', 'resolution_approved_at'),
+]
+HEADER = [name for name, _ in EXPORT_COLUMNS]
+LOOKUPS = [lookup for _, lookup in EXPORT_COLUMNS] + ['is_anonymous']
+POSTED_BY = HEADER.index('posted_by')
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def _day_start(raw, param):
+    if not raw:
+        return None
+    try:
+        day = parse_date(raw)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ExportFilterError(f"'{param}' must be a date in YYYY-MM-DD format.")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_export_queryset(queryset, params):
+    """Apply the status, pincode and from/to (inclusive dates) filters."""
+    statuses = [s.strip() for s in params.get('status', '').split(',') if s.strip()]
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+
+    pincode = params.get('pincode')
+    if pincode:
+        queryset = queryset.filter(pincode=pincode)
+
+    start = _day_start(params.get('from'), 'from')
+    end = _day_start(params.get('to'), 'to')
+    if start and end and start > end:
+        raise ExportFilterError("'from' must not be after 'to'.")
+    if start:
+        queryset = queryset.filter(posted_at__gte=start)
+    if end:
+        queryset = queryset.filter(posted_at__lt=end + timedelta(days=1))
+    return queryset
+
+
+def export_rows(queryset):
+    """Yield one list of column values per complaint, poster hidden if anonymous."""
+    rows = queryset.order_by('id').values_list(*LOOKUPS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        row = list(row)
+        if row.pop():
+            row[POSTED_BY] = None
+        yield row
+
+
+class _LineBuffer:
+    """File-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_ndjson(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    return _chunked(encoder.encode(dict(zip(HEADER, row))) + '\n' for row in rows)
+
+
+def stream_csv(rows):
+    writer = csv.writer(_LineBuffer())
+
+    def lines():
+        yield writer.writerow(HEADER)
+        for row in rows:
+            yield writer.writerow(['' if value is None else value for value in row])
+
+    return _chunked(lines())
+
+
+STREAMERS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+}
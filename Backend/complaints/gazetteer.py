@@ -0,0 +1,308 @@
+"""
+Offline reverse geocoding from a pincode/locality gazetteer.
+
+``manage.py build_gazetteer`` turns a CSV of post office (or locality)
+centroids, e.g. the India Post pincode directory, into a few ``.npy`` files
+under ``GAZETTEER_PATH``. Points are stored as unit vectors (so straight-line
+nearest is also great-circle nearest) and ordered as an implicit KD-tree: the
+node covering ``[lo, hi)`` splits at ``mid = (lo + hi) // 2`` on axis
+``axes[mid]``, everything left of ``mid`` being <= ``splits[mid]`` on that
+axis and everything from ``mid`` on >= it. Ranges of ``LEAF_SIZE`` points or
+fewer are scanned directly.
+
+The arrays are memory-mapped, so every worker shares one copy through the
+page cache and start-up does not read the whole file. A lookup visits a few
+dozen nodes and takes tens of microseconds.
+
+The gazetteer is loaded on first use; a process started before it was built
+has to be restarted to pick it up.
+"""
+
+import csv
+import json
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+LEAF_SIZE = 16
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_MAX_DISTANCE_KM = 20.0
+
+POINTS_FILE = 'points.npy'
+AXES_FILE = 'axes.npy'
+SPLITS_FILE = 'splits.npy'
+PINCODES_FILE = 'pincodes.npy'
+PLACES_FILE = 'places.npy'
+PLACE_NAMES_FILE = 'places.json'
+
+# CSV header aliases; the defaults match the India Post pincode directory
+COLUMNS = {
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'lng', 'lon'),
+    'pincode': ('pincode',),
+    'locality': ('officename', 'locality', 'name'),
+    'district': ('district', 'districtname'),
+    'state': ('statename', 'state'),
+}
+PINCODE_PATTERN = re.compile(r'^[1-9][0-9]{5}$')
+OFFICE_SUFFIX = re.compile(r'\s+(B\.?O|S\.?O|H\.?O|G\.?P\.?O)\.?$', re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Place:
+    pincode: str
+    locality: str
+    district: str
+    state: str
+    distance_km: float
+
+    def as_address(self) -> Dict[str, str]:
+        """Same shape as ``Complaint.reverse_geocode_mapmyindia`` returns."""
+        parts = [part for part in (self.locality, self.district, self.state) if part]
+        return {
+            'address': f"{', '.join(parts)} {self.pincode}".strip(),
+            'pincode': self.pincode,
+            'city': self.locality,
+            'state': self.state,
+            'district': self.district,
+        }
+
+
+def _unit_vectors(latitudes, longitudes) -> np.ndarray:
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def _chord_to_km(squared_chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+class Gazetteer:
+    def __init__(self, points, axes, splits, pincodes, places, place_names):
+        self.points = points
+        self.axes = axes
+        self.splits = splits
+        self.pincodes = pincodes
+        self.places = places
+        self.place_names = place_names
+
+    @classmethod
+    def load(cls, directory) -> 'Gazetteer':
+        directory = Path(directory)
+        with open(directory / PLACE_NAMES_FILE, encoding='utf-8') as fh:
+            place_names = json.load(fh)
+        # plain ndarray views of the maps skip np.memmap's per-index overhead
+        arrays = [
+            np.load(directory / name, mmap_mode='r').view(np.ndarray)
+            for name in (POINTS_FILE, AXES_FILE, SPLITS_FILE, PINCODES_FILE, PLACES_FILE)
+        ]
+        return cls(*arrays, place_names)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _nearest_index(self, query: Tuple[float, float, float]) -> Tuple[int, float]:
+        points, axes, splits = self.points, self.axes, self.splits
+        qx, qy, qz = query
+        best, best_d = -1, math.inf
+        stack = [(0, len(points), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if bound >= best_d:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                block = points[lo:hi]
+                d = (block[:, 0] - qx) ** 2 + (block[:, 1] - qy) ** 2 + (block[:, 2] - qz) ** 2
+                i = int(d.argmin())
+                if d[i] < best_d:
+                    best, best_d = lo + i, float(d[i])
+                continue
+            mid = (lo + hi) // 2
+            axis = axes[mid]
+            diff = query[axis] - float(splits[mid])
+            if diff < 0:
+                near, far = (lo, mid), (mid, hi)
+            else:
+                near, far = (mid, hi), (lo, mid)
+            stack.append((far[0], far[1], max(bound, diff * diff)))
+            stack.append((near[0], near[1], bound))
+        return best, best_d
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[Place]:
+        if not len(self.points):
+            return None
+        lat, lng = math.radians(latitude), math.radians(longitude)
+        query = (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+        index, squared_chord = self._nearest_index(query)
+        locality, district, state = self.place_names[int(self.places[index])]
+        return Place(
+            pincode=f"{int(self.pincodes[index]):06d}",
+            locality=locality,
+            district=district,
+            state=state,
+            distance_km=_chord_to_km(squared_chord),
+        )
+
+
+def _kd_order(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Permutation that lays ``points`` out as the implicit KD-tree, with split axes and values."""
+    order = np.arange(len(points))
+    axes = np.zeros(len(points), dtype=np.int8)
+    # points[mid] itself moves when the right child is partitioned, so the
+    # split value is kept separately
+    splits = np.zeros(len(points), dtype=points.dtype)
+    stack = [(0, len(points))]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo <= LEAF_SIZE:
+            continue
+        segment = order[lo:hi]
+        coords = points[segment]
+        axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+        mid = (lo + hi) // 2
+        partition = np.argpartition(coords[:, axis], mid - lo)
+        order[lo:hi] = segment[partition]
+        axes[mid] = axis
+        splits[mid] = coords[partition[mid - lo], axis]
+        stack.append((lo, mid))
+        stack.append((mid, hi))
+    return order, axes, splits
+
+
+def _save(directory: Path, name: str, array: np.ndarray):
+    tmp = directory / f".{name}.tmp"
+    with open(tmp, 'wb') as fh:
+        np.save(fh, array)
+    os.replace(tmp, directory / name)
+
+
+def read_csv(stream) -> Iterable[Tuple[float, float, str, str, str, str]]:
+    """
+    Yield ``(latitude, longitude, pincode, locality, district, state)`` rows,
+    skipping ones without a valid pincode or coordinates (the India Post
+    file has ``NA`` for many).
+    """
+    reader = csv.DictReader(stream)
+    header = {name.strip().lower(): name for name in reader.fieldnames or []}
+    columns = {}
+    for column, aliases in COLUMNS.items():
+        found = next((header[alias] for alias in aliases if alias in header), None)
+        if found is None:
+            raise ValueError(f"CSV has no {column} column (expected one of: {', '.join(aliases)})")
+        columns[column] = found
+
+    for row in reader:
+        pincode = (row[columns['pincode']] or '').strip()
+        try:
+            latitude = float(row[columns['latitude']])
+            longitude = float(row[columns['longitude']])
+        except (TypeError, ValueError):
+            continue
+        if not PINCODE_PATTERN.match(pincode) or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            continue
+        locality = OFFICE_SUFFIX.sub('', (row[columns['locality']] or '').strip())
+        district = (row[columns['district']] or '').strip().title()
+        state = (row[columns['state']] or '').strip().title()
+        yield latitude, longitude, pincode, locality, district, state
+
+
+def build(rows: Iterable[Tuple[float, float, str, str, str, str]], directory) -> int:
+    """
+    Write a gazetteer from ``(latitude, longitude, pincode, locality,
+    district, state)`` rows. Returns the number of points stored.
+    """
+    latitudes: List[float] = []
+    longitudes: List[float] = []
+    pincodes: List[int] = []
+    places: List[int] = []
+    place_ids: Dict[Tuple[str, str, str], int] = {}
+    seen = set()
+    for latitude, longitude, pincode, locality, district, state in rows:
+        key = (round(latitude, 5), round(longitude, 5), pincode)
+        if key in seen:
+            continue
+        seen.add(key)
+        name = (locality, district, state)
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        pincodes.append(int(pincode))
+        places.append(place_ids.setdefault(name, len(place_ids)))
+
+    points = _unit_vectors(latitudes, longitudes).astype(np.float32).reshape(-1, 3)
+    order, axes, splits = _kd_order(points)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    _save(directory, POINTS_FILE, points[order])
+    _save(directory, AXES_FILE, axes)
+    _save(directory, SPLITS_FILE, splits)
+    _save(directory, PINCODES_FILE, np.asarray(pincodes, dtype=np.int32)[order])
+    _save(directory, PLACES_FILE, np.asarray(places, dtype=np.int32)[order])
+    tmp = directory / f".{PLACE_NAMES_FILE}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump([list(name) for name in place_ids], fh, ensure_ascii=False)
+    os.replace(tmp, directory / PLACE_NAMES_FILE)
+    return len(order)
+
+
+_lock = threading.Lock()
+_loaded = False
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """The process-wide gazetteer, or None if it has not been built."""
+    global _loaded, _gazetteer
+    if _loaded:
+        return _gazetteer
+    with _lock:
+        if not _loaded:
+            directory = getattr(settings, 'GAZETTEER_PATH', None)
+            try:
+                _gazetteer = Gazetteer.load(directory) if directory else None
+            except (OSError, ValueError) as exc:
+                logger.info("Offline gazetteer not available at %s: %s", directory, exc)
+                _gazetteer = None
+            _loaded = True
+    return _gazetteer
+
+
+def reset():
+    global _loaded, _gazetteer
+    with _lock:
+        _loaded, _gazetteer = False, None
+
+
+def lookup(latitude, longitude) -> Optional[Place]:
+    """
+    Nearest gazetteer place within ``GAZETTEER_MAX_DISTANCE_KM``, or None
+    when there is no gazetteer, the input is not a coordinate, or nothing is
+    close enough (e.g. at sea or outside India).
+    """
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    place = gazetteer.nearest(latitude, longitude)
+    max_distance = float(getattr(settings, 'GAZETTEER_MAX_DISTANCE_KM', DEFAULT_MAX_DISTANCE_KM))
+    if place is None or place.distance_km > max_distance:
+        return None
+    return place
@@ -0,0 +1,150 @@
+"""
+Geohash helpers for proximity and viewport queries on complaints.
+
+Complaint.geohash holds a GEOHASH_PRECISION character cell id. A query first
+covers the search area with a handful of coarser cells and prunes rows by
+prefix on the indexed column, then applies the exact latitude/longitude and
+haversine checks to the few rows that survive.
+"""
+
+import math
+from typing import Iterable, List, Optional, Set, Tuple
+
+from django.db.models import Q
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9          # ~4.8m x 4.8m cells
+MAX_COVER_CELLS = 16
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Return ``(lat_degrees, lng_degrees)`` spanned by one cell."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def _frange(lo: float, hi: float, step: float) -> Iterable[float]:
+    value = lo
+    while value < hi:
+        yield value
+        value += step
+    yield hi
+
+
+def covering_cells(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                   max_cells: int = MAX_COVER_CELLS) -> Set[str]:
+    """
+    Return the geohash cells, at the finest precision that needs at most
+    ``max_cells`` of them, that together cover the bounding box.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        rows = math.floor((max_lat - min_lat) / lat_step) + 2
+        cols = math.floor((max_lng - min_lng) / lng_step) + 2
+        if rows * cols > max_cells and precision > 1:
+            continue
+        return {
+            encode(lat, lng, precision)
+            for lat in _frange(min_lat, max_lat, lat_step)
+            for lng in _frange(min_lng, max_lng, lng_step)
+        }
+    return set(BASE32)
+
+
+def prefix_filter(cells: Iterable[str]) -> Q:
+    query = Q()
+    for cell in sorted(cells):
+        query |= Q(geohash__startswith=cell)
+    return query
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bounds(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Bounding box ``(min_lat, min_lng, max_lat, max_lng)`` around a circle."""
+    angular = radius_km / EARTH_RADIUS_KM
+    d_lat = math.degrees(angular)
+    ratio = math.sin(angular) / max(math.cos(math.radians(latitude)), 1e-12)
+    # the circle's widest longitude span, or the whole parallel near a pole
+    d_lng = 180.0 if ratio >= 1 else math.degrees(math.asin(ratio))
+    return (
+        max(-90.0, latitude - d_lat),
+        max(-180.0, longitude - d_lng),
+        min(90.0, latitude + d_lat),
+        min(180.0, longitude + d_lng),
+    )
+
+
+def parse_coordinate(raw, lower: float, upper: float) -> Optional[float]:
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value) or not lower <= value <= upper:
+        return None
+    return value
+
+
+def within_bounds_filter(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> Q:
+    """Prefix pruning on the geohash index plus the exact box test."""
+    return prefix_filter(covering_cells(min_lat, min_lng, max_lat, max_lng)) & Q(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    )
+
+
+def sort_by_distance(complaints, latitude: float, longitude: float, radius_km: float) -> List:
+    """Keep complaints within ``radius_km`` and set ``distance_km`` on each, nearest first."""
+    nearby = []
+    for complaint in complaints:
+        distance = haversine_km(latitude, longitude, float(complaint.latitude), float(complaint.longitude))
+        if distance <= radius_km:
+            complaint.distance_km = round(distance, 3)
+            nearby.append(complaint)
+    nearby.sort(key=lambda c: (c.distance_km, c.id))
+    return nearby
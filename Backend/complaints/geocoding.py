@@ -0,0 +1,199 @@
+"""
+MapmyIndia reverse geocoding behind a two-tier cache.
+
+Lookups are keyed by the geohash cell of the coordinates
+(``GEOCODE_CACHE_PRECISION`` characters, 8 by default: roughly 38m x 19m),
+so points on the same street corner share one entry. A small in-process LRU
+answers repeats without a network hop; behind it the default cache (Redis in
+production) shares results between workers and survives restarts.
+
+"No address here" answers are cached for a shorter time; HTTP and network
+errors are never cached.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from complaints import geo, http_client
+
+
+logger = logging.getLogger(__name__)
+
+REVERSE_GEOCODE_URL = "https://search.mappls.com/search/address/rev-geocode"
+
+DEFAULT_PRECISION = 8
+DEFAULT_TIMEOUT = 30 * 24 * 3600
+DEFAULT_NOT_FOUND_TIMEOUT = 3600
+DEFAULT_LRU_SIZE = 4096
+DEFAULT_LRU_TIMEOUT = 3600
+
+_MISSING = object()
+
+
+class GeocodeError(Exception):
+    """The geocoding API answered with an HTTP error."""
+
+
+def _setting(name: str, default):
+    return type(default)(getattr(settings, name, default))
+
+
+def mapmyindia_fallback_enabled() -> bool:
+    """Whether to call MapmyIndia when the offline gazetteer has no answer."""
+    return bool(getattr(settings, 'GEOCODE_MAPMYINDIA_FALLBACK', True))
+
+
+def cache_key(latitude, longitude) -> str:
+    cell = geo.encode(float(latitude), float(longitude), _setting('GEOCODE_CACHE_PRECISION', DEFAULT_PRECISION))
+    return f"geocode:v1:{cell}"
+
+
+class LocalCache:
+    """Thread-safe LRU with a per-entry expiry."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout: float):
+        max_size = _setting('GEOCODE_LRU_SIZE', DEFAULT_LRU_SIZE)
+        if max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalCache()
+
+_stats_lock = threading.Lock()
+_stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'errors': 0}
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats() -> Dict[str, float]:
+    """Hit/miss counters of this process since start (or ``reset()``)."""
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters['local_hits'] + counters['shared_hits'] + counters['misses']
+    hits = counters['local_hits'] + counters['shared_hits']
+    counters['lookups'] = lookups
+    counters['hit_ratio'] = hits / lookups if lookups else 0.0
+    counters['local_entries'] = len(local_cache)
+    return counters
+
+
+def reset():
+    local_cache.clear()
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def fetch(latitude, longitude, api_key: str, retries: Optional[int] = None) -> Dict:
+    """
+    Call the rev-geocode API. Returns ``{'responseCode': ..., 'result': ...}``
+    where ``result`` is the first match or None. Raises ``GeocodeError`` on an
+    HTTP error and lets ``requests`` exceptions propagate (after the shared
+    client's retries, or ``retries`` of them).
+    """
+    params = {
+        'lat': float(latitude),
+        'lng': float(longitude),
+        'access_token': api_key,
+        'region': 'IND'
+    }
+    response = http_client.get(REVERSE_GEOCODE_URL, params=params, retries=retries)
+    if response.status_code != 200:
+        raise GeocodeError(f"MapmyIndia API HTTP error: {response.status_code}")
+
+    data = response.json()
+    results = data.get('results') if data.get('responseCode') == 200 else None
+    return {
+        'responseCode': data.get('responseCode'),
+        'result': results[0] if results else None,
+    }
+
+
+def _shared_get(key):
+    try:
+        return caches['default'].get(key, _MISSING)
+    except Exception as exc:
+        logger.warning("Geocode cache read failed: %s", exc)
+        return _MISSING
+
+
+def _shared_set(key, value, timeout: int):
+    try:
+        caches['default'].set(key, value, timeout=timeout)
+    except Exception as exc:
+        logger.warning("Geocode cache write failed: %s", exc)
+
+
+def reverse_geocode(latitude, longitude, api_key: str, retries: Optional[int] = None) -> Dict:
+    """
+    ``fetch`` through the in-process LRU and the shared cache. Request
+    handlers pass ``retries=0``; retrying is for the background workers.
+    """
+    timeout = _setting('GEOCODE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    if timeout <= 0:
+        return fetch(latitude, longitude, api_key, retries=retries)
+
+    key = cache_key(latitude, longitude)
+    local_timeout = _setting('GEOCODE_LRU_TIMEOUT', DEFAULT_LRU_TIMEOUT)
+
+    payload = local_cache.get(key)
+    if payload is not _MISSING:
+        _count('local_hits')
+        return payload
+
+    payload = _shared_get(key)
+    if payload is not _MISSING:
+        _count('shared_hits')
+        local_cache.set(key, payload, min(timeout, local_timeout))
+        return payload
+
+    _count('misses')
+    try:
+        payload = fetch(latitude, longitude, api_key, retries=retries)
+    except Exception:
+        _count('errors')
+        raise
+
+    if payload['result'] is None:
+        timeout = min(timeout, _setting('GEOCODE_CACHE_NOT_FOUND_TIMEOUT', DEFAULT_NOT_FOUND_TIMEOUT))
+    _shared_set(key, payload, timeout)
+    local_cache.set(key, payload, min(timeout, local_timeout))
+    logger.debug("Geocode cache miss for %s", key)
+    return payload
@@ -0,0 +1,189 @@
+"""
+Shared outbound HTTP client for third-party integrations.
+
+All calls go through one ``requests.Session`` per process, whose adapter keeps
+a pool of keep-alive connections per host, so repeat calls to MapmyIndia,
+weatherapi.com or Cloudinary skip DNS, TCP and TLS setup. Connect and read
+timeouts come from settings unless a call passes its own ``timeout``.
+
+Idempotent requests are retried on connection errors, timeouts and
+429/502/503/504 answers with jittered exponential backoff. Each attempt is
+recorded in per-host counters and a window of recent latencies; see
+``stats()``.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_RETRIES = 2
+DEFAULT_POOL_HOSTS = 10
+DEFAULT_POOL_SIZE = 10
+BACKOFF_BASE = 0.2
+BACKOFF_MAX = 2.0
+LATENCY_WINDOW = 256
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+def _setting(name: str, default):
+    return type(default)(getattr(settings, name, default))
+
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=_setting('HTTP_POOL_HOSTS', DEFAULT_POOL_HOSTS),
+                    pool_maxsize=_setting('HTTP_POOL_SIZE', DEFAULT_POOL_SIZE),
+                    max_retries=0,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed_ms: float, failed: bool):
+        self.requests += 1
+        self.errors += int(failed)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent.append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'avg_ms': self.total_ms / self.requests if self.requests else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': self.max_ms,
+        }
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, HostStats] = {}
+
+
+def _host_stats(host: str) -> HostStats:
+    stats = _stats.get(host)
+    if stats is None:
+        stats = _stats.setdefault(host, HostStats())
+    return stats
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Per-host request counts and latencies of this process."""
+    with _stats_lock:
+        return {host: host_stats.snapshot() for host, host_stats in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def backoff(attempt: int) -> float:
+    """Seconds to wait before retry ``attempt`` (1-based), with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def request(method: str, url: str, *, retries: Optional[int] = None, **kwargs) -> requests.Response:
+    """
+    ``requests.request`` through the shared session. Non-idempotent methods
+    are never retried. After the last retry the final response is returned
+    (callers check its status as before) or the final exception is raised.
+    """
+    method = method.upper()
+    kwargs.setdefault('timeout', (
+        _setting('HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        _setting('HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT),
+    ))
+    if retries is None:
+        retries = _setting('HTTP_RETRIES', DEFAULT_RETRIES)
+    if method not in IDEMPOTENT_METHODS:
+        retries = 0
+
+    host = urlsplit(url).netloc
+    session = get_session()
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except RETRY_EXCEPTIONS as exc:
+            response, error = None, exc
+        except Exception:
+            _record(host, started, failed=True)
+            raise
+        else:
+            error = None
+
+        retryable = error is not None or response.status_code in RETRY_STATUSES
+        _record(host, started, failed=error is not None or response.status_code >= 500)
+        if not retryable or attempt >= retries:
+            if error is not None:
+                raise error
+            return response
+
+        if response is not None:
+            response.close()  # hand the connection back to the pool
+        attempt += 1
+        with _stats_lock:
+            _host_stats(host).retries += 1
+        delay = backoff(attempt)
+        logger.info("Retrying %s %s in %.2fs (attempt %d): %s", method, host, delay, attempt,
+                    error or response.status_code)
+        time.sleep(delay)
+
+
+def _record(host: str, started: float, failed: bool):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _stats_lock:
+        _host_stats(host).record(elapsed_ms, failed)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
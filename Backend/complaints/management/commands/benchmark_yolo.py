@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.ml import yolo_backends
+
+
+class Command(BaseCommand):
+    help = "Measure load time, p50/p95 latency and memory of each YOLO backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', nargs='+', choices=yolo_backends.BACKENDS,
+                            help="Backends to compare (default: every exported one).")
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--batch', type=int, default=1, help="Images per inference.")
+        parser.add_argument('--image', help="Photo to run on instead of a blank frame.")
+        parser.add_argument('--json', action='store_true', help="Print one JSON object per backend.")
+
+    def handle(self, *args, **options):
+        backends = options['backend'] or [
+            backend for backend in yolo_backends.BACKENDS
+            if yolo_backends.resolve(backend) is not None
+        ]
+        if not backends:
+            raise CommandError(f"No YOLO model found for {yolo_backends.weights_path()}")
+
+        if len(backends) == 1:
+            results = [self._run(backends[0], options)]
+        else:
+            # one process per backend, so memory and caches do not carry over
+            results = [self._run_isolated(backend, options) for backend in backends]
+
+        for result in results:
+            if options['json']:
+                self.stdout.write(json.dumps(result))
+            else:
+                self.stdout.write(
+                    f"{result['backend']:<9} load {result['load_ms']:>8.1f}ms  "
+                    f"p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+                    f"rss {result['rss_mb']:>7.1f}MiB (model {result['model_rss_mb']:.1f}MiB)"
+                )
+
+    def _run(self, backend, options):
+        image = None
+        if options['image']:
+            with open(options['image'], 'rb') as f:
+                image = f.read()
+        try:
+            result = yolo_backends.benchmark(backend, runs=options['runs'], batch=options['batch'], image=image)
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+        return result.as_dict()
+
+    def _run_isolated(self, backend, options):
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_yolo', '--json',
+            '--backend', backend, '--runs', str(options['runs']), '--batch', str(options['batch']),
+        ]
+        if options['image']:
+            command += ['--image', options['image']]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f"{backend} benchmark failed: {completed.stderr.strip()}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import gazetteer
+
+
+class Command(BaseCommand):
+    help = "Build the offline reverse-geocoding gazetteer from a pincode/locality CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with pincode, latitude, longitude, officename, district and statename columns.")
+        parser.add_argument('--output', help="Directory to write to; defaults to GAZETTEER_PATH.")
+
+    def handle(self, *args, **options):
+        output = options['output'] or settings.GAZETTEER_PATH
+        if not output:
+            raise CommandError("Pass --output or set GAZETTEER_PATH.")
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                count = gazetteer.build(gazetteer.read_csv(stream), output)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} places to {output}. Restart the web workers to load it."
+        ))
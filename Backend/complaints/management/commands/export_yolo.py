@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.ml import yolo_backends
+
+
+class Command(BaseCommand):
+    help = "Export the road damage YOLO weights to ONNX or OpenVINO for faster CPU inference."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['onnx', 'openvino'], default='onnx')
+        parser.add_argument('--weights', help="PyTorch weights to export (default: YOLO_MODEL_PATH).")
+        parser.add_argument('--imgsz', type=int, default=640)
+        parser.add_argument('--int8', action='store_true', help="Quantize the weights to int8.")
+        parser.add_argument('--data', help="Calibration dataset for OpenVINO int8.")
+
+    def handle(self, *args, **options):
+        try:
+            path = yolo_backends.export(
+                options['format'],
+                weights=options['weights'],
+                imgsz=options['imgsz'],
+                int8=options['int8'],
+                data=options['data'],
+            )
+        except ImportError as exc:
+            raise CommandError(f"Missing exporter dependency: {exc}")
+        self.stdout.write(f"Exported {options['format']} model to {path}")
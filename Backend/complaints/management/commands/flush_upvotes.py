@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import upvote_buffer
+
+
+class Command(BaseCommand):
+    help = "Write buffered upvote toggles from Redis to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep flushing every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                flushed = upvote_buffer.flush()
+                if flushed:
+                    self.stdout.write(f"Flushed upvotes for {flushed} complaints.")
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except upvote_buffer.BufferUnavailable as exc:
+            raise CommandError(str(exc))
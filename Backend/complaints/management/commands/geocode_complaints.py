@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.services.address_enrichment_service import DEFAULT_BATCH_SIZE, enrich_pending
+
+
+class Command(BaseCommand):
+    help = "Fill in addresses of GPS complaints waiting for reverse geocoding."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--limit', type=int, help="Stop after this many complaints.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        while True:
+            stats = enrich_pending(batch_size=options['batch_size'], limit=options['limit'])
+            if stats.claimed or not options['loop']:
+                self.stdout.write(
+                    f"Geocoded {stats.enriched} complaints, {stats.retried} to retry, {stats.failed} given up."
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
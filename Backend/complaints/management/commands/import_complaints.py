@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import response_cache, trending
+from complaints.services.complaint_import_service import (
+    DEFAULT_CHUNK_SIZE, ComplaintImportService, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Bulk import legacy complaints from a CSV or JSONL file ('-' reads stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Input format; inferred from the file extension by default.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate rows without writing them.")
+        parser.add_argument('--max-errors', type=int, default=20, help="How many row errors to print.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if path == '-' and not options['format']:
+            raise CommandError("--format is required when reading from stdin.")
+
+        service = ComplaintImportService(chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+
+        def progress(stats):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{stats.read} rows read, {stats.imported} imported ({stats.rate:,.0f} rows/s)")
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with stream:
+            stats = service.run(read_rows(stream, fmt), progress=progress)
+
+        for line_number, message in stats.errors[:options['max_errors']]:
+            self.stderr.write(f"line {line_number}: {message}")
+        if len(stats.errors) > options['max_errors']:
+            self.stderr.write(f"... and {len(stats.errors) - options['max_errors']} more errors")
+
+        if not options['dry_run'] and stats.imported:
+            # bulk inserts skip the model signals these normally hang off
+            response_cache.bump(department_ids=stats.department_ids)
+            trending.safely('rebuild')
+
+        verb = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats.imported} complaints and {stats.upvotes} upvotes, skipped {stats.skipped} "
+            f"in {stats.elapsed:.1f}s ({stats.rate:,.0f} rows/s)."
+        ))
+        if stats.pending_geocode:
+            self.stdout.write(
+                f"{stats.pending_geocode} complaints have coordinates but no address; "
+                f"run `manage.py geocode_complaints` to fill them in."
+            )
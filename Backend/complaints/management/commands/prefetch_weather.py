@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.services.weather_prefetch_service import prefetch_open_locations
+
+
+class Command(BaseCommand):
+    help = "Refresh cached weather forecasts for every pincode with open complaints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Concurrent weather API requests.")
+        parser.add_argument('--loop', action='store_true', help="Keep refreshing every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=3600.0)
+
+    def handle(self, *args, **options):
+        while True:
+            stats = prefetch_open_locations(workers=options['workers'])
+            self.stdout.write(
+                f"Refreshed weather for {stats.refreshed} of {stats.locations} pincodes, {stats.failed} failed."
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
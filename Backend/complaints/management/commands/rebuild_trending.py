@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.trending import get_trending_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the trending complaints index in Redis (with --loop, every --interval seconds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep rebuilding every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=3600.0)
+
+    def handle(self, *args, **options):
+        index = get_trending_index()
+        if index is None:
+            raise CommandError("The default cache is not Redis; there is no trending index to rebuild.")
+        while True:
+            try:
+                count = index.rebuild()
+            except Exception as exc:
+                if not options['loop']:
+                    raise
+                # Redis or the database is down; the next round retries
+                self.stderr.write(f"Trending index rebuild failed: {exc}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Trending index rebuilt with {count} complaints."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from complaints.upvotes import reconcile_upvote_counts
+
+
+class Command(BaseCommand):
+    help = "Repair Complaint.upvotes_count wherever it has drifted from the Upvote rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        repaired = reconcile_upvote_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Repaired upvote counts on {repaired} complaints."))
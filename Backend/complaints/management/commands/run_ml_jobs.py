@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from complaints.services.ml_job_service import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued ML predictions and department suggestions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help="Stop after this many jobs.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if options['loop'] and settings.YOLO_WARMUP:
+            from complaints.ml.road_yolo_detector import warm_up_detector
+
+            warm_up_detector()
+        while True:
+            stats = run_pending(limit=options['limit'])
+            if stats.claimed or not options['loop']:
+                self.stdout.write(f"Ran {stats.claimed} ML jobs, {stats.succeeded} succeeded, {stats.failed} failed.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
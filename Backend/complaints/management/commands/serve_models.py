@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.ml.model_server import DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS, ModelServer
+from complaints.ml.road_yolo_detector import RoadYOLODetector
+
+
+class Command(BaseCommand):
+    help = "Serve the road damage model to web and ML workers over a UNIX socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', help="Socket path (default: MODEL_SERVER_SOCKET).")
+        parser.add_argument('--max-batch', type=int, help="Most images per YOLO run.")
+        parser.add_argument('--max-wait-ms', type=float, help="How long to wait for more images to batch.")
+
+    def handle(self, *args, **options):
+        path = options['socket'] or settings.MODEL_SERVER_SOCKET
+        if not path:
+            raise CommandError("Set MODEL_SERVER_SOCKET or pass --socket.")
+
+        detector = RoadYOLODetector()
+        detector.warm_up()
+        max_batch = options['max_batch'] or getattr(settings, 'MODEL_SERVER_MAX_BATCH', DEFAULT_MAX_BATCH)
+        max_wait_ms = options['max_wait_ms']
+        if max_wait_ms is None:
+            max_wait_ms = getattr(settings, 'MODEL_SERVER_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS)
+
+        server = ModelServer(path, detector, max_batch=max_batch, max_wait=max_wait_ms / 1000)
+        self.stdout.write(f"Serving {detector.backend or 'no'} YOLO model on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,85 @@
+from django.db import migrations
+
+
+FTS_TABLE = 'complaints_complaint_fts'
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE complaints_complaint ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(content, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(pincode, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(address, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX idx_complaint_search_vector ON complaints_complaint USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS idx_complaint_search_vector",
+    "ALTER TABLE complaints_complaint DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        content, address, pincode,
+        content='complaints_complaint', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON complaints_complaint BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content, address, pincode)
+        VALUES (new.id, new.content, new.address, new.pincode);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON complaints_complaint BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, address, pincode)
+        VALUES ('delete', old.id, old.content, old.address, old.pincode);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF content, address, pincode ON complaints_complaint BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, address, pincode)
+        VALUES ('delete', old.id, old.content, old.address, old.pincode);
+        INSERT INTO {FTS_TABLE}(rowid, content, address, pincode)
+        VALUES (new.id, new.content, new.address, new.pincode);
+    END
+    """,
+    # index complaints that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    statements = statements_by_vendor.get(schema_editor.connection.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0018_remove_complaint_first_name_and_more'),
+    ]
+
+    # The search column/table lives outside the model state; see complaints/search.py.
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:53
+
+from django.db import migrations, models
+
+from complaints.geo import encode
+
+
+def backfill_geohash(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    rows = (Complaint.objects
+            .filter(latitude__isnull=False, longitude__isnull=False)
+            .only('id', 'latitude', 'longitude'))
+    batch = []
+    for complaint in rows.iterator(chunk_size=1000):
+        complaint.geohash = encode(float(complaint.latitude), float(complaint.longitude))
+        batch.append(complaint)
+        if len(batch) >= 1000:
+            Complaint.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Complaint.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0019_complaint_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, help_text='Geohash cell of latitude/longitude, kept in sync on save', max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['geohash'], name='idx_complaint_geohash', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:43
+
+from django.db import migrations, models
+
+
+def queue_missing_addresses(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    (Complaint.objects
+     .filter(latitude__isnull=False, longitude__isnull=False)
+     .filter(models.Q(address__isnull=True) | models.Q(address=''))
+     .update(address_status='pending'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0020_complaint_geohash'),
+    ]
+
+    # The columns are nullable so SQLite can add them without rebuilding the
+    # table (which would drop the full-text search triggers).
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='address_attempts',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='address_retry_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='address_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('enriched', 'Enriched'), ('failed', 'Failed')], editable=False, max_length=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('address_status', 'pending')), fields=['address_retry_at'], name='idx_complaint_address_pending'),
+        ),
+        migrations.RunPython(queue_missing_addresses, migrations.RunPython.noop),
+    ]
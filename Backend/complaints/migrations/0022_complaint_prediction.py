@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0021_complaint_address_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=255)),
+                ('image_fingerprint', models.CharField(max_length=64)),
+                ('input_fingerprint', models.CharField(max_length=64)),
+                ('severity_analysis', models.JSONField(default=dict)),
+                ('time_prediction', models.JSONField(default=dict)),
+                ('metadata', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to='complaints.complaint')),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='complaintprediction',
+            constraint=models.UniqueConstraint(fields=('complaint', 'model_version', 'image_fingerprint', 'input_fingerprint'), name='uniq_complaint_prediction_inputs'),
+        ),
+    ]
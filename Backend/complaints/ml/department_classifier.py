@@ -1,13 +1,12 @@
 import os
 import json
 import logging
-import tempfile
 from typing import Dict, Optional, List
 from pathlib import Path
 
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
-from PIL import Image
+from complaints.ml import image_ingest, llm_cache
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +70,8 @@ class DepartmentImageClassifier:
         self,
         image_file,
         description: str = "",
-        available_departments: Optional[List[str]] = None
+        available_departments: Optional[List[str]] = None,
+        bypass_cache: bool = False
     ) -> Dict:
         
         if self.llm is None:
@@ -84,27 +84,9 @@ class DepartmentImageClassifier:
         # Use provided departments or fall back to common ones
         departments = available_departments or COMMON_DEPARTMENTS
         
-        temp_image_path = None
-        
         try:
-            # Save uploaded file to temporary location
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                if hasattr(image_file, 'seek'):
-                    try:
-                        image_file.seek(0)
-                    except (OSError, AttributeError):
-                        pass
-                
-                if hasattr(image_file, 'chunks'):
-                    for chunk in image_file.chunks():
-                        temp_file.write(chunk)
-                else:
-                    temp_file.write(image_file.read())
-                
-                temp_image_path = temp_file.name
-            
-            # Convert image to base64 data URL for Groq
-            image_url = self._image_to_data_url(temp_image_path)
+            # Decode the upload once, in memory, into a base64 data URL for Groq
+            image_url = self._image_to_data_url(image_ingest.read_upload(image_file))
             
             # Build classification prompt
             prompt = self._build_classification_prompt(description, departments)
@@ -117,11 +99,14 @@ class DepartmentImageClassifier:
                 ]
             )
             
-            response = self.llm.invoke([message])
-            response_text = response.content
-            
-            # Parse the response
-            result = self._parse_classification_response(response_text, departments)
+            # Same normalized image and prompt: reuse the earlier answer
+            result = llm_cache.invoke(
+                self.llm, [message],
+                prompt=prompt,
+                image=image_url,
+                parse=lambda text: self._parse_classification_response(text, departments),
+                bypass=bypass_cache
+            )
             result['success'] = True
             
             return result
@@ -134,50 +119,11 @@ class DepartmentImageClassifier:
                 'department': None,
                 'confidence': 0.35,
             }
-        
-        finally:
-            # Clean up temp file
-            if temp_image_path and os.path.exists(temp_image_path):
-                try:
-                    os.unlink(temp_image_path)
-                except Exception as e:
-                    logger.warning(f"Failed to delete temp file {temp_image_path}: {str(e)}")
     
-    def _image_to_data_url(self, image_path: str) -> str:
-        """Convert image to base64 data URL."""
-        import base64
-        
-        # Open and potentially resize large images
-        img = Image.open(image_path)
-        
-        # Convert RGBA to RGB if necessary (for JPEG compatibility)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create a white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            # Paste image on background (handles transparency)
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Resize if too large (to reduce tokens)
-        max_size = 1024
-        if max(img.size) > max_size:
-            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-        
-        # Save to bytes
-        import io
-        buffer = io.BytesIO()
-        img.save(buffer, format='JPEG', quality=85)
-        img.close()
-        
-        # Encode to base64
-        img_bytes = buffer.getvalue()
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-        
-        return f"data:image/jpeg;base64,{img_base64}"
+    def _image_to_data_url(self, image) -> str:
+        """Convert image bytes (or a path) to a base64 JPEG data URL of at most 1024px."""
+        decoded = image_ingest.decode(image, max_size=image_ingest.LLM_MAX_SIZE)
+        return decoded.data_url(image_ingest.LLM_MAX_SIZE)
     
     def _build_classification_prompt(self, description: str, departments: List[str]) -> str:
         """Build the classification prompt for the LLM."""
@@ -303,9 +249,11 @@ class DepartmentImageClassifier:
                     except Exception:
                         conf = None
 
+                # raw_response marks a fallback, which the LLM cache does not keep
                 return {
                     'department': department or "Other",
                     'confidence': round(min(max(conf or 0.45, 0.0), 1.0), 2),
+                    'raw_response': cleaned_text[:500],
                 }
 
         # If we reach here, `data` is a parsed JSON dict
@@ -318,6 +266,7 @@ class DepartmentImageClassifier:
             return {
                 'department': department or "Other",
                 'confidence': 0.45,
+                'raw_response': cleaned_text[:500],
             }
 
         matched_dept = _normalize_dept(department)
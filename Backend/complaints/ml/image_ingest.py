@@ -0,0 +1,103 @@
+"""
+Decodes complaint images once, in memory, for every ML consumer.
+
+An upload or downloaded photo is decoded a single time into an RGB
+``DecodedImage``; YOLO gets its pixel array, the detectors read its size and
+the vision LLM gets a JPEG data URL encoded from the same pixels. Nothing is
+written to disk.
+
+Phone photos are usually far larger than any model looks at, so JPEGs are
+decoded in draft mode: libjpeg scales them down by 1/2, 1/4 or 1/8 while
+decoding, to the smallest size still at least ``max_size`` on both sides,
+which is much cheaper than decoding at full size and resizing afterwards.
+"""
+
+import base64
+import io
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+
+# YOLOv8 letterboxes its input to 640px
+YOLO_INPUT_SIZE = 640
+# the vision LLM gets at most this many pixels per side
+LLM_MAX_SIZE = 1024
+LLM_JPEG_QUALITY = 85
+
+
+def read_upload(image_file) -> bytes:
+    """All bytes of an uploaded file (Django ``UploadedFile`` or file-like object)."""
+    if hasattr(image_file, 'seek'):
+        try:
+            image_file.seek(0)
+        except (OSError, AttributeError):
+            pass
+    if hasattr(image_file, 'chunks'):
+        return b''.join(image_file.chunks())
+    return image_file.read()
+
+
+@dataclass
+class DecodedImage:
+    image: Image.Image
+    # size of the encoded image; ``image`` may be smaller after draft decoding
+    original_size: Tuple[int, int]
+    _array: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def scale(self) -> float:
+        """Decoded width over original width (1.0 unless draft decoding shrank it)."""
+        return self.image.size[0] / self.original_size[0] if self.original_size[0] else 1.0
+
+    def array(self) -> np.ndarray:
+        """HxWx3 BGR uint8 pixels, the layout YOLO expects for arrays."""
+        if self._array is None:
+            self._array = np.ascontiguousarray(np.asarray(self.image)[:, :, ::-1])
+        return self._array
+
+    def jpeg_bytes(self, max_size: int = LLM_MAX_SIZE, quality: int = LLM_JPEG_QUALITY) -> bytes:
+        image = self.image
+        if max(image.size) > max_size:
+            image = image.copy()
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
+
+    def data_url(self, max_size: int = LLM_MAX_SIZE, quality: int = LLM_JPEG_QUALITY) -> str:
+        encoded = base64.b64encode(self.jpeg_bytes(max_size, quality)).decode('utf-8')
+        return f"data:image/jpeg;base64,{encoded}"
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    if image.mode in ('RGBA', 'LA', 'P'):
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        # flatten transparency onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def decode(source: Union[bytes, memoryview, str, io.IOBase], max_size: Optional[int] = None) -> DecodedImage:
+    """
+    Decode ``source`` (encoded bytes, a path or a file object) to RGB. With
+    ``max_size`` a JPEG is draft-decoded no smaller than that on either side;
+    other formats are decoded at full size.
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source)
+    original_size = image.size
+    if max_size and image.format == 'JPEG':
+        image.draft('RGB', (max_size, max_size))
+    image.load()
+    return DecodedImage(image=_to_rgb(image), original_size=original_size)
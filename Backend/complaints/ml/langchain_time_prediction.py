@@ -7,6 +7,8 @@ from typing import Dict, Optional
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 
+from complaints.ml import llm_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,7 +44,8 @@ class TimePredictionChain:
         self,
         severity_analysis: Dict,
         yolo_features: Optional[Dict],
-        weather_data: Dict
+        weather_data: Dict,
+        bypass_cache: bool = False
     ) -> Dict:
         """
         Predict resolution time for the complaint.
@@ -51,6 +54,7 @@ class TimePredictionChain:
             severity_analysis (Dict): Output from SeverityAnalysisChain
             yolo_features (Optional[Dict]): YOLO detection features
             weather_data (Dict): Weather context data
+            bypass_cache (bool): Ask the LLM even if this prompt was answered before
         
         Returns:
             Dict: Time prediction with:
@@ -70,12 +74,13 @@ class TimePredictionChain:
         )
         
         try:
-            # Get LLM prediction
-            response = self.llm.invoke(prompt)
-            response_text = response.content
-            
-            # Parse JSON response
-            prediction = self._parse_prediction_response(response_text)
+            # Get LLM prediction (cached per prompt) and parse JSON
+            prediction = llm_cache.invoke(
+                self.llm, prompt,
+                prompt=prompt,
+                parse=self._parse_prediction_response,
+                bypass=bypass_cache
+            )
             
             return prediction
         
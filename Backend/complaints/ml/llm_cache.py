@@ -0,0 +1,144 @@
+"""
+Response cache for the Groq calls of the ML chains.
+
+A response is keyed by the SHA-256 of the model name, temperature, rendered
+prompt and image, so an identical request (a resubmitted photo, a retried or
+repeated prediction) costs one cache lookup instead of an LLM round trip.
+Images are hashed by content when the chain has the bytes (the department
+classifier's normalized JPEG) and by URL otherwise; Cloudinary URLs carry the
+upload version, so a replaced image never hits an old entry.
+
+Entries live in the ``LLM_CACHE_ALIAS`` cache (Redis in production) for
+``LLM_CACHE_TIMEOUT`` seconds. When that cache cannot be reached, a file
+cache under ``LLM_CACHE_DIR`` takes over. Only raw response text is stored,
+and only when the chain could parse it. ``LLM_CACHE_BYPASS`` (or
+``bypass=True`` per call) skips reads but still refreshes the entry.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Optional, TypeVar, Union
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_TIMEOUT = 7 * 24 * 3600
+KEY_VERSION = 'v1'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0, 'fallbacks': 0}
+_disk_lock = threading.Lock()
+_disk_cache: Optional[FileBasedCache] = None
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats() -> Dict[str, float]:
+    """Counters of this process since start (or ``reset()``)."""
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters['hits'] + counters['misses']
+    counters['lookups'] = lookups
+    counters['hit_ratio'] = counters['hits'] / lookups if lookups else 0.0
+    return counters
+
+
+def reset():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def timeout() -> int:
+    return int(getattr(settings, 'LLM_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def cache_key(model: str, temperature, prompt: str, image: Union[bytes, str, None] = None) -> str:
+    digest = hashlib.sha256()
+    for part in (str(model), repr(float(temperature or 0.0)), prompt):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    if image is not None:
+        digest.update(image if isinstance(image, bytes) else str(image).encode('utf-8'))
+    return f"llm:{KEY_VERSION}:{digest.hexdigest()}"
+
+
+def _disk() -> FileBasedCache:
+    global _disk_cache
+    if _disk_cache is None:
+        with _disk_lock:
+            if _disk_cache is None:
+                _disk_cache = FileBasedCache(str(settings.LLM_CACHE_DIR), {'TIMEOUT': timeout(), 'OPTIONS': {'MAX_ENTRIES': 10000}})
+    return _disk_cache
+
+
+def _primary():
+    return caches[getattr(settings, 'LLM_CACHE_ALIAS', 'default')]
+
+
+def lookup(key: str) -> Optional[str]:
+    try:
+        return _primary().get(key)
+    except Exception as exc:
+        logger.warning("LLM cache read failed, using the file cache: %s", exc)
+        _count('fallbacks')
+    try:
+        return _disk().get(key)
+    except Exception as exc:
+        logger.warning("LLM file cache read failed: %s", exc)
+        return None
+
+
+def store(key: str, text: str):
+    try:
+        _primary().set(key, text, timeout=timeout())
+        return
+    except Exception as exc:
+        logger.warning("LLM cache write failed, using the file cache: %s", exc)
+        _count('fallbacks')
+    try:
+        _disk().set(key, text, timeout=timeout())
+    except Exception as exc:
+        logger.warning("LLM file cache write failed: %s", exc)
+
+
+def _bypassed(bypass: bool) -> bool:
+    return bypass or bool(getattr(settings, 'LLM_CACHE_BYPASS', False))
+
+
+def invoke(llm, messages, *, prompt: str, parse: Callable[[str], T], image: Union[bytes, str, None] = None,
+           bypass: bool = False) -> T:
+    """
+    ``parse(llm.invoke(messages).content)`` through the cache. ``prompt`` and
+    ``image`` must be what ``messages`` carries. LLM errors propagate and are
+    not cached, nor are responses ``parse`` falls back on (``raw_response``).
+    """
+    if timeout() <= 0:
+        return parse(llm.invoke(messages).content)
+
+    key = cache_key(getattr(llm, 'model_name', ''), getattr(llm, 'temperature', 0.0), prompt, image)
+    if _bypassed(bypass):
+        _count('bypassed')
+    else:
+        text = lookup(key)
+        if text is not None:
+            _count('hits')
+            return parse(text)
+        _count('misses')
+
+    text = llm.invoke(messages).content
+    result = parse(text)
+    if not (isinstance(result, dict) and 'raw_response' in result):
+        store(key, text)
+        _count('stores')
+    return result
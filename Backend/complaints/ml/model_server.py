@@ -0,0 +1,218 @@
+"""
+Out-of-process model server for the road damage detector.
+
+Without it every gunicorn worker (and the ML worker) imports torch and holds
+its own copy of the YOLO model. ``manage.py serve_models`` loads the model
+once and answers detection requests on a UNIX socket (``MODEL_SERVER_SOCKET``);
+with that setting the detector the pipeline gets from
+``road_yolo_detector.get_detector()`` is a thin client that never imports
+torch.
+
+Requests and responses are frames of a 4-byte length, a JSON header and the
+raw bytes of any images, whose sizes the header lists. Images go over the
+socket exactly as downloaded: no base64 or JSON encoding, and the server
+reads them straight into one buffer it decodes from.
+
+Concurrent requests are micro-batched: the batcher thread waits up to
+``MODEL_SERVER_MAX_WAIT_MS`` for more images after the first one arrives, up
+to ``MODEL_SERVER_MAX_BATCH``, and runs them through YOLO together.
+"""
+
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from complaints.ml import image_ingest
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT_MS = 10.0
+HEADER = struct.Struct('!I')
+MAX_HEADER_BYTES = 1 << 20
+MAX_BLOB_BYTES = 32 << 20
+
+
+class ModelServerError(Exception):
+    """The model server could not be reached or did not answer in time."""
+
+
+def _recv_exactly(sock: socket.socket, view: memoryview):
+    while len(view):
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError("model server connection closed")
+        view = view[received:]
+
+
+def send_frame(sock: socket.socket, header: Dict, blobs: Sequence[bytes] = ()):
+    header = dict(header, blobs=[len(blob) for blob in blobs])
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(HEADER.pack(len(encoded)))
+    sock.sendall(encoded)
+    for blob in blobs:
+        sock.sendall(blob)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[Dict, List[memoryview]]:
+    size = bytearray(HEADER.size)
+    _recv_exactly(sock, memoryview(size))
+    (header_length,) = HEADER.unpack(size)
+    if header_length > MAX_HEADER_BYTES:
+        raise ValueError(f"header of {header_length} bytes is too large")
+    encoded = bytearray(header_length)
+    _recv_exactly(sock, memoryview(encoded))
+    header = json.loads(encoded)
+
+    sizes = header.pop('blobs', [])
+    if sum(sizes) > MAX_BLOB_BYTES:
+        raise ValueError(f"request of {sum(sizes)} bytes is too large")
+    # one buffer for all images, handed out as slices without copying
+    buffer = memoryview(bytearray(sum(sizes)))
+    _recv_exactly(sock, buffer)
+    blobs, offset = [], 0
+    for blob_size in sizes:
+        blobs.append(buffer[offset:offset + blob_size])
+        offset += blob_size
+    return header, blobs
+
+
+class MicroBatcher:
+    """Runs the images of concurrent requests through the detector in shared batches."""
+
+    def __init__(self, detector, max_batch: int = DEFAULT_MAX_BATCH, max_wait: float = DEFAULT_MAX_WAIT_MS / 1000):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='model-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, decoded: List[image_ingest.DecodedImage]) -> Future:
+        future = Future()
+        self._queue.put((decoded, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        self.batches += 1
+        images = [image for decoded, _ in batch for image in decoded]
+        try:
+            results = self.detector.predict(images)
+        except Exception as exc:
+            logger.exception("Batched YOLO inference failed")
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        offset = 0
+        for decoded, future in batch:
+            try:
+                future.set_result(self.detector.features_from_results(results[offset:offset + len(decoded)], decoded))
+            except Exception as exc:
+                future.set_exception(exc)
+            offset += len(decoded)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            header, blobs = recv_frame(self.request)
+            response = self.server.dispatch(header, blobs)
+        except Exception as exc:
+            logger.warning("Model server request failed: %s", exc)
+            response = {'ok': False, 'error': str(exc)}
+        try:
+            send_frame(self.request, response)
+        except OSError as exc:
+            logger.warning("Model server could not answer: %s", exc)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, detector, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait: float = DEFAULT_MAX_WAIT_MS / 1000):
+        if os.path.exists(path):
+            os.unlink(path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.detector = detector
+        self.batcher = MicroBatcher(detector, max_batch=max_batch, max_wait=max_wait)
+        super().__init__(path, _Handler)
+
+    def dispatch(self, header: Dict, blobs: List[memoryview]) -> Dict:
+        op = header.get('op')
+        if op == 'ping':
+            return {'ok': True, 'model_loaded': self.detector._model is not None, 'backend': self.detector.backend}
+        if op == 'detect':
+            if self.detector._model is None:
+                return {'ok': True, 'result': {
+                    'yolo_active': False,
+                    'reason': 'model_unavailable',
+                    'message': 'YOLO model is not loaded. This is optional; primary analysis will use LLM.'
+                }}
+            # decode on this connection's thread; only inference is serialized
+            decoded = [image_ingest.decode(blob, max_size=image_ingest.YOLO_INPUT_SIZE) for blob in blobs]
+            timeout = float(header.get('timeout') or DEFAULT_TIMEOUT)
+            return {'ok': True, 'result': self.batcher.submit(decoded).result(timeout=timeout)}
+        return {'ok': False, 'error': f"unknown op {op!r}"}
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def socket_path() -> str:
+    return getattr(settings, 'MODEL_SERVER_SOCKET', '')
+
+
+def timeout() -> float:
+    return float(getattr(settings, 'MODEL_SERVER_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def call(header: Dict, blobs: Sequence[bytes] = (), path: Optional[str] = None,
+         timeout_seconds: Optional[float] = None) -> Dict:
+    """Send one request to the model server; raises ``ModelServerError`` on any failure."""
+    path = path or socket_path()
+    timeout_seconds = timeout() if timeout_seconds is None else timeout_seconds
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout_seconds)
+            sock.connect(path)
+            send_frame(sock, dict(header, timeout=timeout_seconds), blobs)
+            response, _ = recv_frame(sock)
+    except (OSError, ValueError) as exc:
+        raise ModelServerError(f"model server at {path}: {exc}") from exc
+    if not response.get('ok'):
+        raise ModelServerError(response.get('error') or 'model server error')
+    return response
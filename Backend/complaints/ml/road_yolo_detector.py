@@ -7,13 +7,18 @@ Primary analysis is always done by the multimodal LLM.
 YOLO features are only used as supplementary hints and clearly marked as SECONDARY.
 """
 
-import os
-import tempfile
 import logging
-from typing import Dict, Optional
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from django.conf import settings
 from PIL import Image
 
+from complaints import http_client
+from complaints.ml import image_ingest, model_server, yolo_backends
+
 logger = logging.getLogger(__name__)
 
 # RDD2022 Dataset class names - road damage types
@@ -28,6 +33,10 @@ RDD_CLASS_NAMES = {
     7: 'D44'   # Road Shoulder Defect
 }
 
+# ComplaintImage allows at most 4 images per complaint
+MAX_BATCH_IMAGES = 4
+CONFIDENCE_THRESHOLD = 0.25
+
 # Human-readable descriptions for each damage class
 RDD_CLASS_DESCRIPTIONS = {
     'D00': 'Longitudinal Crack',
@@ -41,6 +50,24 @@ RDD_CLASS_DESCRIPTIONS = {
 }
 
 
+def batch_urls(image_url: Union[str, Sequence[str]]) -> List[str]:
+    return [image_url] if isinstance(image_url, str) else list(image_url)[:MAX_BATCH_IMAGES]
+
+
+def fetch_image(url: str) -> bytes:
+    response = http_client.get(url)
+    response.raise_for_status()
+    return response.content
+
+
+def map_concurrently(func, items: List) -> List:
+    """``[func(item) for item in items]`` with one thread per item."""
+    if len(items) == 1:
+        return [func(items[0])]
+    with ThreadPoolExecutor(max_workers=len(items), thread_name_prefix='yolo-fetch') as executor:
+        return list(executor.map(func, items))
+
+
 class RoadYOLODetector:
     """
     Singleton class for road damage detection using YOLOv8.
@@ -54,6 +81,7 @@ class RoadYOLODetector:
     
     _instance = None
     _model = None
+    backend = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -67,42 +95,62 @@ class RoadYOLODetector:
     
     def _load_model(self):
         """
-        Load the YOLOv8 model from disk.
+        Load the YOLOv8 model from disk: an exported ONNX or OpenVINO model
+        when one exists (see yolo_backends), otherwise the PyTorch weights.
         
         Falls back gracefully if model is not available.
         """
-        model_path = os.getenv('YOLO_MODEL_PATH', '/code/ml_models/best.pt')
+        resolved = yolo_backends.resolve()
         
         try:
-            if not os.path.exists(model_path):
-                logger.warning(f"YOLO model not found at {model_path}. YOLO features will be unavailable.")
+            if resolved is None:
+                logger.warning(f"YOLO model not found at {yolo_backends.weights_path()}. YOLO features will be unavailable.")
                 self._model = None
                 return
             
-            from ultralytics import YOLO
-            self._model = YOLO(model_path)
-            logger.info(f"YOLO model loaded successfully from {model_path}")
+            backend, model_path = resolved
+            self._model = yolo_backends.load(model_path)
+            self.backend = backend
+            logger.info(f"YOLO model loaded successfully from {model_path} ({backend} backend)")
             
         except Exception as e:
             logger.error(f"Failed to load YOLO model: {str(e)}")
             self._model = None
     
-    def detect_road_damage(self, image_url: str, category: str) -> Dict:
+    def warm_up(self) -> bool:
+        """
+        Run one inference on a blank frame so the first complaint does not pay
+        for lazy initialisation in the runtime. Returns False without a model.
+        """
+        if self._model is None:
+            return False
+        
+        started = time.perf_counter()
+        blank = Image.new('RGB', (image_ingest.YOLO_INPUT_SIZE, image_ingest.YOLO_INPUT_SIZE))
+        self.predict([image_ingest.DecodedImage(blank, blank.size)])
+        logger.info(f"YOLO warm-up took {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+    
+    def detect_road_damage(self, image_url: Union[str, Sequence[str]], category: str) -> Dict:
         """
         Detect road damage using YOLOv8.
         
         IMPORTANT: This method returns SECONDARY/OPTIONAL features only.
         It should only be called for road category complaints.
         
+        All images of a complaint (up to MAX_BATCH_IMAGES) go through YOLO in
+        one batch. The top-level features aggregate every image; 'images'
+        holds the same features per image.
+        
         Args:
-            image_url (str): Cloudinary URL of the complaint image
+            image_url (str | Sequence[str]): Cloudinary URL(s) of the complaint image(s)
             category (str): Complaint category (should be "road")
         
         Returns:
             Dict: Detection results with 'yolo_active' flag
                 - If category != "road": {'yolo_active': False, 'reason': 'not_road_category'}
                 - If model unavailable: {'yolo_active': False, 'reason': 'model_unavailable'}
-                - If detection successful: {'yolo_active': True, 'detections': [...], ...}
+                - If detection successful: {'yolo_active': True, 'detections': [...], 'images': [...], ...}
                 - If error: {'yolo_active': False, 'error': '...'}
         """
         
@@ -122,119 +170,17 @@ class RoadYOLODetector:
                 'message': 'YOLO model is not loaded. This is optional; primary analysis will use LLM.'
             }
         
-        temp_image_path = None
+        image_urls = batch_urls(image_url)
         
         try:
-            # Download image from Cloudinary
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                temp_file.write(response.content)
-                temp_image_path = temp_file.name
-            
-            # Run YOLO inference
-            results = self._model.predict(temp_image_path, conf=0.25)
-            
-            # Extract detection data
-            detections = []
-            confidences = []
-            damage_classes = {}  # Track which damage classes were detected
-            total_damage_area = 0
+            # Download images from Cloudinary and decode them in memory
+            decoded = map_concurrently(
+                lambda url: image_ingest.decode(fetch_image(url), max_size=image_ingest.YOLO_INPUT_SIZE),
+                image_urls
+            )
             
-            if results and len(results) > 0:
-                # result = results[0]
-                
-                # Get image dimensions
-                img = Image.open(temp_image_path)
-                img_width, img_height = img.size
-                total_image_area = img_width * img_height
-                for result in results:
-                # Process each detection
-                    if result.boxes is not None and len(result.boxes) > 0:
-                        for box in result.boxes:
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            conf = float(box.conf[0].cpu().numpy())
-                            cls = int(box.cls[0].cpu().numpy())
-                            
-                            # Get class name
-                            class_code = RDD_CLASS_NAMES.get(cls, f'Unknown_{cls}')
-                            class_description = RDD_CLASS_DESCRIPTIONS.get(class_code, 'Unknown damage type')
-                            
-                            # Calculate damage area
-                            box_width = x2 - x1
-                            box_height = y2 - y1
-                            box_area = box_width * box_height
-                            total_damage_area += box_area
-                            
-                            # Store confidence
-                            confidences.append(conf)
-                            
-                            # Track damage class occurrences
-                            if class_code not in damage_classes:
-                                damage_classes[class_code] = {
-                                    'description': class_description,
-                                    'count': 0,
-                                    'total_confidence': 0.0
-                                }
-                            damage_classes[class_code]['count'] += 1
-                            damage_classes[class_code]['total_confidence'] += conf
-                            
-                            detections.append({
-                                'class_id': cls,
-                                'class_code': class_code,
-                                'class_description': class_description,
-                                'confidence': conf,
-                                'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                                'area': float(box_area)
-                            })
-                
-                # Calculate average confidence across all detections
-                avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-                
-                # Compute average confidence per damage class
-                damage_classes_summary = []
-                for class_code, data in damage_classes.items():
-                    avg_class_confidence = data['total_confidence'] / data['count']
-                    damage_classes_summary.append({
-                        'class_code': class_code,
-                        'description': data['description'],
-                        'count': data['count'],
-                        'avg_confidence': round(avg_class_confidence, 4)
-                    })
-                
-                # Sort by count (most frequent first)
-                damage_classes_summary.sort(key=lambda x: x['count'], reverse=True)
-                
-                # Calculate metrics
-                damage_proportion = total_damage_area / total_image_area if total_image_area > 0 else 0
-                
-                # Compute a severity hint (SECONDARY signal)
-                severity_hint = self._compute_severity_hint(len(detections), damage_proportion, avg_confidence)
-                
-                return {
-                    'yolo_active': True,
-                    'num_detections': len(detections),
-                    'detections': detections,
-                    'damage_classes': damage_classes_summary,  # Summary of detected damage types
-                    'total_damage_area': float(total_damage_area),
-                    'image_area': float(total_image_area),
-                    'damage_proportion': float(damage_proportion),
-                    'avg_confidence': float(avg_confidence),
-                    'avg_confidence_percent': round(avg_confidence * 100, 2),  # As percentage
-                    'severity_hint': severity_hint,
-                    'note': 'These are SECONDARY features. Primary analysis is done by multimodal LLM.'
-                }
-            
-            else:
-                return {
-                    'yolo_active': True,
-                    'num_detections': 0,
-                    'detections': [],
-                    'message': 'No road damage detected by YOLO',
-                    'note': 'YOLO found nothing, but LLM may still identify issues from visual inspection.'
-                }
+            # Run YOLO inference on all images in one batch
+            return self.features_from_results(self.predict(decoded), decoded)
         
         except Exception as e:
             logger.error(f"YOLO detection error: {str(e)}")
@@ -243,14 +189,121 @@ class RoadYOLODetector:
                 'error': str(e),
                 'message': 'YOLO detection failed. This is optional; primary analysis will use LLM only.'
             }
+    
+    def predict(self, decoded: List[image_ingest.DecodedImage]) -> list:
+        """One YOLO run over the images; one result per image."""
+        return self._model.predict([image.array() for image in decoded], conf=CONFIDENCE_THRESHOLD, verbose=False)
+    
+    def features_from_results(self, results: list, decoded: List[image_ingest.DecodedImage]) -> Dict:
+        """Aggregated and per-image damage features of the YOLO results for ``decoded``."""
+        if not results:
+            return {
+                'yolo_active': True,
+                'num_detections': 0,
+                'detections': [],
+                'message': 'No road damage detected by YOLO',
+                'note': 'YOLO found nothing, but LLM may still identify issues from visual inspection.'
+            }
+        
+        per_image = [self._box_arrays(result, image) for result, image in zip(results, decoded)]
+        
+        features = self._damage_features(
+            np.concatenate([boxes for boxes, _, _ in per_image]),
+            np.concatenate([conf for _, conf, _ in per_image]),
+            np.concatenate([cls for _, _, cls in per_image]),
+            float(sum(image.original_size[0] * image.original_size[1] for image in decoded)),
+            image_index=np.concatenate([np.full(len(conf), i) for i, (_, conf, _) in enumerate(per_image)])
+        )
+        features['num_images'] = len(decoded)
+        features['images'] = []
+        for i, ((boxes, conf, cls), image) in enumerate(zip(per_image, decoded)):
+            image_features = self._damage_features(
+                boxes, conf, cls, float(image.original_size[0] * image.original_size[1])
+            )
+            del image_features['detections']
+            image_features['image_index'] = i
+            features['images'].append(image_features)
+        
+        return {
+            'yolo_active': True,
+            **features,
+            'note': 'These are SECONDARY features. Primary analysis is done by multimodal LLM.'
+        }
+    
+    def _box_arrays(self, result, image: image_ingest.DecodedImage) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Boxes (xyxy, in original image pixels), confidences and class ids of one
+        result, each tensor moved to the CPU once.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return np.empty((0, 4)), np.empty(0), np.empty(0, dtype=np.int64)
+        
+        # Boxes are in decoded pixels; report them at the original size
+        xyxy = np.asarray(boxes.xyxy.cpu().numpy(), dtype=np.float64).reshape(-1, 4) / image.scale
+        conf = np.asarray(boxes.conf.cpu().numpy(), dtype=np.float64).reshape(-1)
+        cls = np.asarray(boxes.cls.cpu().numpy()).reshape(-1).astype(np.int64)
+        return xyxy, conf, cls
+    
+    def _damage_features(
+        self,
+        boxes: np.ndarray,
+        conf: np.ndarray,
+        cls: np.ndarray,
+        image_area: float,
+        image_index: Optional[np.ndarray] = None
+    ) -> Dict:
+        """Detection features of a set of boxes, computed with array operations."""
+        
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        total_damage_area = float(areas.sum())
+        avg_confidence = float(conf.mean()) if len(conf) else 0.0
+        
+        # Count and sum confidence per class id in one pass each
+        num_classes = max(len(RDD_CLASS_NAMES), int(cls.max()) + 1 if len(cls) else 0)
+        counts = np.bincount(cls, minlength=num_classes)
+        confidence_sums = np.bincount(cls, weights=conf, minlength=num_classes)
+        
+        # Most frequent first
+        damage_classes_summary = []
+        for class_id in sorted(np.flatnonzero(counts), key=lambda c: -counts[c]):
+            class_code = RDD_CLASS_NAMES.get(int(class_id), f'Unknown_{class_id}')
+            damage_classes_summary.append({
+                'class_code': class_code,
+                'description': RDD_CLASS_DESCRIPTIONS.get(class_code, 'Unknown damage type'),
+                'count': int(counts[class_id]),
+                'avg_confidence': round(float(confidence_sums[class_id] / counts[class_id]), 4)
+            })
+        
+        detections = []
+        for i, (class_id, confidence, bbox, area) in enumerate(zip(cls.tolist(), conf.tolist(), boxes.tolist(), areas.tolist())):
+            class_code = RDD_CLASS_NAMES.get(class_id, f'Unknown_{class_id}')
+            detection = {
+                'class_id': class_id,
+                'class_code': class_code,
+                'class_description': RDD_CLASS_DESCRIPTIONS.get(class_code, 'Unknown damage type'),
+                'confidence': confidence,
+                'bbox': bbox,
+                'area': area
+            }
+            if image_index is not None:
+                detection['image_index'] = int(image_index[i])
+            detections.append(detection)
         
-        finally:
-            # Clean up temporary file
-            if temp_image_path and os.path.exists(temp_image_path):
-                try:
-                    os.unlink(temp_image_path)
-                except Exception as e:
-                    logger.warning(f"Failed to delete temp file {temp_image_path}: {str(e)}")
+        damage_proportion = total_damage_area / image_area if image_area > 0 else 0
+        
+        return {
+            'num_detections': len(detections),
+            'detections': detections,
+            'damage_classes': damage_classes_summary,  # Summary of detected damage types
+            'total_damage_area': total_damage_area,
+            'image_area': image_area,
+            'damage_proportion': float(damage_proportion),
+            'avg_confidence': avg_confidence,
+            'avg_confidence_percent': round(avg_confidence * 100, 2),  # As percentage
+            # Compute a severity hint (SECONDARY signal)
+            'severity_hint': self._compute_severity_hint(len(detections), damage_proportion, avg_confidence)
+        }
     
     def _compute_severity_hint(self, num_detections: int, damage_proportion: float, avg_confidence: float) -> str:
         """
@@ -299,3 +352,75 @@ class RoadYOLODetector:
             return "moderate"
         else:
             return "low"
+
+
+class RemoteYOLODetector:
+    """
+    Client of the model server (see model_server): downloads the images and
+    sends their bytes over the server's socket instead of loading YOLO here.
+    When the server is down or late, detection is skipped like a missing
+    model, or runs in-process with MODEL_SERVER_LOCAL_FALLBACK.
+    """
+    
+    backend = 'remote'
+    
+    def detect_road_damage(self, image_url: Union[str, Sequence[str]], category: str) -> Dict:
+        if category.lower() != "road":
+            return {
+                'yolo_active': False,
+                'reason': 'not_road_category',
+                'message': 'YOLO detection is only applicable to road complaints'
+            }
+        
+        try:
+            blobs = map_concurrently(fetch_image, batch_urls(image_url))
+        except Exception as e:
+            logger.error(f"YOLO detection error: {str(e)}")
+            return {
+                'yolo_active': False,
+                'error': str(e),
+                'message': 'YOLO detection failed. This is optional; primary analysis will use LLM only.'
+            }
+        
+        try:
+            return model_server.call({'op': 'detect'}, blobs)['result']
+        except model_server.ModelServerError as e:
+            logger.warning(f"Model server unavailable: {str(e)}")
+            if getattr(settings, 'MODEL_SERVER_LOCAL_FALLBACK', False):
+                return RoadYOLODetector().detect_road_damage(image_url, category)
+            return {
+                'yolo_active': False,
+                'reason': 'model_server_unavailable',
+                'error': str(e),
+                'message': 'YOLO model server did not answer. This is optional; primary analysis will use LLM only.'
+            }
+    
+    def warm_up(self) -> bool:
+        """Check that the server is up; the model lives and warms up there."""
+        try:
+            return bool(model_server.call({'op': 'ping'})['model_loaded'])
+        except model_server.ModelServerError as e:
+            logger.warning(f"Model server unavailable: {str(e)}")
+            return False
+
+
+def get_detector():
+    """The model server client when MODEL_SERVER_SOCKET is set, otherwise the in-process detector."""
+    if model_server.socket_path():
+        return RemoteYOLODetector()
+    return RoadYOLODetector()
+
+
+def warm_up_detector(load_local: bool = True) -> bool:
+    """
+    Load the model and run a warm-up inference at startup; never raises. With
+    a model server this only pings it, and without ``load_local`` an
+    in-process model is left to load on the first road complaint.
+    """
+    try:
+        if not load_local and not model_server.socket_path():
+            return False
+        return get_detector().warm_up()
+    except Exception as e:
+        logger.warning(f"YOLO warm-up failed: {str(e)}")
+        return False
@@ -17,6 +17,8 @@ from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 
+from complaints.ml import llm_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,7 +50,8 @@ class SeverityAnalysisChain:
         description: str,
         address: str,
         image_url: str,
-        yolo_features: Optional[Dict] = None
+        yolo_features: Optional[Dict] = None,
+        bypass_cache: bool = False
     ) -> Dict:
         
         # Build the prompt with Chain-of-Thought reasoning
@@ -68,12 +71,14 @@ class SeverityAnalysisChain:
                 ]
             )
             
-            # Get LLM response
-            response = self.llm.invoke([message])
-            response_text = response.content
-            
-            # Parse JSON response
-            analysis = self._parse_analysis_response(response_text)
+            # Get LLM response (cached per prompt and image) and parse JSON
+            analysis = llm_cache.invoke(
+                self.llm, [message],
+                prompt=prompt,
+                image=image_url,
+                parse=self._parse_analysis_response,
+                bypass=bypass_cache
+            )
             
             return analysis
         
@@ -0,0 +1,114 @@
+"""
+Runs the stages of an inference pipeline as a small dependency graph.
+
+A stage starts on a thread as soon as the stages it ``requires`` have
+finished and receives their results as keyword arguments, so independent
+stages (an HTTP call and an LLM call, say) overlap and the wall-clock time
+approaches the longest chain instead of the sum of all stages.
+
+Every stage may have its own ``timeout`` and the whole run a ``budget``
+(both in seconds). A stage that runs out of time is abandoned: with an
+``on_timeout`` fallback its result becomes the fallback's return value and
+the run goes on, without one the run raises ``StageTimeout``. Threads cannot
+be interrupted, so an abandoned stage finishes in the background and its
+result is discarded.
+"""
+
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, elapsed: float):
+        super().__init__(f"{stage} timed out after {elapsed:.1f}s")
+        self.stage = stage
+        self.elapsed = elapsed
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[..., Any]
+    requires: Sequence[str] = ()
+    timeout: Optional[float] = None
+    on_timeout: Optional[Callable[[], Any]] = None
+
+
+@dataclass
+class GraphRun:
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    wall_time_ms: float = 0.0
+
+
+def run_stages(stages: Sequence[Stage], budget: Optional[float] = None,
+               max_workers: Optional[int] = None) -> GraphRun:
+    """
+    Run ``stages`` respecting their dependencies. Exceptions raised by a stage
+    propagate unchanged; stages that must not fail the run should catch their
+    own errors and return a fallback.
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = set(stage.requires) - names
+        if missing:
+            raise ValueError(f"Stage {stage.name} requires unknown stages: {', '.join(sorted(missing))}")
+
+    run = GraphRun()
+    started_at = time.monotonic()
+    run_deadline = started_at + budget if budget is not None else math.inf
+    waiting = list(stages)
+    running = {}
+
+    def expire(stage: Stage, started: float):
+        elapsed = time.monotonic() - started
+        run.timings_ms[stage.name] = elapsed * 1000
+        run.timed_out.append(stage.name)
+        if stage.on_timeout is None:
+            raise StageTimeout(stage.name, elapsed)
+        run.results[stage.name] = stage.on_timeout()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1, thread_name_prefix='stage')
+    try:
+        while waiting or running:
+            progressed = False
+            for stage in [s for s in waiting if all(name in run.results for name in s.requires)]:
+                waiting.remove(stage)
+                progressed = True
+                now = time.monotonic()
+                if now >= run_deadline:
+                    expire(stage, now)
+                    continue
+                deadline = min(run_deadline, now + stage.timeout if stage.timeout is not None else math.inf)
+                inputs = {name: run.results[name] for name in stage.requires}
+                running[executor.submit(stage.func, **inputs)] = (stage, now, deadline)
+
+            if not running:
+                if waiting and not progressed:
+                    raise ValueError(f"Stages have circular requirements: {', '.join(s.name for s in waiting)}")
+                continue
+
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            timeout = None if next_deadline == math.inf else max(0.0, next_deadline - time.monotonic())
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, started, _ = running.pop(future)
+                run.timings_ms[stage.name] = (time.monotonic() - started) * 1000
+                run.results[stage.name] = future.result()
+
+            now = time.monotonic()
+            for future, (stage, started, deadline) in list(running.items()):
+                if deadline <= now:
+                    del running[future]
+                    future.cancel()
+                    expire(stage, started)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    run.wall_time_ms = (time.monotonic() - started_at) * 1000
+    return run
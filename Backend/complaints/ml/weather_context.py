@@ -1,12 +1,63 @@
 
 import os
+import re
+import hashlib
 import logging
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 import requests
+from django.conf import settings
+from django.core.cache import caches
+
+from complaints import http_client
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CACHE_TIMEOUT = 3 * 3600
+DEFAULT_COORDINATE_PRECISION = 1
+PINCODE_PATTERN = re.compile(r'\b[1-9][0-9]{5}\b')
+
+
+def location_key(address: Optional[str] = None, pincode: Optional[str] = None,
+                 latitude=None, longitude=None) -> Tuple[str, str]:
+    """
+    Cache key and API query for a complaint location.
+
+    Forecasts are shared per pincode (given, or found in the address), else per
+    grid cell of ``WEATHER_COORDINATE_PRECISION`` decimals (1 is about 11km),
+    else per normalized address. The query uses coordinates when known, so
+    every complaint of a pincode does not have to spell its address the same way.
+    """
+    precision = int(getattr(settings, 'WEATHER_COORDINATE_PRECISION', DEFAULT_COORDINATE_PRECISION))
+    coordinates = None
+    if latitude is not None and longitude is not None:
+        try:
+            coordinates = (float(latitude), float(longitude))
+        except (TypeError, ValueError):
+            coordinates = None
+
+    if not pincode and address:
+        match = PINCODE_PATTERN.search(address)
+        pincode = match.group() if match else None
+
+    if pincode:
+        key = f"pin:{pincode}"
+    elif coordinates:
+        key = f"ll:{coordinates[0]:.{precision}f},{coordinates[1]:.{precision}f}"
+    else:
+        normalized = ' '.join(re.sub(r'[^\w\s]', ' ', (address or '').lower()).split())
+        key = f"q:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+    if coordinates:
+        query = f"{coordinates[0]:.2f},{coordinates[1]:.2f}"
+    else:
+        query = address or pincode
+    return f"weather:v1:{key}", query
+
+
+def _cache_timeout() -> int:
+    return int(getattr(settings, 'WEATHER_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+
 
 class WeatherContextFetcher:
     """
@@ -24,9 +75,11 @@ class WeatherContextFetcher:
         
         self.forecast_url = "http://api.weatherapi.com/v1/forecast.json"
     
-    def fetch_weather(self, address: str) -> Dict:
+    def fetch_weather(self, address: str, pincode: Optional[str] = None, latitude=None, longitude=None,
+                      refresh: bool = False) -> Dict:
         # Fetch current weather and 10-day forecast for the given address.
-        
+        # Successful forecasts are cached per location for WEATHER_CACHE_TIMEOUT
+        # seconds; refresh=True skips the cache read (used by the prefetcher).
         
         if not self.api_key:
             return {
@@ -34,6 +87,28 @@ class WeatherContextFetcher:
                 'message': 'Weather API key not configured'
             }
         
+        key, query = location_key(address, pincode, latitude, longitude)
+        timeout = _cache_timeout()
+        if timeout > 0 and not refresh:
+            try:
+                cached = caches['default'].get(key)
+            except Exception as e:
+                logger.warning(f"Weather cache read failed: {str(e)}")
+                cached = None
+            if cached is not None:
+                return cached
+        
+        weather_data = self._fetch(query)
+        
+        if timeout > 0 and weather_data.get('weather_available'):
+            try:
+                caches['default'].set(key, weather_data, timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Weather cache write failed: {str(e)}")
+        
+        return weather_data
+    
+    def _fetch(self, address: str) -> Dict:
         # Fetch from API 
         try:
             params = {
@@ -43,7 +118,7 @@ class WeatherContextFetcher:
                 'aqi': 'no' 
             }
             
-            response = requests.get(self.forecast_url, params=params, timeout=10)
+            response = http_client.get(self.forecast_url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -0,0 +1,160 @@
+"""
+Runtime backends for the road damage YOLO model.
+
+The Docker image runs CPU-only PyTorch, where the ``.pt`` weights are the
+slowest option to load and to run. ``manage.py export_yolo`` converts them
+(``YOLO_MODEL_PATH``) into an ONNX file next to them, optionally with int8
+weights, or into an OpenVINO model directory. Ultralytics loads either one
+through the same ``YOLO`` class, so the detector code does not change.
+
+``resolve()`` picks the artifact to load: with ``YOLO_BACKEND=auto`` (the
+default) the first one that exists of ONNX, OpenVINO and the PyTorch weights;
+otherwise only the named backend. ``benchmark()`` measures a backend's load
+time, latency percentiles and resident memory.
+"""
+
+import os
+import resource
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from complaints.ml import image_ingest
+
+
+BACKENDS = ('onnx', 'openvino', 'torch')
+DEFAULT_WEIGHTS = '/code/ml_models/best.pt'
+
+
+def weights_path() -> str:
+    return os.getenv('YOLO_MODEL_PATH', DEFAULT_WEIGHTS)
+
+
+def artifact_path(backend: str, weights: Optional[str] = None) -> str:
+    """Where ``export_yolo`` puts (and the detector looks for) a backend's model."""
+    weights = weights or weights_path()
+    stem = os.path.splitext(weights)[0]
+    if backend == 'onnx':
+        return f"{stem}.onnx"
+    if backend == 'openvino':
+        # the directory name Ultralytics' exporter uses
+        return f"{stem}_openvino_model"
+    if backend == 'torch':
+        return weights
+    raise ValueError(f"Unknown YOLO backend: {backend}")
+
+
+def resolve(preference: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """``(backend, path)`` of the model to load, or None when none of the candidates exists."""
+    preference = preference or os.getenv('YOLO_BACKEND', 'auto')
+    for backend in BACKENDS if preference == 'auto' else (preference,):
+        path = artifact_path(backend)
+        if os.path.exists(path):
+            return backend, path
+    return None
+
+
+def load(path: str):
+    from ultralytics import YOLO
+    return YOLO(path, task='detect')
+
+
+def export(backend: str, weights: Optional[str] = None, imgsz: int = image_ingest.YOLO_INPUT_SIZE,
+           int8: bool = False, data: Optional[str] = None) -> str:
+    """
+    Export the PyTorch weights for ``backend`` and return the artifact's path.
+    ONNX int8 uses ONNX Runtime's dynamic quantization and needs no data;
+    OpenVINO int8 calibrates on the Ultralytics dataset ``data``.
+    """
+    from ultralytics import YOLO
+
+    weights = weights or weights_path()
+    model = YOLO(weights)
+    if backend == 'onnx':
+        # dynamic axes so one run can take all of a complaint's images
+        exported = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantized = f"{exported}.int8"
+            quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+            os.replace(quantized, exported)
+    elif backend == 'openvino':
+        options = {'data': data} if data else {}
+        exported = model.export(format='openvino', imgsz=imgsz, int8=int8, **options)
+    else:
+        raise ValueError(f"Cannot export to {backend}; choose onnx or openvino")
+
+    expected = artifact_path(backend, weights)
+    if os.path.abspath(exported) != os.path.abspath(expected):
+        os.replace(exported, expected)
+    return expected
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MiB (peak, where the current value is unavailable)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class BenchmarkResult:
+    backend: str
+    path: str
+    runs: int
+    batch: int
+    load_ms: float
+    p50_ms: float
+    p95_ms: float
+    rss_mb: float
+    model_rss_mb: float
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def benchmark(backend: str, runs: int = 50, batch: int = 1, image: Optional[bytes] = None) -> BenchmarkResult:
+    """
+    Load ``backend``'s model, run one warm-up inference and then time ``runs``
+    inferences over ``batch`` frames (``image`` decoded like a complaint
+    photo, or a blank 640x640 frame).
+    """
+    path = artifact_path(backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {backend} model at {path}; run `manage.py export_yolo --format {backend}`")
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    model = load(path)
+    if image is not None:
+        frame = image_ingest.decode(image, max_size=image_ingest.YOLO_INPUT_SIZE).array()
+    else:
+        frame = np.zeros((image_ingest.YOLO_INPUT_SIZE, image_ingest.YOLO_INPUT_SIZE, 3), dtype=np.uint8)
+    frames = [frame] * batch
+    model.predict(frames, conf=0.25, verbose=False)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        model.predict(frames, conf=0.25, verbose=False)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    rss_after = rss_mb()
+    p50, p95 = np.percentile(latencies, [50, 95]) if latencies else (0.0, 0.0)
+    return BenchmarkResult(
+        backend=backend,
+        path=path,
+        runs=runs,
+        batch=batch,
+        load_ms=round(load_ms, 1),
+        p50_ms=round(float(p50), 2),
+        p95_ms=round(float(p95), 2),
+        rss_mb=round(rss_after, 1),
+        model_rss_mb=round(rss_after - rss_before, 1),
+    )
@@ -6,13 +6,14 @@ from django.core.validators import RegexValidator
 from django.db.models import Sum
 
 import re
-import requests
 import json
+import uuid
 
 from CPCMS import settings
 from users.models import ParentUser, Department,Field_Worker,Citizen
 from notifications.models import Notification
 from cloudinary.models import CloudinaryField
+from complaints import gazetteer, geo, geocoding, response_cache
     
 
 def validate_image_size(image):
@@ -40,9 +41,22 @@ class Complaint(models.Model):
 
     latitude = models.DecimalField(max_digits=11,decimal_places=8,null=True,blank=True)
     longitude = models.DecimalField(max_digits=11,decimal_places=8,null=True,blank=True)
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False,
+                               help_text="Geohash cell of latitude/longitude, kept in sync on save")
 
     location_type = models.CharField(max_length=20,choices=Location_Choice,default='manual',null=True,blank=True)
 
+    Address_Status_Choice = [
+        ('pending', 'Pending'),
+        ('enriched', 'Enriched'),
+        ('failed', 'Failed'),
+    ]
+    # Set only for GPS complaints that need reverse geocoding; the address is
+    # filled in by `manage.py geocode_complaints`, retried with backoff.
+    address_status = models.CharField(max_length=10, choices=Address_Status_Choice, null=True, blank=True, editable=False)
+    address_attempts = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    address_retry_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     upvotes = models.ManyToManyField(ParentUser,through='Upvote',related_name='upvoted_complaints'
         ,blank=True)
     fake_confidence = models.FloatField(default=0.0)
@@ -65,6 +79,10 @@ class Complaint(models.Model):
         indexes = [
             models.Index(fields=['posted_by'], name='idx_complaint_posted_by'),
             models.Index(fields=['upvotes_count'], name='idx_complaint_upvotes_count'),
+            # pattern ops let PostgreSQL serve geohash LIKE 'prefix%' from the index
+            models.Index(fields=['geohash'], name='idx_complaint_geohash', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['address_retry_at'], name='idx_complaint_address_pending',
+                         condition=models.Q(address_status='pending')),
         ]
         ordering = ['-posted_at']
 
@@ -73,16 +91,27 @@ class Complaint(models.Model):
 
     def save(self, *args, **kwargs):
         if self.location_type=='gps' and self.latitude and self.longitude and not self.address:
-            address_data = self.reverse_geocode_mapmyindia()
-            if address_data:
+            # Only the offline gazetteer is consulted here, so a save never
+            # waits on the network; anything it cannot place is queued.
+            place = gazetteer.lookup(self.latitude, self.longitude)
+            if place:
+                address_data = place.as_address()
                 self.address = address_data.get('address','')
                 self.pincode = address_data.get('pincode','')
+                self.address_status = 'enriched'
+            elif self.address_status is None:
+                self.address_status = 'pending'
 
         elif self.address and not self.pincode:
             self.pincode = self.extract_pincode_from_address()
 
         if not self.address and (not self.latitude or not self.longitude):
             raise ValidationError("Either address or GPS coordinates must be provided.")           
+
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = list(update_fields) + ['geohash']
         
         current_time = timezone.now()
         message=''
@@ -95,16 +124,28 @@ class Complaint(models.Model):
                 self.resolution_deadline = self.resolution_deadline + timedelta(days=2)
                 message = "Sorry for delay. We are working on your complaint and it will be solved soon"
         
+        # upvotes_count is maintained by atomic UPDATEs in complaints.upvotes;
+        # a full save of an already stored row must not write back a stale copy.
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'upvotes_count'
+            ]
+
         # Call parent save method
         super().save(*args, **kwargs)
         
-        # Update upvotes_count if needed
-        if 'update_fields' not in kwargs or 'upvotes_count' not in kwargs.get('update_fields', []):
-            self.upvotes_count = self.upvotes.count()
-            super().save(update_fields=['upvotes_count'])
-        
         # return message  # Django save() should not return a value
 
+    def reverse_geocode(self):
+        """Resolve latitude/longitude from the offline gazetteer, falling back to MapmyIndia"""
+        place = gazetteer.lookup(self.latitude, self.longitude)
+        if place:
+            return place.as_address()
+        if geocoding.mapmyindia_fallback_enabled():
+            return self.reverse_geocode_mapmyindia()
+        return None
+
     def reverse_geocode_mapmyindia(self):
         """Convert latitude/longitude to address using CORRECT MapmyIndia Reverse Geocoding API"""
         try:
@@ -113,57 +154,46 @@ class Complaint(models.Model):
                 print("MapmyIndia API key not configured")
                 return None
 
-            # CORRECT API endpoint
-            url = "https://search.mappls.com/search/address/rev-geocode"
-            
-            params = {
-                'lat': float(self.latitude),
-                'lng': float(self.longitude),
-                'access_token': api_key,
-                'region': 'IND'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
+            lookup = geocoding.reverse_geocode(self.latitude, self.longitude, api_key)
+            result = lookup['result']
+
+            if result:
+                address = result.get('formatted_address', '')
+                pincode = result.get('pincode', '')
+                
+                # Build address if formatted_address is empty
+                if not address:
+                    address_parts = []
+                    if result.get('city'):
+                        address_parts.append(result.get('city'))
+                    elif result.get('village'):
+                        address_parts.append(result.get('village'))
+                    if result.get('district'):
+                        address_parts.append(result.get('district'))
+                    if result.get('state'):
+                        address_parts.append(result.get('state'))
+                    address = ", ".join(address_parts)
                 
-                if data.get('responseCode') == 200 and data.get('results'):
-                    result = data['results'][0]
-                    
-                    address = result.get('formatted_address', '')
-                    pincode = result.get('pincode', '')
-                    
-                    # Build address if formatted_address is empty
-                    if not address:
-                        address_parts = []
-                        if result.get('city'):
-                            address_parts.append(result.get('city'))
-                        elif result.get('village'):
-                            address_parts.append(result.get('village'))
-                        if result.get('district'):
-                            address_parts.append(result.get('district'))
-                        if result.get('state'):
-                            address_parts.append(result.get('state'))
-                        address = ", ".join(address_parts)
-                    
-                    return {
-                        'address': address,
-                        'pincode': pincode,
-                        'city': result.get('city', ''),
-                        'state': result.get('state', ''),
-                        'district': result.get('district', '')
-                    }
-                else:
-                    print(f"MapmyIndia API returned no results: {data}")
+                return {
+                    'address': address,
+                    'pincode': pincode,
+                    'city': result.get('city', ''),
+                    'state': result.get('state', ''),
+                    'district': result.get('district', '')
+                }
             else:
-                print(f"MapmyIndia API error: {response.status_code} - {response.text}")
+                print(f"MapmyIndia API returned no results. Response code: {lookup['responseCode']}")
                 
         except Exception as e:
             print(f"MapmyIndia reverse geocoding failed: {e}")
         
         return None
 
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return geo.encode(float(self.latitude), float(self.longitude))
+
     def extract_pincode_from_address(self):
         if not self.address:
             return None
@@ -192,6 +222,8 @@ class Complaint(models.Model):
         total = self.fake_confidences.aggregate(total=Sum('weight'))['total'] or 0.0
         Complaint.objects.filter(pk=self.pk).update(fake_confidence=total)
         self.fake_confidence = total
+        # update() sends no signals
+        response_cache.bump(complaint_ids=[self.pk], department_ids=[self.assigned_to_dept_id])
         return total
     
 
@@ -222,6 +254,90 @@ class ComplaintImage(models.Model):
         return f"Image for Complaint ID {self.complaint.id} uploaded at {self.uploaded_at.strftime('%Y-%m-%d %H:%M:%S')}"
     
 
+class ComplaintPrediction(models.Model):
+    """
+    Stored output of ComplaintPredictionService.predict_resolution. A row is
+    reused until the models (model_version), the image or the text inputs
+    (the two fingerprints) change.
+    """
+    complaint = models.ForeignKey(
+        Complaint,
+        on_delete=models.CASCADE,
+        related_name='predictions'
+    )
+    model_version = models.CharField(max_length=255)
+    image_fingerprint = models.CharField(max_length=64)
+    input_fingerprint = models.CharField(max_length=64)
+    severity_analysis = models.JSONField(default=dict)
+    time_prediction = models.JSONField(default=dict)
+    metadata = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['complaint', 'model_version', 'image_fingerprint', 'input_fingerprint'],
+                name='uniq_complaint_prediction_inputs',
+            ),
+        ]
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f"Prediction for Complaint ID {self.complaint_id} ({self.model_version})"
+
+
+class MLJob(models.Model):
+    """
+    A queued ML request (prediction or department suggestion) run by
+    `manage.py run_ml_jobs` instead of inside a web worker.
+    """
+    PREDICT_RESOLUTION = 'predict_resolution'
+    SUGGEST_DEPARTMENT = 'suggest_department'
+    Kind_Choice = [
+        (PREDICT_RESOLUTION, 'Predict resolution'),
+        (SUGGEST_DEPARTMENT, 'Suggest department'),
+    ]
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    Status_Choice = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=32, choices=Kind_Choice)
+    status = models.CharField(max_length=16, choices=Status_Choice, default=QUEUED)
+    progress = models.CharField(max_length=64, blank=True, default='')
+    requested_by = models.ForeignKey(ParentUser, null=True, blank=True, on_delete=models.SET_NULL,
+                                     related_name='ml_jobs')
+    complaint = models.ForeignKey(Complaint, null=True, blank=True, on_delete=models.CASCADE,
+                                  related_name='ml_jobs')
+    payload = models.JSONField(default=dict, blank=True)
+    # uploaded image of a department suggestion, dropped once the job is done
+    image = models.BinaryField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_mljob_status_created'),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+
 class Upvote(models.Model):
     user = models.ForeignKey(ParentUser, on_delete=models.CASCADE)
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE)
@@ -0,0 +1,155 @@
+"""
+Keyset (cursor) pagination for complaint listings.
+
+A page is addressed by an opaque cursor that encodes the sort value and id of
+the row at the page boundary. The next page is fetched with a plain
+``(field, id) < (value, pk)`` predicate, so page N costs the same as page 1
+and no COUNT(*) is ever issued.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+NEXT = 'n'
+PREV = 'p'
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded or belongs to another ordering."""
+
+
+@dataclass
+class KeysetPage:
+    results: List
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    page_size: int
+
+
+def is_paginated_request(request) -> bool:
+    # Callers opt in by sending a cursor or a page size; plain requests keep
+    # receiving the flat list the frontend already consumes.
+    params = request.query_params
+    return 'cursor' in params or 'page_size' in params
+
+
+def get_page_size(request) -> int:
+    default = getattr(settings, 'COMPLAINT_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    cap = getattr(settings, 'COMPLAINT_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(request.query_params.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    if size < 1:
+        size = default
+    return min(size, cap)
+
+
+def _ordering_key(field: str, descending: bool) -> str:
+    return f"-{field}" if descending else field
+
+
+def encode_cursor(field: str, descending: bool, value, pk: int, direction: str) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {
+        'o': _ordering_key(field, descending),
+        'v': value,
+        'id': pk,
+        'd': direction,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, field: str, descending: bool):
+    """Return ``(value, pk, direction)`` for a cursor issued for this ordering."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        ordering = payload['o']
+        value = payload['v']
+        pk = int(payload['id'])
+        direction = payload['d']
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise InvalidCursor("Invalid cursor.")
+
+    if ordering != _ordering_key(field, descending) or direction not in (NEXT, PREV):
+        raise InvalidCursor("Cursor does not match the requested ordering.")
+
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise InvalidCursor("Invalid cursor.")
+        value = parsed
+    elif value is not None and not isinstance(value, (int, float)):
+        raise InvalidCursor("Invalid cursor.")
+
+    return value, pk, direction
+
+
+def _boundary_filter(field: str, value, pk: int, before: bool) -> Q:
+    """Rows strictly before/after ``(value, pk)`` in ascending ``(field, id)`` order."""
+    op = 'lt' if before else 'gt'
+    return Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"id__{op}": pk})
+
+
+def paginate_keyset(queryset, field: str, descending: bool = True,
+                    cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE) -> KeysetPage:
+    """
+    Slice ``queryset`` into one page ordered by ``(field, id)``.
+
+    One extra row is fetched to learn whether another page exists in the
+    direction of travel, which is all the bookkeeping keyset pagination needs.
+    """
+    direction = NEXT
+    if cursor:
+        value, pk, direction = decode_cursor(cursor, field, descending)
+        # Moving forward through a descending listing means walking towards
+        # smaller keys, and vice versa.
+        before = descending if direction == NEXT else not descending
+        queryset = queryset.filter(_boundary_filter(field, value, pk, before))
+
+    walk_descending = descending if direction == NEXT else not descending
+    if walk_descending:
+        queryset = queryset.order_by(f"-{field}", '-id')
+    else:
+        queryset = queryset.order_by(field, 'id')
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if direction == PREV:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if direction == NEXT:
+            if has_more:
+                next_cursor = encode_cursor(field, descending, getattr(last, field), last.pk, NEXT)
+            if cursor:
+                prev_cursor = encode_cursor(field, descending, getattr(first, field), first.pk, PREV)
+        else:
+            next_cursor = encode_cursor(field, descending, getattr(last, field), last.pk, NEXT)
+            if has_more:
+                prev_cursor = encode_cursor(field, descending, getattr(first, field), first.pk, PREV)
+
+    return KeysetPage(
+        results=rows,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        page_size=page_size,
+    )
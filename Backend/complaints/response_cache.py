@@ -0,0 +1,157 @@
+"""
+Versioned caching of read-only complaint responses.
+
+Cache keys embed version counters instead of being deleted on writes: every
+complaint has one, every department has one, and a global counter covers
+listings that span departments. Model signals bump the counters, which makes
+every dependent key unreachable at once; stale entries simply age out.
+
+A miss is recomputed by one request at a time (single-flight). Concurrent
+requests for the same key wait briefly for that result rather than all
+hitting the database together right after a version bump.
+"""
+
+import hashlib
+import logging
+import time
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.05
+
+GLOBAL = 'all'
+
+
+def _cache():
+    return caches['default']
+
+
+def _timeout() -> int:
+    return int(getattr(settings, 'RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def _version_key(scope: str) -> str:
+    return f"resp:ver:{scope}"
+
+
+def complaint_scope(complaint_id) -> str:
+    return f"complaint:{complaint_id}"
+
+
+def department_scope(department_id) -> str:
+    return f"dept:{department_id}"
+
+
+def _versions(scopes: Iterable[str]) -> str:
+    cache = _cache()
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    parts = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # Start from the clock, not zero, so a counter that was evicted
+            # can never come back at a value whose entries are still cached.
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        parts.append(str(version))
+    return '.'.join(parts)
+
+
+def _bump_now(scopes: Iterable[str]):
+    cache = _cache()
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+        except Exception as exc:
+            logger.warning("Could not bump response cache version %s: %s", key, exc)
+
+
+def bump(complaint_ids: Iterable = (), department_ids: Iterable = ()):
+    """
+    Invalidate cached responses for the given complaints and departments, and
+    every cross-department listing.
+    """
+    scopes = [GLOBAL]
+    scopes += [complaint_scope(pk) for pk in set(complaint_ids) if pk is not None]
+    scopes += [department_scope(pk) for pk in set(department_ids) if pk is not None]
+    _bump_now(scopes)
+    # Bump again once the write is visible: a reader that raced the
+    # transaction may have cached the old rows under the first new version.
+    transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def _request_key(request, endpoint: str, versions: str) -> str:
+    user = request.user
+    audience = f"u{user.pk}" if user.is_authenticated else 'anon'
+    params = sorted((k, tuple(request.query_params.getlist(k))) for k in request.query_params)
+    digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()
+    return f"resp:{endpoint}:{audience}:{versions}:{digest}"
+
+
+def _wait_for(key: str):
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    cache = _cache()
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return None
+
+
+def cached_response(request, endpoint: str, scopes: Iterable[str],
+                    build: Callable[[], Response]) -> Response:
+    """
+    Serve ``build()``'s payload from the cache under a key derived from the
+    endpoint, the caller, the query string and the current versions of
+    ``scopes``. Only 200 responses are stored.
+    """
+    timeout = _timeout()
+    if timeout <= 0:
+        return build()
+
+    cache = _cache()
+    try:
+        key = _request_key(request, endpoint, _versions(scopes))
+        data = cache.get(key)
+    except Exception as exc:
+        logger.warning("Response cache unavailable: %s", exc)
+        return build()
+
+    if data is not None:
+        return Response(data, status=status.HTTP_200_OK)
+
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        data = _wait_for(key)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+        # The builder is slow or gone; answer from the database directly.
+        return build()
+
+    try:
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout)
+        return response
+    finally:
+        cache.delete(lock_key)
+
+
+def listing_scopes(department_id: Optional[str] = None):
+    return [department_scope(department_id)] if department_id else [GLOBAL]
@@ -0,0 +1,148 @@
+"""
+Full-text search over complaint content, address and pincode.
+
+PostgreSQL keeps a generated ``search_vector`` tsvector column behind a GIN
+index; SQLite keeps an FTS5 shadow table in sync through triggers. Both are
+created by migration 0019 and live outside the model state, so queries here
+go through RawSQL.
+
+Results are ordered by a time-invariant score, ``ln(1 + relevance) +
+posted_at_epoch / SEARCH_RECENCY_SECONDS``: one unit of log-relevance is
+worth SEARCH_RECENCY_SECONDS of recency. Because the score does not depend
+on "now", it can be used as a keyset pagination field.
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'complaints_complaint_fts'
+SEARCH_CONFIG = 'simple'
+MAX_TERMS = 8
+DEFAULT_RECENCY_SECONDS = 7 * 24 * 3600
+SNIPPET_BATCH = 500
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+
+def tokenize(query: str) -> List[str]:
+    """Split a raw search string into lowercase word tokens."""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def _recency_seconds() -> float:
+    return float(getattr(settings, 'SEARCH_RECENCY_SECONDS', DEFAULT_RECENCY_SECONDS))
+
+
+def _pg_tsquery(tokens: Iterable[str]) -> str:
+    # every term must match, each as a prefix so partial words still hit
+    return ' & '.join(f"{token}:*" for token in tokens)
+
+
+def _fts5_query(tokens: Iterable[str]) -> str:
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_complaints(queryset, query: str):
+    """
+    Restrict ``queryset`` to complaints matching ``query`` and annotate each
+    row with ``search_score``. A query without any word characters matches
+    nothing.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none().annotate(search_score=Value(0.0, output_field=FloatField()))
+
+    vendor = connection.vendor
+    recency = _recency_seconds()
+
+    if vendor == 'postgresql':
+        tsquery = _pg_tsquery(tokens)
+        matches = RawSQL(
+            f"SELECT id FROM complaints_complaint "
+            f"WHERE search_vector @@ to_tsquery('{SEARCH_CONFIG}', %s)",
+            [tsquery],
+        )
+        score = RawSQL(
+            f"ln(1 + ts_rank_cd(complaints_complaint.search_vector, to_tsquery('{SEARCH_CONFIG}', %s))) "
+            f"+ extract(epoch from complaints_complaint.posted_at) / %s",
+            [tsquery, recency],
+            output_field=FloatField(),
+        )
+    elif vendor == 'sqlite':
+        fts_query = _fts5_query(tokens)
+        matches = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [fts_query],
+        )
+        # bm25() is negative, smaller is better; weights follow the column
+        # order content, address, pincode.
+        score = RawSQL(
+            f"ln(1 - (SELECT bm25({FTS_TABLE}, 1.0, 0.5, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = complaints_complaint.id)) "
+            f"+ (julianday(complaints_complaint.posted_at) - 2440587.5) * 86400.0 / %s",
+            [fts_query, recency],
+            output_field=FloatField(),
+        )
+    else:
+        # No index on this backend: fall back to substring matching ranked by recency.
+        match = Q()
+        for token in tokens:
+            match &= (Q(content__icontains=token) | Q(address__icontains=token)
+                      | Q(pincode__startswith=token))
+        return queryset.filter(match).annotate(
+            search_score=Value(0.0, output_field=FloatField())
+        )
+
+    return queryset.filter(id__in=matches).annotate(search_score=score)
+
+
+def _snippet_rows(ids: List[int], tokens: List[str]) -> Dict[int, str]:
+    vendor = connection.vendor
+    placeholders = ', '.join(['%s'] * len(ids))
+
+    if vendor == 'postgresql':
+        options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=25, MinWords=8"
+        sql = (
+            f"SELECT id, ts_headline('{SEARCH_CONFIG}', "
+            f"concat_ws(' ', content, address, pincode), to_tsquery('{SEARCH_CONFIG}', %s), %s) "
+            f"FROM complaints_complaint WHERE id IN ({placeholders})"
+        )
+        params = [_pg_tsquery(tokens), options, *ids]
+    elif vendor == 'sqlite':
+        sql = (
+            f"SELECT rowid, snippet({FTS_TABLE}, -1, %s, %s, '…', 16) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})"
+        )
+        params = [HIGHLIGHT_START, HIGHLIGHT_STOP, _fts5_query(tokens), *ids]
+    else:
+        return {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def attach_snippets(complaints, query: str):
+    """
+    Set ``search_snippet`` on each complaint with the matched terms wrapped in
+    <mark> tags. Run it on a page of results only; headline generation is far
+    more expensive than matching.
+    """
+    complaints = list(complaints)
+    tokens = tokenize(query)
+    snippets: Dict[int, str] = {}
+    if tokens:
+        ids = [c.id for c in complaints]
+        for start in range(0, len(ids), SNIPPET_BATCH):
+            snippets.update(_snippet_rows(ids[start:start + SNIPPET_BATCH], tokens))
+
+    for complaint in complaints:
+        complaint.search_snippet = snippets.get(complaint.id)
+    return complaints
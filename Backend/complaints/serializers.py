@@ -53,7 +53,7 @@ class ComplaintSerializer(serializers.ModelSerializer):
     class Meta:
         model = Complaint
         fields = ['id','posted_by','content','posted_at','thumbnail_url',
-                  'images_count','upvotes_count','is_upvoted','assigned_to_dept','address','pincode',
+                  'images_count','upvotes_count','is_upvoted','assigned_to_dept','address','pincode','address_status',
                   'latitude','longitude','location_type','location_display','status',
                   'assigned_to_fieldworker','fake_confidence','current_resolution','has_pending_resolution', 'is_anonymous', 'resolution_deadline']
         read_only_fields = ['posted_by', 'posted_at','location_display','fake_confidence', ]
@@ -110,6 +110,9 @@ class ComplaintSerializer(serializers.ModelSerializer):
         return None
     
     def get_has_pending_resolution(self, obj):
+        annotated = getattr(obj, 'has_pending_resolution', None)
+        if annotated is not None:
+            return bool(annotated)
         return obj.resolutions.filter(status='pending_approval').exists()
 
     def to_representation(self, instance):
@@ -119,6 +122,55 @@ class ComplaintSerializer(serializers.ModelSerializer):
         return data
 
 
+class ComplaintListSerializer(ComplaintSerializer):
+    """
+    List-mode variant of ComplaintSerializer for rows coming from
+    ``base_complaint_queryset``. Every per-row value is read from an
+    annotation or a prefetched relation; a row missing one raises
+    AttributeError instead of silently issuing a query.
+    """
+
+    def get_upvotes_count(self, obj):
+        return obj.upvotes_count
+
+    def get_is_upvoted(self, obj):
+        return bool(obj.is_upvoted)
+
+    def get_posted_by(self, obj):
+        if obj.is_anonymous or obj.poster_username is None:
+            return None
+        return {'username': obj.poster_username}
+
+    def get_assigned_to_fieldworker(self, obj):
+        return obj.fieldworker_username
+
+    def get_has_pending_resolution(self, obj):
+        return bool(obj.has_pending_resolution)
+
+
+class ComplaintSearchResultSerializer(ComplaintListSerializer):
+    snippet = serializers.SerializerMethodField()
+
+    class Meta(ComplaintListSerializer.Meta):
+        fields = ComplaintListSerializer.Meta.fields + ['snippet']
+
+    def get_snippet(self, obj):
+        return getattr(obj, 'search_snippet', None)
+
+
+
+class ComplaintMapSerializer(serializers.ModelSerializer):
+    """Compact marker payload for map views."""
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Complaint
+        fields = ['id', 'content', 'latitude', 'longitude', 'pincode', 'status',
+                  'upvotes_count', 'posted_at', 'distance_km']
+
+    def get_distance_km(self, obj):
+        return getattr(obj, 'distance_km', None)
+
 
 class ComplaintCreateSerializer(serializers.ModelSerializer):
     images = serializers.ListField(
@@ -141,7 +193,7 @@ class ComplaintCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Complaint
         fields = ['id', 'content', 'images', 'posted_at', 'posted_by', 'assigned_to_dept','address',
-                  'pincode','latitude','longitude','location_type','status','assigned_to_fieldworker','is_anonymous','resolution_deadline',
+                  'pincode','address_status','latitude','longitude','location_type','status','assigned_to_fieldworker','is_anonymous','resolution_deadline',
                   ]
         read_only_fields = ['posted_by', 'posted_at',]
 
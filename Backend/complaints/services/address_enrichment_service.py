@@ -0,0 +1,183 @@
+"""
+Address Enrichment Service - fills in addresses of GPS complaints
+
+``Complaint.save`` only consults the offline gazetteer, so a GPS complaint it
+cannot place is stored straight away with ``address_status = 'pending'``.
+``enrich_pending`` claims due pending rows a batch at a time, geocodes them
+(gazetteer, then MapmyIndia through the geocode cache) and writes the results
+back with one ``bulk_update`` per batch. A row that still has no address is
+retried with exponential backoff and marked ``'failed'`` after
+``ADDRESS_ENRICHMENT_MAX_ATTEMPTS`` attempts.
+
+Claiming pushes ``address_retry_at`` past a lease, under ``SKIP LOCKED`` on
+PostgreSQL, so several workers never geocode the same row at once and a
+crashed worker's batch becomes due again when the lease runs out.
+
+Deployments without that worker (Railway runs only gunicorn) keep
+``ADDRESS_ENRICHMENT_INLINE`` on: once a pending complaint is committed the
+web process geocodes that one row on a background thread, off the request.
+"""
+
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from complaints import response_cache
+from complaints.models import Complaint
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+ENRICHED = 'enriched'
+FAILED = 'failed'
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 8
+LEASE = timedelta(minutes=5)
+BASE_DELAY = timedelta(minutes=1)
+MAX_DELAY = timedelta(hours=6)
+
+UPDATE_FIELDS = ['address', 'pincode', 'address_status', 'address_attempts', 'address_retry_at']
+
+
+@dataclass
+class EnrichmentStats:
+    claimed: int = 0
+    enriched: int = 0
+    retried: int = 0
+    failed: int = 0
+
+    def add(self, other: 'EnrichmentStats'):
+        self.claimed += other.claimed
+        self.enriched += other.enriched
+        self.retried += other.retried
+        self.failed += other.failed
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before retry number ``attempts + 1``: doubling, capped, with jitter."""
+    delay = min(BASE_DELAY * 2 ** min(max(attempts - 1, 0), 16), MAX_DELAY)
+    return delay * random.uniform(1.0, 1.25)
+
+
+def _due(now):
+    return (
+        Complaint.objects
+        .filter(address_status=PENDING)
+        .filter(Q(address_retry_at__isnull=True) | Q(address_retry_at__lte=now))
+    )
+
+
+def _claim(batch_size: int, now, complaint_ids: Optional[Iterable[int]] = None) -> List[Complaint]:
+    due = _due(now)
+    if complaint_ids is not None:
+        due = due.filter(pk__in=list(complaint_ids))
+    with transaction.atomic():
+        batch = list(
+            due
+            .select_for_update(skip_locked=True)
+            .only('id', 'latitude', 'longitude', 'location_type', 'address', 'pincode', 'assigned_to_dept',
+                  'address_status', 'address_attempts', 'address_retry_at')
+            .order_by('id')[:batch_size]
+        )
+        if batch:
+            Complaint.objects.filter(pk__in=[c.pk for c in batch]).update(address_retry_at=now + LEASE)
+    return batch
+
+
+def enrich_batch(batch_size: int = DEFAULT_BATCH_SIZE,
+                 complaint_ids: Optional[Iterable[int]] = None) -> EnrichmentStats:
+    now = timezone.now()
+    stats = EnrichmentStats()
+    batch = _claim(batch_size, now, complaint_ids)
+    stats.claimed = len(batch)
+    if not batch:
+        return stats
+
+    max_attempts = int(getattr(settings, 'ADDRESS_ENRICHMENT_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+    for complaint in batch:
+        try:
+            address_data = complaint.reverse_geocode()
+        except Exception:
+            logger.exception("Reverse geocoding complaint %s failed", complaint.pk)
+            address_data = None
+
+        if address_data and address_data.get('address'):
+            complaint.address = address_data['address']
+            complaint.pincode = address_data.get('pincode') or complaint.extract_pincode_from_address()
+            complaint.address_status = ENRICHED
+            complaint.address_retry_at = None
+            stats.enriched += 1
+            continue
+
+        complaint.address_attempts = (complaint.address_attempts or 0) + 1
+        if complaint.address_attempts >= max_attempts:
+            complaint.address_status = FAILED
+            complaint.address_retry_at = None
+            stats.failed += 1
+        else:
+            complaint.address_retry_at = timezone.now() + backoff(complaint.address_attempts)
+            stats.retried += 1
+
+    with transaction.atomic():
+        # skip rows that were given an address or deleted while we geocoded
+        still_pending = set(
+            Complaint.objects
+            .select_for_update()
+            .filter(pk__in=[c.pk for c in batch], address_status=PENDING)
+            .filter(Q(address__isnull=True) | Q(address=''))
+            .values_list('pk', flat=True)
+        )
+        written = [c for c in batch if c.pk in still_pending]
+        Complaint.objects.bulk_update(written, UPDATE_FIELDS)
+
+    if written:
+        # bulk_update skips the save signals that normally invalidate these
+        response_cache.bump(
+            complaint_ids=[c.pk for c in written],
+            department_ids=[c.assigned_to_dept_id for c in written],
+        )
+    return stats
+
+
+def enrich_pending(batch_size: int = DEFAULT_BATCH_SIZE, limit: Optional[int] = None) -> EnrichmentStats:
+    """Enrich due pending complaints until none are left (or ``limit`` is reached)."""
+    stats = EnrichmentStats()
+    while limit is None or stats.claimed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats.claimed)
+        batch_stats = enrich_batch(size)
+        stats.add(batch_stats)
+        if batch_stats.claimed < size:
+            break
+    return stats
+
+
+def inline_enabled() -> bool:
+    return bool(getattr(settings, 'ADDRESS_ENRICHMENT_INLINE', True))
+
+
+def _enrich_one(complaint_id: int):
+    try:
+        enrich_batch(1, complaint_ids=[complaint_id])
+    except Exception:
+        logger.exception("Background geocoding of complaint %s failed", complaint_id)
+    finally:
+        # this thread's connection is not closed by the request cycle
+        connection.close()
+
+
+def _run_in_background(complaint_id: int):
+    threading.Thread(target=_enrich_one, args=(complaint_id,), name='address-enrichment', daemon=True).start()
+
+
+def enrich_after_commit(complaint_id: int):
+    """Geocode one pending complaint on a background thread once the current transaction commits."""
+    transaction.on_commit(lambda: _run_in_background(complaint_id))
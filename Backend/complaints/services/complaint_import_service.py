@@ -0,0 +1,313 @@
+"""
+Complaint Import Service - bulk backfill of legacy complaints
+
+Streams rows from CSV or JSONL, validates them a chunk at a time and writes
+each chunk, complaints then their upvotes, inside one transaction: with
+COPY on PostgreSQL (ids are reserved from the sequence up front so upvotes
+can reference them) and ``bulk_create`` elsewhere. ``Complaint.save`` is
+bypassed, so the work it would
+do per row happens here in bulk: pincode extraction, geohash, and
+``upvotes_count``. Imported upvotes are dated to their complaint's
+``posted_at``, so old complaints do not look freshly voted on to the trending
+feed. GPS-only rows are queued for reverse geocoding by
+``manage.py geocode_complaints``.
+
+Recognised columns: content (required), address, pincode, latitude,
+longitude, location_type, status, posted_at, posted_by (username),
+department (id or name), is_anonymous, upvoters (usernames; a JSON list, or
+``;``-separated in CSV).
+"""
+
+import csv
+import io
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from complaints.models import Complaint, Upvote
+from users.models import Department, ParentUser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+PINCODE_PATTERN = re.compile(r'^[1-9][0-9]{5}$')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    upvotes: int = 0
+    skipped: int = 0
+    pending_geocode: int = 0
+    department_ids: Set[int] = field(default_factory=set)
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+def read_rows(stream, fmt: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield ``(line_number, row)`` from a CSV or JSONL text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, exc
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _text(row: Dict, key: str) -> Optional[str]:
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _decimal(row: Dict, key: str, limit: int) -> Optional[Decimal]:
+    raw = _text(row, key)
+    if raw is None:
+        return None
+    try:
+        value = Decimal(raw).quantize(Decimal('0.00000001'))
+    except InvalidOperation:
+        raise RowError(f"{key} is not a number")
+    if not -limit <= value <= limit:
+        raise RowError(f"{key} out of range")
+    return value
+
+
+def _upvoters(row: Dict) -> List[str]:
+    raw = row.get('upvoters')
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        raw = raw.split(';')
+    return [str(name).strip() for name in raw if str(name).strip()]
+
+
+class ComplaintImportService:
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self._departments: Dict[str, Optional[int]] = {}
+
+    def run(self, rows: Iterable[Tuple[int, Dict]], progress=None) -> ImportStats:
+        stats = ImportStats()
+        chunk: List[Tuple[int, Dict]] = []
+        for line_number, row in rows:
+            stats.read += 1
+            chunk.append((line_number, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, stats)
+                chunk = []
+                if progress:
+                    progress(stats)
+        if chunk:
+            self._import_chunk(chunk, stats)
+            if progress:
+                progress(stats)
+        return stats
+
+    def _department_id(self, raw: Optional[str]) -> Optional[int]:
+        if raw is None:
+            return None
+        if raw not in self._departments:
+            lookup = {'pk': int(raw)} if raw.isdigit() else {'name__iexact': raw}
+            self._departments[raw] = Department.objects.filter(**lookup).values_list('pk', flat=True).first()
+        department_id = self._departments[raw]
+        if department_id is None:
+            raise RowError(f"unknown department '{raw}'")
+        return department_id
+
+    def _build(self, row: Dict, user_ids: Dict[str, int]) -> Tuple[Complaint, List[str]]:
+        if not isinstance(row, dict):
+            raise RowError(f"invalid row: {row}")
+
+        content = _text(row, 'content')
+        if not content:
+            raise RowError("content is required")
+
+        address = _text(row, 'address')
+        latitude = _decimal(row, 'latitude', 90)
+        longitude = _decimal(row, 'longitude', 180)
+        if (latitude is None) != (longitude is None):
+            raise RowError("latitude and longitude must be given together")
+        if not address and latitude is None:
+            raise RowError("either address or GPS coordinates must be provided")
+
+        pincode = _text(row, 'pincode')
+        if pincode and not PINCODE_PATTERN.match(pincode):
+            raise RowError("pincode must be 6 digits starting with 1-9")
+
+        posted_at = timezone.now()
+        raw_posted_at = _text(row, 'posted_at')
+        if raw_posted_at:
+            try:
+                posted_at = parse_datetime(raw_posted_at)
+            except ValueError:
+                posted_at = None
+            if posted_at is None:
+                raise RowError("posted_at is not an ISO 8601 datetime")
+            if timezone.is_naive(posted_at):
+                posted_at = timezone.make_aware(posted_at)
+
+        poster = _text(row, 'posted_by')
+        if poster and poster not in user_ids:
+            raise RowError(f"unknown user '{poster}'")
+
+        upvoters = _upvoters(row)
+        unknown = [name for name in upvoters if name not in user_ids]
+        if unknown:
+            raise RowError(f"unknown upvoters: {', '.join(unknown[:5])}")
+        upvoters = list(dict.fromkeys(upvoters))
+
+        location_type = _text(row, 'location_type') or ('gps' if latitude is not None else 'manual')
+        if location_type not in dict(Complaint.Location_Choice):
+            raise RowError(f"location_type must be one of {', '.join(dict(Complaint.Location_Choice))}")
+
+        complaint_status = _text(row, 'status') or 'Pending'
+        if len(complaint_status) > Complaint._meta.get_field('status').max_length:
+            raise RowError("status is too long")
+
+        complaint = Complaint(
+            content=content,
+            address=address,
+            pincode=pincode,
+            latitude=latitude,
+            longitude=longitude,
+            location_type=location_type,
+            status=complaint_status,
+            posted_at=posted_at,
+            posted_by_id=user_ids.get(poster) if poster else None,
+            assigned_to_dept_id=self._department_id(_text(row, 'department')),
+            is_anonymous=(_text(row, 'is_anonymous') or '').lower() in TRUE_VALUES,
+            upvotes_count=len(upvoters),
+            address_status=None if address else 'pending',
+        )
+        if complaint.address and not complaint.pincode:
+            complaint.pincode = complaint.extract_pincode_from_address()
+        complaint.geohash = complaint.compute_geohash()
+        return complaint, upvoters
+
+    def _import_chunk(self, chunk: List[Tuple[int, Dict]], stats: ImportStats):
+        usernames = set()
+        for _, row in chunk:
+            if isinstance(row, dict):
+                usernames.update(_upvoters(row))
+                poster = _text(row, 'posted_by')
+                if poster:
+                    usernames.add(poster)
+        user_ids = dict(ParentUser.objects.filter(username__in=usernames).values_list('username', 'pk'))
+
+        complaints: List[Complaint] = []
+        upvoters: List[List[str]] = []
+        for line_number, row in chunk:
+            try:
+                complaint, names = self._build(row, user_ids)
+            except (RowError, ValueError) as exc:
+                stats.skipped += 1
+                stats.errors.append((line_number, str(exc)))
+                continue
+            complaints.append(complaint)
+            upvoters.append(names)
+
+        if self.dry_run or not complaints:
+            stats.imported += len(complaints)
+            return
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                _allocate_ids(Complaint, complaints)
+                _copy_rows(Complaint, complaints, include_pk=True)
+            else:
+                Complaint.objects.bulk_create(complaints, batch_size=1000)
+
+            votes = [
+                Upvote(complaint_id=complaint.pk, user_id=user_ids[name], upvoted_at=complaint.posted_at)
+                for complaint, names in zip(complaints, upvoters)
+                for name in names
+            ]
+            if connection.vendor == 'postgresql':
+                _copy_rows(Upvote, votes, include_pk=False)
+            elif votes:
+                Upvote.objects.bulk_create(votes, batch_size=2000)
+                # bulk_create stamps auto_now_add fields with the current time
+                Upvote.objects.filter(complaint_id__in=[c.pk for c in complaints]).update(
+                    upvoted_at=Subquery(Complaint.objects.filter(pk=OuterRef('complaint_id')).values('posted_at')[:1])
+                )
+
+        stats.imported += len(complaints)
+        stats.upvotes += len(votes)
+        stats.pending_geocode += sum(1 for c in complaints if not c.address)
+        stats.department_ids.update(c.assigned_to_dept_id for c in complaints if c.assigned_to_dept_id)
+
+
+def _allocate_ids(model, objects):
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [table, len(objects)],
+        )
+        for obj, (pk,) in zip(objects, cursor.fetchall()):
+            obj.pk = pk
+
+
+def _copy_value(field, obj) -> str:
+    value = field.get_db_prep_save(getattr(obj, field.attname), connection)
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy_rows(model, objects, include_pk: bool):
+    """
+    Load ``objects`` with PostgreSQL COPY, which skips per-row INSERT parsing
+    and planning and is several times faster than even batched INSERTs.
+    """
+    if not objects:
+        return
+    fields = [f for f in model._meta.concrete_fields if include_pk or not f.primary_key]
+    buffer = io.StringIO()
+    for obj in objects:
+        buffer.write('\t'.join(_copy_value(f, obj) for f in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN", buffer
+        )
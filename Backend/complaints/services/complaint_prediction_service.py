@@ -8,27 +8,192 @@ Coordinates the full ML inference pipeline:
 4. Time prediction
 
 This service provides a single entry point for complaint resolution prediction.
+Weather runs concurrently with steps 1-2 (see ``complaints.ml.stage_graph``);
+non-critical steps that run out of time are replaced by a fallback so the
+pipeline returns within PREDICTION_PIPELINE_BUDGET seconds.
 """
 
+import hashlib
+import json
 import logging
-from typing import Dict, Tuple, Optional
+import os
+import threading
+from datetime import timedelta
+from typing import Dict, Optional, Sequence, Tuple
 
-from complaints.ml.road_yolo_detector import RoadYOLODetector
+from django.conf import settings
+from django.utils import timezone
+
+from complaints import single_flight
+from complaints.ml import yolo_backends
+from complaints.ml.road_yolo_detector import get_detector
 from complaints.ml.severity_pipeline import SeverityAnalysisChain
 from complaints.ml.weather_context import WeatherContextFetcher
 from complaints.ml.langchain_time_prediction import TimePredictionChain
+from complaints.ml.stage_graph import Stage, StageTimeout, run_stages
+from complaints.models import ComplaintPrediction
 
 logger = logging.getLogger(__name__)
 
+STEP_ORDER = ['yolo_detection', 'severity_analysis', 'weather_context', 'time_prediction']
+
+# seconds; the budget stays under gunicorn's 120s worker timeout
+DEFAULT_YOLO_TIMEOUT = 20.0
+DEFAULT_WEATHER_TIMEOUT = 8.0
+DEFAULT_SEVERITY_TIMEOUT = 60.0
+DEFAULT_TIME_TIMEOUT = 45.0
+DEFAULT_PIPELINE_BUDGET = 100.0
+DEFAULT_LEASE_TIMEOUT = 130.0
+DEFAULT_WAIT_TIMEOUT = 100.0
+# a prediction made without YOLO or weather is rerun after this many seconds
+DEFAULT_PARTIAL_TTL = 600.0
+NON_CRITICAL_STEPS = ('yolo_detection', 'weather_context')
+
+
+# bump when the pipeline changes in a way that invalidates stored predictions
+PIPELINE_VERSION = '2'
+
+
+def _setting(name: str, default: float) -> float:
+    return float(getattr(settings, name, default))
+
+
+def model_version() -> str:
+    """Identifies the models behind a prediction; stored predictions of other versions are not reused."""
+    configured = getattr(settings, 'PREDICTION_MODEL_VERSION', '')
+    if configured:
+        return configured
+    groq_model = os.getenv('GROQ_MODEL', 'meta-llama/llama-4-scout-17b-16e-instruct')
+    # an exported backend can differ slightly from the PyTorch weights
+    resolved = yolo_backends.resolve()
+    yolo_weights = os.path.basename(resolved[1] if resolved else yolo_backends.weights_path())
+    return f"pipeline-{PIPELINE_VERSION}:{groq_model}:{yolo_weights}"[:255]
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def is_partial(metadata: Dict) -> bool:
+    """True when an optional stage timed out or failed, so the result is missing its input."""
+    if metadata.get('timed_out_stages'):
+        return True
+    return any(
+        step.get('step') in NON_CRITICAL_STEPS and step.get('status') in ('failed', 'timeout')
+        for step in metadata.get('pipeline_steps', [])
+    )
+
 
 class ComplaintPredictionService:
+    @staticmethod
+    def apply_resolution_deadline(complaint, time_prediction: Dict):
+        """Set the complaint's resolution deadline from a fresh time prediction."""
+        # Try to get estimated days, or calculate from hours
+        estimated_days = time_prediction.get('estimated_days')
+        
+        if not estimated_days:
+            estimated_hours = time_prediction.get('estimated_hours')
+            if estimated_hours:
+                try:
+                    estimated_days = float(estimated_hours) / 24.0
+                except (ValueError, TypeError):
+                    pass
+        
+        if estimated_days:
+            try:
+                # Ensure we have a float
+                days_val = float(estimated_days)
+                # Minimum 1 day if prediction is very short but positive
+                if days_val < 1 and days_val > 0:
+                    days_val = 1
+                
+                complaint.resolution_deadline = timezone.now() + timedelta(days=days_val)
+                complaint.save()
+            except (ValueError, TypeError):
+                pass
+    
+    @classmethod
+    def predict_for_complaint(cls, complaint, image_url: str, force: bool = False,
+                              image_urls: Optional[Sequence[str]] = None) -> Tuple[ComplaintPrediction, bool]:
+        """
+        The stored prediction for the complaint's current inputs, running the
+        pipeline only when there is none (or ``force`` is set), or when the
+        stored one is partial and older than ``PREDICTION_PARTIAL_TTL``. ``image_url``
+        is the image the LLM looks at; YOLO runs over all ``image_urls``. Returns
+        ``(prediction, created)``; raises ``single_flight.InFlight`` when
+        another request is still running the pipeline after the wait.
+        """
+        category = str(complaint.assigned_to_dept)
+        description = complaint.content or ""
+        address = complaint.address or "Unknown location"
+        image_urls = [image_url] + [url for url in image_urls or [] if url != image_url]
+        lookup = {
+            'complaint': complaint,
+            'model_version': model_version(),
+            # Cloudinary URLs carry the upload version, so a replaced image gets a new URL
+            'image_fingerprint': fingerprint(*image_urls),
+            'input_fingerprint': fingerprint(category, description, address),
+        }
+        
+        def stored_prediction():
+            stored = ComplaintPrediction.objects.filter(**lookup).first()
+            if stored is None:
+                return None
+            # a YOLO or weather outage is usually transient; don't keep its result for good
+            if stored.metadata.get('partial'):
+                age = (timezone.now() - stored.updated_at).total_seconds()
+                if age > _setting('PREDICTION_PARTIAL_TTL', DEFAULT_PARTIAL_TTL):
+                    logger.info(f"Stored prediction {stored.pk} for complaint {complaint.pk} is partial, rerunning")
+                    return None
+            logger.info(f"Using stored prediction {stored.pk} for complaint {complaint.pk}")
+            return stored
+        
+        def run_pipeline():
+            severity_analysis, time_prediction, metadata = cls.predict_resolution(
+                complaint_id=complaint.id,
+                category=category,
+                description=description,
+                address=address,
+                image_url=image_url,
+                image_urls=image_urls,
+                pincode=complaint.pincode,
+                latitude=complaint.latitude,
+                longitude=complaint.longitude
+            )
+            if is_partial(metadata):
+                metadata['partial'] = True
+            prediction, _ = ComplaintPrediction.objects.update_or_create(
+                **lookup,
+                defaults={
+                    'severity_analysis': severity_analysis,
+                    'time_prediction': time_prediction,
+                    'metadata': metadata,
+                }
+            )
+            return prediction
+        
+        # Concurrent requests for the same complaint (other tabs, retries, other
+        # workers) wait for the one running the pipeline and share its result.
+        return single_flight.run(
+            f"prediction:lease:{complaint.pk}",
+            run_pipeline,
+            stored_prediction,
+            reuse=not force,
+            lease_timeout=_setting('PREDICTION_LEASE_TIMEOUT', DEFAULT_LEASE_TIMEOUT),
+            wait_timeout=_setting('PREDICTION_WAIT_TIMEOUT', DEFAULT_WAIT_TIMEOUT),
+        )
+    
     @staticmethod
     def predict_resolution(
         complaint_id: int,
         category: str,
         description: str,
         address: str,
-        image_url: str
+        image_url: str,
+        pincode: Optional[str] = None,
+        latitude=None,
+        longitude=None,
+        image_urls: Optional[Sequence[str]] = None
     ) -> Tuple[Dict, Dict, Dict]:
         
         logger.info(f"Starting ML prediction pipeline for complaint {complaint_id}")
@@ -39,42 +204,57 @@ class ComplaintPredictionService:
             'pipeline_steps': []
         }
         
-        try:
+        # Stages that ran out of time keep running in the background; their
+        # late steps must not show up next to the timeout entry.
+        steps_lock = threading.Lock()
+        abandoned = set()
+        
+        def record(step, abandon=False):
+            with steps_lock:
+                if step['step'] in abandoned:
+                    return
+                if abandon:
+                    abandoned.add(step['step'])
+                metadata['pipeline_steps'].append(step)
+        
+        def detect_road_damage():
             # Step 1: YOLO Detection (SECONDARY, only for road complaints)
             logger.info("Step 1: YOLO detection (if applicable)")
-            yolo_features = None
             
-            if category.lower() == "road":
-                try:
-                    detector = RoadYOLODetector()
-                    yolo_features = detector.detect_road_damage(image_url, category)
-                    
-                    metadata['pipeline_steps'].append({
-                        'step': 'yolo_detection',
-                        'status': 'success' if yolo_features.get('yolo_active') else 'skipped',
-                        'note': 'SECONDARY features'
-                    })
-                    
-                    logger.info(f"YOLO detection completed: {yolo_features.get('yolo_active', False)}")
-                
-                except Exception as e:
-                    logger.warning(f"YOLO detection failed (non-critical): {str(e)}")
-                    yolo_features = {'yolo_active': False, 'error': str(e)}
-                    metadata['pipeline_steps'].append({
-                        'step': 'yolo_detection',
-                        'status': 'failed',
-                        'error': str(e),
-                        'note': 'Non-critical failure'
-                    })
-            
-            else:
-                yolo_features = {'yolo_active': False, 'reason': 'not_road_category'}
-                metadata['pipeline_steps'].append({
+            if category.lower() != "road":
+                record({
                     'step': 'yolo_detection',
                     'status': 'skipped',
                     'reason': 'not_road_category'
                 })
+                return {'yolo_active': False, 'reason': 'not_road_category'}
+            
+            try:
+                # in-process, or a client of the shared model server
+                detector = get_detector()
+                # one batched YOLO run over all of the complaint's images
+                yolo_features = detector.detect_road_damage(image_urls or image_url, category)
+                
+                record({
+                    'step': 'yolo_detection',
+                    'status': 'success' if yolo_features.get('yolo_active') else 'skipped',
+                    'note': 'SECONDARY features'
+                })
+                
+                logger.info(f"YOLO detection completed: {yolo_features.get('yolo_active', False)}")
+                return yolo_features
             
+            except Exception as e:
+                logger.warning(f"YOLO detection failed (non-critical): {str(e)}")
+                record({
+                    'step': 'yolo_detection',
+                    'status': 'failed',
+                    'error': str(e),
+                    'note': 'Non-critical failure'
+                })
+                return {'yolo_active': False, 'error': str(e)}
+        
+        def analyze_severity(yolo_detection):
             # Step 2: Severity Analysis (PRIMARY, multimodal LLM)
             logger.info("Step 2: Severity analysis (PRIMARY)")
             
@@ -85,10 +265,10 @@ class ComplaintPredictionService:
                     description=description,
                     address=address,
                     image_url=image_url,
-                    yolo_features=yolo_features
+                    yolo_features=yolo_detection
                 )
                 
-                metadata['pipeline_steps'].append({
+                record({
                     'step': 'severity_analysis',
                     'status': 'success',
                     'severity_score': severity_analysis.get('severity_score'),
@@ -96,41 +276,47 @@ class ComplaintPredictionService:
                 })
                 
                 logger.info(f"Severity analysis completed: score={severity_analysis.get('severity_score')}")
+                return severity_analysis
             
             except Exception as e:
                 logger.error(f"Severity analysis failed (critical): {str(e)}")
-                metadata['pipeline_steps'].append({
+                record({
                     'step': 'severity_analysis',
                     'status': 'failed',
                     'error': str(e)
                 })
                 raise Exception(f"Critical failure in severity analysis: {str(e)}")
-            
-            # Step 3: Weather Context
+        
+        def fetch_weather():
+            # Step 3: Weather Context (independent of steps 1 and 2)
             logger.info("Step 3: Weather context fetch")
             
             try:
                 weather_fetcher = WeatherContextFetcher()
-                weather_data = weather_fetcher.fetch_weather(address)
+                weather_data = weather_fetcher.fetch_weather(
+                    address, pincode=pincode, latitude=latitude, longitude=longitude
+                )
                 
-                metadata['pipeline_steps'].append({
+                record({
                     'step': 'weather_context',
                     'status': 'success' if weather_data.get('weather_available') else 'unavailable',
                     'condition': weather_data.get('condition', 'unknown')
                 })
                 
                 logger.info(f"Weather context fetched: {weather_data.get('weather_available', False)}")
+                return weather_data
             
             except Exception as e:
                 logger.warning(f"Weather fetch failed (non-critical): {str(e)}")
-                weather_data = {'weather_available': False, 'error': str(e)}
-                metadata['pipeline_steps'].append({
+                record({
                     'step': 'weather_context',
                     'status': 'failed',
                     'error': str(e),
                     'note': 'Non-critical failure'
                 })
-            
+                return {'weather_available': False, 'error': str(e)}
+        
+        def predict_time(yolo_detection, severity_analysis, weather_context):
             # Step 4: Time Prediction
             logger.info("Step 4: Time prediction")
             
@@ -138,11 +324,11 @@ class ComplaintPredictionService:
                 time_chain = TimePredictionChain()
                 time_prediction = time_chain.predict(
                     severity_analysis=severity_analysis,
-                    yolo_features=yolo_features,
-                    weather_data=weather_data
+                    yolo_features=yolo_detection,
+                    weather_data=weather_context
                 )
                 
-                metadata['pipeline_steps'].append({
+                record({
                     'step': 'time_prediction',
                     'status': 'success',
                     'estimated_days': time_prediction.get('estimated_days'),
@@ -150,15 +336,63 @@ class ComplaintPredictionService:
                 })
                 
                 logger.info(f"Time prediction completed: {time_prediction.get('estimated_days')} days, urgency={time_prediction.get('urgency_tier')}")
+                return time_prediction
             
             except Exception as e:
                 logger.error(f"Time prediction failed (critical): {str(e)}")
-                metadata['pipeline_steps'].append({
+                record({
                     'step': 'time_prediction',
                     'status': 'failed',
                     'error': str(e)
                 })
                 raise Exception(f"Critical failure in time prediction: {str(e)}")
+        
+        def timed_out(step, fallback):
+            def on_timeout():
+                logger.warning(f"{step} timed out (non-critical), continuing without it")
+                record({
+                    'step': step,
+                    'status': 'timeout',
+                    'note': 'Non-critical failure'
+                }, abandon=True)
+                return fallback
+            return on_timeout
+        
+        stages = [
+            Stage('yolo_detection', detect_road_damage,
+                  timeout=_setting('PREDICTION_YOLO_TIMEOUT', DEFAULT_YOLO_TIMEOUT),
+                  on_timeout=timed_out('yolo_detection', {'yolo_active': False, 'reason': 'timeout'})),
+            Stage('weather_context', fetch_weather,
+                  timeout=_setting('PREDICTION_WEATHER_TIMEOUT', DEFAULT_WEATHER_TIMEOUT),
+                  on_timeout=timed_out('weather_context', {'weather_available': False, 'message': 'Weather fetch timed out'})),
+            Stage('severity_analysis', analyze_severity, requires=['yolo_detection'],
+                  timeout=_setting('PREDICTION_SEVERITY_TIMEOUT', DEFAULT_SEVERITY_TIMEOUT)),
+            Stage('time_prediction', predict_time, requires=['yolo_detection', 'severity_analysis', 'weather_context'],
+                  timeout=_setting('PREDICTION_TIME_TIMEOUT', DEFAULT_TIME_TIMEOUT)),
+        ]
+        
+        try:
+            try:
+                run = run_stages(stages, budget=_setting('PREDICTION_PIPELINE_BUDGET', DEFAULT_PIPELINE_BUDGET))
+            except StageTimeout as e:
+                record({
+                    'step': e.stage,
+                    'status': 'timeout',
+                    'error': str(e)
+                }, abandon=True)
+                raise Exception(f"Critical failure in {e.stage.replace('_', ' ')}: {str(e)}")
+            
+            severity_analysis = run.results['severity_analysis']
+            time_prediction = run.results['time_prediction']
+            yolo_features = run.results['yolo_detection']
+            weather_data = run.results['weather_context']
+            with steps_lock:
+                abandoned.update(STEP_ORDER)
+                metadata['pipeline_steps'].sort(key=lambda step: STEP_ORDER.index(step['step']))
+            metadata['stage_timings_ms'] = {name: round(ms, 1) for name, ms in run.timings_ms.items()}
+            metadata['wall_time_ms'] = round(run.wall_time_ms, 1)
+            if run.timed_out:
+                metadata['timed_out_stages'] = run.timed_out
             
             # Add YOLO and weather data to metadata
             metadata['yolo_features'] = yolo_features
@@ -1,7 +1,6 @@
 import logging
 from typing import Dict, Optional
 
-from complaints.ml.road_yolo_detector import RoadYOLODetector
 from complaints.ml.department_classifier import DepartmentImageClassifier
 from users.models import Department
 
@@ -29,7 +28,6 @@ class DepartmentSuggestionService:
     DEFAULT_DEPARTMENT = "Other"
 
     def __init__(self) -> None:
-        self.detector = RoadYOLODetector()
         self.image_classifier = DepartmentImageClassifier()
 
     def suggest(self, image_file, description: str = "") -> Dict:
@@ -0,0 +1,53 @@
+"""
+Lazy access to the ML services.
+
+Importing the ML modules pulls in langchain and the Groq client, which is
+most of the time a web worker spends starting up, and none of it is needed
+until a prediction or department suggestion is requested. Views and jobs get
+the services through these accessors, which import them on first use; keep
+``complaints.ml`` and these service modules out of module-level imports
+elsewhere (``test_startup_imports`` checks that).
+
+With ``ML_PRELOAD`` the WSGI module calls ``preload()`` instead, so under
+gunicorn's ``preload_app`` the master imports everything once and the
+workers share those pages copy-on-write. Models are not loaded here: torch's
+thread pools do not survive ``fork()``, so the detector is warmed up in each
+worker after it forks (see ``gunicorn.conf.py``).
+"""
+
+import importlib
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+ML_MODULES = (
+    'complaints.ml.department_classifier',
+    'complaints.ml.severity_pipeline',
+    'complaints.ml.langchain_time_prediction',
+    'complaints.ml.road_yolo_detector',
+    'complaints.services.complaint_prediction_service',
+    'complaints.services.department_suggestion_service',
+)
+
+
+def prediction_service():
+    """The ``ComplaintPredictionService`` class (its methods are all class methods)."""
+    from complaints.services.complaint_prediction_service import ComplaintPredictionService
+    return ComplaintPredictionService
+
+
+def department_suggestion_service():
+    from complaints.services.department_suggestion_service import DepartmentSuggestionService
+    return DepartmentSuggestionService()
+
+
+def preload() -> float:
+    """Import every ML module now; returns the seconds it took."""
+    started = time.perf_counter()
+    for name in ML_MODULES:
+        importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    logger.info("Preloaded ML modules in %.2fs", elapsed)
+    return elapsed
@@ -0,0 +1,210 @@
+"""
+ML Job Service - runs slow ML requests outside the web workers
+
+A prediction or department suggestion posted with ``Prefer: respond-async``
+is stored as an ``MLJob`` and answered with ``202``; the client polls
+``/complaints/jobs/<id>/`` for progress and the result. ``run_pending``
+(``manage.py run_ml_jobs --loop``) claims queued jobs one at a time, runs
+them and stores the result or error.
+
+Claiming takes a lease under ``SKIP LOCKED`` on PostgreSQL, so several
+workers never run the same job, and a job whose worker died is picked up
+again when its lease runs out, up to ``ML_JOB_MAX_ATTEMPTS`` times.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from complaints.models import ComplaintImage, MLJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+# longer than the prediction pipeline budget
+LEASE = timedelta(minutes=5)
+
+
+@dataclass
+class JobStats:
+    claimed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+
+
+def enqueue_prediction(complaint, user, force: bool = False) -> MLJob:
+    """Queue a prediction, or return the one already waiting or running for this complaint."""
+    with transaction.atomic():
+        pending = (
+            MLJob.objects
+            .select_for_update()
+            .filter(kind=MLJob.PREDICT_RESOLUTION, complaint=complaint,
+                    status__in=[MLJob.QUEUED, MLJob.RUNNING])
+            .order_by('created_at')
+            .first()
+        )
+        if pending is not None:
+            return pending
+        return MLJob.objects.create(
+            kind=MLJob.PREDICT_RESOLUTION,
+            complaint=complaint,
+            requested_by=user,
+            payload={'force': force},
+        )
+
+
+def enqueue_department_suggestion(image_file, description: str, user) -> MLJob:
+    return MLJob.objects.create(
+        kind=MLJob.SUGGEST_DEPARTMENT,
+        requested_by=user,
+        payload={'description': description, 'image_name': image_file.name},
+        image=image_file.read(),
+    )
+
+
+def can_view(job: MLJob, user) -> bool:
+    """
+    A prediction job is shared by everyone who asked for that complaint's
+    prediction while it was pending, so any signed-in user may follow it (the
+    synchronous endpoint answers them the same result). Department suggestions
+    carry the requester's photo and stay private to them.
+    """
+    if user.is_staff or job.requested_by_id == user.id:
+        return True
+    return job.kind == MLJob.PREDICT_RESOLUTION and job.complaint_id is not None
+
+
+def job_status(job: MLJob) -> Dict:
+    return {
+        'job_id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'complaint_id': job.complaint_id,
+        'result': job.result,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def _set_progress(job: MLJob, progress: str):
+    job.progress = progress
+    MLJob.objects.filter(pk=job.pk).update(progress=progress)
+
+
+def _run_prediction(job: MLJob) -> Dict:
+    from complaints.services import ml
+
+    ComplaintPredictionService = ml.prediction_service()
+    complaint = job.complaint
+    image_urls = [image.image.url for image in ComplaintImage.objects.filter(complaint=complaint)]
+    if not image_urls:
+        raise ValueError("Complaint must have at least one image for ML prediction")
+
+    _set_progress(job, 'running ML pipeline')
+    prediction, created = ComplaintPredictionService.predict_for_complaint(
+        complaint, image_urls[0], force=bool(job.payload.get('force')), image_urls=image_urls
+    )
+    if created:
+        ComplaintPredictionService.apply_resolution_deadline(complaint, prediction.time_prediction)
+    return {
+        'severity_analysis': prediction.severity_analysis,
+        'time_prediction': prediction.time_prediction,
+        'metadata': prediction.metadata,
+        'cached': not created,
+        'predicted_at': prediction.updated_at.isoformat(),
+        'resolution_deadline': complaint.resolution_deadline.isoformat() if complaint.resolution_deadline else None,
+    }
+
+
+def _run_department_suggestion(job: MLJob) -> Dict:
+    from complaints.services import ml
+
+    _set_progress(job, 'classifying image')
+    image_file = SimpleUploadedFile(job.payload.get('image_name') or 'image.jpg', bytes(job.image or b''))
+    suggestion = ml.department_suggestion_service().suggest(
+        image_file=image_file, description=job.payload.get('description', '')
+    )
+    return {'suggestion': suggestion}
+
+
+RUNNERS = {
+    MLJob.PREDICT_RESOLUTION: _run_prediction,
+    MLJob.SUGGEST_DEPARTMENT: _run_department_suggestion,
+}
+
+
+def _claim(now) -> Optional[MLJob]:
+    with transaction.atomic():
+        job = (
+            MLJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status=MLJob.QUEUED) | Q(status=MLJob.RUNNING, lease_until__lte=now))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = MLJob.RUNNING
+        job.progress = 'started'
+        job.attempts += 1
+        job.lease_until = now + LEASE
+        job.started_at = now
+        job.save(update_fields=['status', 'progress', 'attempts', 'lease_until', 'started_at'])
+    return job
+
+
+def _finish(job: MLJob, status: str, result: Optional[Dict] = None, error: str = ''):
+    job.status = status
+    job.progress = ''
+    job.result = result
+    job.error = error
+    job.image = None
+    job.lease_until = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'result', 'error', 'image', 'lease_until', 'finished_at'])
+
+
+def run_next() -> Optional[MLJob]:
+    """Claim and run the oldest due job. Returns it, or None when the queue is empty."""
+    job = _claim(timezone.now())
+    if job is None:
+        return None
+
+    max_attempts = int(getattr(settings, 'ML_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+    if job.attempts > max_attempts:
+        _finish(job, MLJob.FAILED, error="Job was interrupted too many times")
+        return job
+
+    try:
+        result = RUNNERS[job.kind](job)
+    except Exception as exc:
+        logger.exception("ML job %s (%s) failed", job.pk, job.kind)
+        _finish(job, MLJob.FAILED, error=str(exc))
+    else:
+        _finish(job, MLJob.SUCCEEDED, result=result)
+    return job
+
+
+def run_pending(limit: Optional[int] = None) -> JobStats:
+    """Run due jobs until the queue is empty (or ``limit`` jobs have run)."""
+    stats = JobStats()
+    while limit is None or stats.claimed < limit:
+        job = run_next()
+        if job is None:
+            break
+        stats.claimed += 1
+        if job.status == MLJob.SUCCEEDED:
+            stats.succeeded += 1
+        else:
+            stats.failed += 1
+    return stats
@@ -0,0 +1,84 @@
+"""
+Weather Prefetch Service - keeps the forecast cache warm for open complaints
+
+``WeatherContextFetcher`` caches forecasts per pincode for
+``WEATHER_CACHE_TIMEOUT`` seconds. ``prefetch_open_locations`` refreshes the
+forecast of every pincode that has an open complaint in one pass, so the
+prediction pipeline finds it cached instead of calling weatherapi.com. Run it
+more often than the cache timeout (``manage.py prefetch_weather --loop``).
+
+Each pincode is queried at the mean position of its GPS complaints, or by one
+of its addresses when none has coordinates; the requests run on a few
+threads through the shared HTTP client.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import Avg, Max
+
+from complaints.ml.weather_context import WeatherContextFetcher
+from complaints.models import Complaint
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = ['resolved', 'Resolved', 'Completed']
+DEFAULT_WORKERS = 4
+
+
+@dataclass
+class PrefetchStats:
+    locations: int = 0
+    refreshed: int = 0
+    failed: int = 0
+
+
+def open_locations() -> List[Dict]:
+    """One row per pincode with open complaints: pincode, latitude, longitude, address."""
+    return list(
+        Complaint.objects
+        .exclude(status__in=CLOSED_STATUSES)
+        .exclude(pincode__isnull=True)
+        .exclude(pincode='')
+        .values('pincode')
+        .annotate(latitude=Avg('latitude'), longitude=Avg('longitude'), address=Max('address'))
+        .order_by('pincode')
+    )
+
+
+def prefetch_open_locations(workers: int = None) -> PrefetchStats:
+    stats = PrefetchStats()
+    fetcher = WeatherContextFetcher()
+    if not fetcher.api_key:
+        return stats
+
+    locations = open_locations()
+    stats.locations = len(locations)
+    if not locations:
+        return stats
+
+    def refresh(location):
+        try:
+            return fetcher.fetch_weather(
+                location['address'] or location['pincode'],
+                pincode=location['pincode'],
+                latitude=location['latitude'],
+                longitude=location['longitude'],
+                refresh=True,
+            )
+        except Exception:
+            logger.exception("Weather prefetch for pincode %s failed", location['pincode'])
+            return {'weather_available': False}
+
+    workers = workers or int(getattr(settings, 'WEATHER_PREFETCH_WORKERS', DEFAULT_WORKERS))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for location, weather in zip(locations, pool.map(refresh, locations)):
+            if weather.get('weather_available'):
+                stats.refreshed += 1
+            else:
+                stats.failed += 1
+                logger.info("No forecast for pincode %s: %s", location['pincode'], weather.get('message'))
+    return stats
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from complaints import response_cache, trending, upvotes
+from complaints.models import Complaint, ComplaintImage, Resolution, Upvote
+from complaints.services import address_enrichment_service
+
+
+TRENDING_FIELDS = {'status', 'assigned_to_fieldworker'}
+
+
+@receiver(post_save, sender=Upvote)
+def upvote_added(sender, instance, created, **kwargs):
+    if created:
+        upvotes.adjust_upvote_count(instance.complaint_id, 1)
+        transaction.on_commit(
+            lambda: trending.safely('record_upvote', instance.complaint_id, instance.upvoted_at)
+        )
+
+
+@receiver(post_delete, sender=Upvote)
+def upvote_removed(sender, instance, **kwargs):
+    upvotes.adjust_upvote_count(instance.complaint_id, -1)
+    transaction.on_commit(
+        lambda: trending.safely('record_upvote', instance.complaint_id, instance.upvoted_at, removed=True)
+    )
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Only writes that can change trending eligibility need to touch the index.
+    if not created and update_fields is not None and not TRENDING_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(lambda: trending.safely('refresh', instance))
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    complaint_id = instance.id
+    transaction.on_commit(lambda: trending.safely('remove', complaint_id))
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_address_pending(sender, instance, **kwargs):
+    # without a geocode_complaints worker the web process fills in the address
+    if instance.address_status == address_enrichment_service.PENDING and address_enrichment_service.inline_enabled():
+        address_enrichment_service.enrich_after_commit(instance.pk)
+
+
+# Response cache invalidation: any write to a complaint or the rows shown with
+# it bumps that complaint's version, its department's, and the global one.
+
+@receiver(post_init, sender=Complaint)
+def remember_department(sender, instance, **kwargs):
+    instance._loaded_dept_id = instance.assigned_to_dept_id
+
+
+def _invalidate(complaint_id, *department_ids):
+    response_cache.bump(complaint_ids=[complaint_id], department_ids=department_ids)
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def complaint_changed(sender, instance, **kwargs):
+    _invalidate(instance.id, instance.assigned_to_dept_id, getattr(instance, '_loaded_dept_id', None))
+    instance._loaded_dept_id = instance.assigned_to_dept_id
+
+
+@receiver(post_save, sender=Upvote)
+@receiver(post_delete, sender=Upvote)
+@receiver(post_save, sender=Resolution)
+@receiver(post_delete, sender=Resolution)
+@receiver(post_save, sender=ComplaintImage)
+@receiver(post_delete, sender=ComplaintImage)
+def complaint_child_changed(sender, instance, **kwargs):
+    if sender.complaint.is_cached(instance):
+        department_id = instance.complaint.assigned_to_dept_id
+    else:
+        department_id = (
+            Complaint.objects.filter(pk=instance.complaint_id)
+            .values_list('assigned_to_dept_id', flat=True)
+            .first()
+        )
+    _invalidate(instance.complaint_id, department_id)
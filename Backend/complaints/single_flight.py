@@ -0,0 +1,118 @@
+"""
+Single-flight execution of expensive work shared by all workers.
+
+``run(key, compute, lookup)`` lets one caller per key compute a result while
+concurrent callers for the same key (in any gunicorn worker) wait for it. The
+caller that wins a lease in Redis, ``SET NX PX`` with a random token, runs
+``compute``; everyone else polls until the lease is released and then reads
+the result through ``lookup``, so ``compute`` has to store its result where
+``lookup`` finds it before returning. When no result shows up (the leader
+failed) the next waiter takes the lease and computes itself.
+
+The lease expires on its own, so a worker killed mid-computation does not
+block the key for longer than ``lease_timeout``. Without Redis the default
+cache's atomic ``add`` is used instead; if the lease store is unreachable,
+callers compute without coalescing rather than fail.
+"""
+
+import logging
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+from django.core.cache import caches
+
+from complaints import trending
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.25
+
+# KEYS: lease   ARGV: token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class InFlight(Exception):
+    """Another caller is still computing the result after the wait ran out."""
+
+    def __init__(self, key: str, waited: float):
+        super().__init__(f"{key} still in progress after {waited:.0f}s")
+        self.key = key
+        self.waited = waited
+
+
+class Lease:
+    def __init__(self, key: str, timeout: float):
+        self.key = key
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+        self.client = trending.get_redis_client()
+
+    def acquire(self) -> bool:
+        try:
+            if self.client is not None:
+                return bool(self.client.set(self.key, self.token, nx=True, px=int(self.timeout * 1000)))
+            return caches['default'].add(self.key, self.token, timeout=self.timeout)
+        except Exception as exc:
+            logger.warning("Lease %s unavailable, running without it: %s", self.key, exc)
+            return True
+
+    def held(self) -> bool:
+        try:
+            if self.client is not None:
+                return bool(self.client.exists(self.key))
+            return caches['default'].get(self.key) is not None
+        except Exception as exc:
+            logger.warning("Lease %s check failed: %s", self.key, exc)
+            return False
+
+    def release(self):
+        try:
+            if self.client is not None:
+                self.client.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+            elif caches['default'].get(self.key) == self.token:
+                caches['default'].delete(self.key)
+        except Exception as exc:
+            logger.warning("Lease %s release failed: %s", self.key, exc)
+
+
+def run(key: str, compute: Callable[[], Any], lookup: Callable[[], Optional[Any]], *,
+        lease_timeout: float, wait_timeout: float, reuse: bool = True,
+        poll_interval: float = DEFAULT_POLL_INTERVAL) -> Tuple[Any, bool]:
+    """
+    Returns ``(result, computed)``. With ``reuse=False`` an existing result is
+    ignored, but one computed by a caller we waited for is still returned.
+    Raises ``InFlight`` after ``wait_timeout`` seconds of waiting.
+    """
+    lease = Lease(key, lease_timeout)
+    started = time.monotonic()
+    waited = False
+    while True:
+        if reuse or waited:
+            result = lookup()
+            if result is not None:
+                return result, False
+
+        if lease.acquire():
+            try:
+                if waited:
+                    # the leader may have finished between lookup() and acquire()
+                    result = lookup()
+                    if result is not None:
+                        return result, False
+                return compute(), True
+            finally:
+                lease.release()
+
+        waited = True
+        while lease.held():
+            elapsed = time.monotonic() - started
+            if elapsed >= wait_timeout:
+                raise InFlight(key, elapsed)
+            time.sleep(poll_interval)
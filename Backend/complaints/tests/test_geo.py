@@ -0,0 +1,46 @@
+import pytest
+
+from complaints import geo
+from complaints.models import Complaint
+from users.models import Citizen
+
+
+def test_encode_known_cell():
+    # reference value from the original geohash.org implementation
+    assert geo.encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+
+def test_covering_cells_contain_every_corner():
+    box = (23.00, 72.50, 23.05, 72.60)
+    cells = geo.covering_cells(*box)
+    assert len(cells) <= geo.MAX_COVER_CELLS
+    for lat in (box[0], box[2]):
+        for lng in (box[1], box[3]):
+            point = geo.encode(lat, lng)
+            assert any(point.startswith(cell) for cell in cells)
+
+
+def test_haversine_known_distance():
+    # Ahmedabad to Gandhinagar is roughly 23 km as the crow flies
+    distance = geo.haversine_km(23.0225, 72.5714, 23.2156, 72.6369)
+    assert 21 < distance < 24
+
+
+def test_radius_bounds_contain_circle():
+    min_lat, min_lng, max_lat, max_lng = geo.radius_bounds(23.0, 72.5, 5)
+    assert geo.haversine_km(23.0, 72.5, max_lat, 72.5) == pytest.approx(5, rel=0.01)
+    assert geo.haversine_km(23.0, 72.5, 23.0, max_lng) >= 5 - 1e-9
+
+
+@pytest.mark.django_db
+def test_geohash_kept_in_sync_on_save():
+    poster = Citizen.objects.create_user(username='geo1', email='geo1@example.com', password='p', phone_number='9876500001')
+    comp = Complaint.objects.create(posted_by=poster, content='Pothole', address='Area 380001',
+                                    location_type='gps', latitude=23.0225, longitude=72.5714)
+    assert comp.geohash == geo.encode(23.0225, 72.5714)
+
+    comp.latitude = 19.0760
+    comp.longitude = 72.8777
+    comp.save(update_fields=['latitude', 'longitude'])
+    comp.refresh_from_db()
+    assert comp.geohash == geo.encode(19.0760, 72.8777)
@@ -0,0 +1,356 @@
+import math
+import random
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from complaints import gazetteer, geocoding, http_client
+from complaints.models import Complaint
+from complaints.services import address_enrichment_service
+from complaints.services.address_enrichment_service import enrich_pending
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, json_data=None):
+        self.status_code = status_code
+        self._json = json_data if json_data is not None else {
+            'responseCode': 200,
+            'results': [{
+                'formatted_address': 'MG Road, Bengaluru, Karnataka 560001',
+                'pincode': '560001',
+                'city': 'Bengaluru',
+                'state': 'Karnataka',
+                'district': 'Bengaluru Urban',
+            }],
+        }
+        self.text = ''
+
+    def json(self):
+        return self._json
+
+
+class FakeApi:
+    """Records rev-geocode calls; answers with queued responses, then a match."""
+
+    def __init__(self):
+        self.calls = []
+        self.retries = []
+        self.responses = []
+
+    def get(self, url, params=None, retries=None, **kwargs):
+        self.calls.append(params)
+        self.retries.append(retries)
+        return self.responses.pop(0) if self.responses else FakeResponse()
+
+    def __len__(self):
+        return len(self.calls)
+
+
+@pytest.fixture
+def api_calls(monkeypatch):
+    api = FakeApi()
+    monkeypatch.setattr(http_client, 'get', api.get)
+    monkeypatch.setattr('CPCMS.settings.MAPMYINDIA_API_KEY', 'fake_key')
+    return api
+
+
+@pytest.fixture(autouse=True)
+def geocode_caching(settings):
+    settings.GEOCODE_CACHE_TIMEOUT = 600
+    settings.GEOCODE_CACHE_PRECISION = 8
+    cache.clear()
+    geocoding.reset()
+    yield
+    cache.clear()
+    geocoding.reset()
+
+
+class TestGeocodeCache:
+    def test_nearby_points_share_one_api_call(self, api_calls):
+        first = geocoding.reverse_geocode('12.97160', '77.59460', 'k')
+        second = geocoding.reverse_geocode(12.97161, 77.59462, 'k')
+
+        assert second == first
+        assert len(api_calls) == 1
+        assert geocoding.stats()['local_hits'] == 1
+        assert geocoding.stats()['misses'] == 1
+
+    def test_shared_tier_serves_other_processes(self, api_calls):
+        geocoding.reverse_geocode(12.9716, 77.5946, 'k')
+        geocoding.local_cache.clear()  # as seen by another worker
+
+        geocoding.reverse_geocode(12.9716, 77.5946, 'k')
+
+        assert len(api_calls) == 1
+        assert geocoding.stats()['shared_hits'] == 1
+
+    def test_errors_are_not_cached(self, api_calls):
+        api_calls.responses.append(FakeResponse(status_code=503, json_data={}))
+        with pytest.raises(geocoding.GeocodeError):
+            geocoding.reverse_geocode(12.9716, 77.5946, 'k')
+
+        assert geocoding.reverse_geocode(12.9716, 77.5946, 'k')['result']['pincode'] == '560001'
+        assert len(api_calls) == 2
+        assert geocoding.stats()['errors'] == 1
+
+    def test_no_results_are_cached_briefly(self, api_calls, settings):
+        settings.GEOCODE_CACHE_NOT_FOUND_TIMEOUT = 0
+        api_calls.responses.append(FakeResponse(json_data={'responseCode': 404, 'results': []}))
+
+        assert geocoding.reverse_geocode(0.0, 0.0, 'k')['result'] is None
+        geocoding.local_cache.clear()
+        geocoding.reverse_geocode(0.0, 0.0, 'k')
+
+        assert len(api_calls) == 2
+
+    def test_lru_evicts_least_recently_used(self, api_calls, settings):
+        settings.GEOCODE_LRU_SIZE = 2
+        for lat in (10.0, 11.0, 10.0, 12.0):
+            geocoding.reverse_geocode(lat, 77.0, 'k')
+
+        assert geocoding.local_cache.get(geocoding.cache_key(10.0, 77.0)) is not geocoding._MISSING
+        assert geocoding.local_cache.get(geocoding.cache_key(11.0, 77.0)) is geocoding._MISSING
+
+    def test_disabled_cache_always_calls_api(self, api_calls, settings):
+        settings.GEOCODE_CACHE_TIMEOUT = 0
+        geocoding.reverse_geocode(12.9716, 77.5946, 'k')
+        geocoding.reverse_geocode(12.9716, 77.5946, 'k')
+        assert len(api_calls) == 2
+
+
+@pytest.mark.django_db
+class TestGeocodeCallers:
+    def test_view_and_model_share_entries(self, api_calls, client, citizen_user):
+        client.force_authenticate(user=citizen_user)
+        response = client.post(reverse('complaints:reverse-geocode'), {'latitude': '12.9716', 'longitude': '77.5946'})
+        assert response.status_code == 200
+        assert response.json()['data']['pincode'] == '560001'
+
+        complaint = Complaint.objects.create(
+            posted_by=citizen_user, content='Pothole', location_type='gps',
+            latitude='12.97160000', longitude='77.59460000',
+        )
+        enrich_pending()
+        complaint.refresh_from_db()
+
+        assert complaint.address == 'MG Road, Bengaluru, Karnataka 560001'
+        assert complaint.pincode == '560001'
+        assert len(api_calls) == 1
+        # the view's lookup is not retried
+        assert api_calls.retries == [0]
+
+    def test_background_lookup_keeps_retries(self, api_calls, citizen_user):
+        Complaint.objects.create(
+            posted_by=citizen_user, content='Pothole', location_type='gps',
+            latitude='12.97160000', longitude='77.59460000',
+        )
+        enrich_pending()
+
+        assert api_calls.retries == [None]
+
+    def test_view_reports_cached_not_found(self, api_calls, client, citizen_user):
+        api_calls.responses.append(FakeResponse(json_data={'responseCode': 404, 'results': []}))
+        client.force_authenticate(user=citizen_user)
+        url = reverse('complaints:reverse-geocode')
+
+        assert client.post(url, {'latitude': '0.0', 'longitude': '0.0'}).status_code == 404
+        assert client.post(url, {'latitude': '0.0', 'longitude': '0.0'}).status_code == 404
+        assert len(api_calls) == 1
+
+
+GAZETTEER_CSV = """circlename,officename,pincode,district,statename,latitude,longitude
+Karnataka,Bangalore G.P.O.,560001,BENGALURU URBAN,KARNATAKA,12.9767,77.5901
+Karnataka,Koramangala S.O,560034,BENGALURU URBAN,KARNATAKA,12.9352,77.6245
+Maharashtra,Colaba S.O,400005,MUMBAI,MAHARASHTRA,18.9067,72.8147
+Maharashtra,Nowhere B.O,400099,MUMBAI,MAHARASHTRA,NA,NA
+"""
+
+
+@pytest.fixture
+def gazetteer_dir(tmp_path, settings):
+    csv_path = tmp_path / 'pincodes.csv'
+    csv_path.write_text(GAZETTEER_CSV)
+    settings.GAZETTEER_PATH = str(tmp_path / 'gazetteer')
+    call_command('build_gazetteer', str(csv_path))
+    gazetteer.reset()
+    yield tmp_path / 'gazetteer'
+    gazetteer.reset()
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * gazetteer.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class TestGazetteer:
+    def test_nearest_matches_brute_force(self, tmp_path):
+        rng = random.Random(7)
+        places = [
+            (rng.uniform(8, 35), rng.uniform(68, 97), f"{100000 + i}", f"Place {i}", 'District', 'State')
+            for i in range(2000)
+        ]
+        gazetteer.build(places, tmp_path)
+        index = gazetteer.Gazetteer.load(tmp_path)
+
+        for _ in range(200):
+            lat, lng = rng.uniform(8, 35), rng.uniform(68, 97)
+            expected = min(places, key=lambda p: _haversine(lat, lng, p[0], p[1]))
+            found = index.nearest(lat, lng)
+            assert found.pincode == expected[2]
+            assert found.distance_km == pytest.approx(_haversine(lat, lng, expected[0], expected[1]), abs=0.01)
+
+    def test_build_reads_india_post_columns(self, gazetteer_dir):
+        place = gazetteer.lookup('12.9360', '77.6200')
+
+        assert len(gazetteer.get_gazetteer()) == 3
+        assert place.pincode == '560034'
+        assert place.as_address() == {
+            'address': 'Koramangala, Bengaluru Urban, Karnataka 560034',
+            'pincode': '560034',
+            'city': 'Koramangala',
+            'state': 'Karnataka',
+            'district': 'Bengaluru Urban',
+        }
+
+    def test_far_points_are_not_matched(self, gazetteer_dir):
+        assert gazetteer.lookup(0.0, 0.0) is None
+        assert gazetteer.lookup('not', 'numbers') is None
+
+    def test_missing_gazetteer(self, settings, tmp_path):
+        settings.GAZETTEER_PATH = str(tmp_path / 'missing')
+        gazetteer.reset()
+        assert gazetteer.lookup(12.97, 77.59) is None
+
+
+@pytest.mark.django_db
+class TestOfflineGeocoding:
+    def test_complaint_save_uses_gazetteer(self, gazetteer_dir, api_calls, citizen_user):
+        complaint = Complaint.objects.create(
+            posted_by=citizen_user, content='Pothole', location_type='gps',
+            latitude='18.90700000', longitude='72.81500000',
+        )
+
+        assert complaint.pincode == '400005'
+        assert complaint.address == 'Colaba, Mumbai, Maharashtra 400005'
+        assert complaint.address_status == 'enriched'
+        assert len(api_calls) == 0
+
+    def test_view_uses_gazetteer_then_falls_back(self, gazetteer_dir, api_calls, client, citizen_user):
+        client.force_authenticate(user=citizen_user)
+        url = reverse('complaints:reverse-geocode')
+
+        local = client.post(url, {'latitude': '12.9770', 'longitude': '77.5900'})
+        assert local.json()['data']['pincode'] == '560001'
+        assert len(api_calls) == 0
+
+        remote = client.post(url, {'latitude': '28.6139', 'longitude': '77.2090'})
+        assert remote.status_code == 200
+        assert len(api_calls) == 1
+
+    def test_fallback_can_be_disabled(self, gazetteer_dir, api_calls, client, citizen_user, settings):
+        settings.GEOCODE_MAPMYINDIA_FALLBACK = False
+        client.force_authenticate(user=citizen_user)
+
+        response = client.post(reverse('complaints:reverse-geocode'), {'latitude': '28.6139', 'longitude': '77.2090'})
+
+        assert response.status_code == 404
+        assert len(api_calls) == 0
+
+
+@pytest.mark.django_db
+class TestAddressEnrichment:
+    def _gps_complaint(self, user, **kwargs):
+        return Complaint.objects.create(
+            posted_by=user, content='Broken streetlight', location_type='gps',
+            latitude='12.97160000', longitude='77.59460000', **kwargs,
+        )
+
+    def test_save_does_not_call_the_api(self, api_calls, citizen_user):
+        complaint = self._gps_complaint(citizen_user)
+
+        assert complaint.address is None
+        assert complaint.address_status == 'pending'
+        assert len(api_calls) == 0
+
+    def test_web_process_enriches_after_commit(self, api_calls, citizen_user, monkeypatch, settings,
+                                               django_capture_on_commit_callbacks):
+        settings.ADDRESS_ENRICHMENT_INLINE = True
+        scheduled = []
+
+        def run_now(complaint_id):
+            scheduled.append(complaint_id)
+            address_enrichment_service.enrich_batch(1, complaint_ids=[complaint_id])
+
+        monkeypatch.setattr(address_enrichment_service, '_run_in_background', run_now)
+        other = self._gps_complaint(citizen_user)
+        with django_capture_on_commit_callbacks(execute=True):
+            complaint = self._gps_complaint(citizen_user)
+
+        assert scheduled == [complaint.pk]
+        complaint.refresh_from_db()
+        assert complaint.address_status == 'enriched'
+        other.refresh_from_db()
+        assert other.address_status == 'pending'
+
+    def test_no_inline_enrichment_with_a_worker(self, api_calls, citizen_user, monkeypatch, settings,
+                                                django_capture_on_commit_callbacks):
+        settings.ADDRESS_ENRICHMENT_INLINE = False
+        monkeypatch.setattr(address_enrichment_service, '_run_in_background', pytest.fail)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self._gps_complaint(citizen_user)
+
+        assert len(api_calls) == 0
+
+    def test_pending_rows_are_enriched_in_batches(self, api_calls, citizen_user):
+        complaints = [self._gps_complaint(citizen_user) for _ in range(3)]
+
+        stats = enrich_pending(batch_size=2)
+
+        assert (stats.claimed, stats.enriched) == (3, 3)
+        for complaint in complaints:
+            complaint.refresh_from_db()
+            assert complaint.address_status == 'enriched'
+            assert complaint.pincode == '560001'
+
+    def test_failures_back_off_then_give_up(self, api_calls, citizen_user, settings):
+        settings.ADDRESS_ENRICHMENT_MAX_ATTEMPTS = 2
+        complaint = self._gps_complaint(citizen_user)
+        api_calls.responses.extend([FakeResponse(status_code=503, json_data={})] * 2)
+
+        assert enrich_pending().retried == 1
+        complaint.refresh_from_db()
+        assert complaint.address_status == 'pending'
+        assert complaint.address_attempts == 1
+        assert complaint.address_retry_at > timezone.now()
+
+        # not due yet
+        assert enrich_pending().claimed == 0
+
+        Complaint.objects.filter(pk=complaint.pk).update(address_retry_at=timezone.now())
+        assert enrich_pending().failed == 1
+        complaint.refresh_from_db()
+        assert complaint.address_status == 'failed'
+        assert complaint.address is None
+
+    def test_address_set_meanwhile_is_kept(self, api_calls, citizen_user, monkeypatch):
+        complaint = self._gps_complaint(citizen_user)
+
+        def user_edits_first(self):
+            Complaint.objects.filter(pk=complaint.pk).update(address='Typed by user 560002', address_status=None)
+            return {'address': 'Geocoded', 'pincode': '560001'}
+
+        monkeypatch.setattr(Complaint, 'reverse_geocode', user_edits_first)
+        address_enrichment_service.enrich_pending()
+
+        complaint.refresh_from_db()
+        assert complaint.address == 'Typed by user 560002'
+
+    def test_backoff_grows_and_is_capped(self):
+        assert address_enrichment_service.backoff(1) < address_enrichment_service.backoff(3)
+        assert address_enrichment_service.backoff(50) <= address_enrichment_service.MAX_DELAY * 1.25
@@ -0,0 +1,87 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from complaints import http_client
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.clients.add(self.client_address)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.clients = set()
+    httpd.statuses = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(http_client, 'backoff', lambda attempt: 0)
+    http_client.reset_stats()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path='/'):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+class TestHttpClient:
+    def test_connections_are_reused(self, server):
+        for _ in range(5):
+            assert http_client.get(_url(server)).json() == {'ok': True}
+
+        assert len(server.clients) == 1
+
+    def test_idempotent_calls_are_retried(self, server):
+        server.statuses = [503, 502]
+
+        response = http_client.get(_url(server))
+
+        assert response.status_code == 200
+        host = http_client.stats()[f"127.0.0.1:{server.server_address[1]}"]
+        assert (host['requests'], host['retries'], host['errors']) == (3, 2, 2)
+        assert host['p95_ms'] >= host['p50_ms'] > 0
+
+    def test_last_response_is_returned_when_retries_run_out(self, server):
+        server.statuses = [503, 503, 503, 503]
+        assert http_client.get(_url(server), retries=1).status_code == 503
+        assert server.statuses == [503, 503]
+
+    def test_post_is_not_retried(self, server):
+        server.statuses = [503]
+        assert http_client.post(_url(server), json={}).status_code == 503
+        assert http_client.post(_url(server), json={}).status_code == 200
+
+    def test_connection_errors_raise_after_retries(self, monkeypatch):
+        monkeypatch.setattr(http_client, 'backoff', lambda attempt: 0)
+        http_client.reset_stats()
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            http_client.get('http://127.0.0.1:9/', retries=2, timeout=0.5)
+
+        assert http_client.stats()['127.0.0.1:9']['retries'] == 2
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = {http_client.backoff(3) for _ in range(20)}
+        assert len(delays) > 1
+        assert max(http_client.backoff(30) for _ in range(20)) <= http_client.BACKOFF_MAX
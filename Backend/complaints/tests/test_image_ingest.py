@@ -0,0 +1,105 @@
+import base64
+import io
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from complaints.ml import image_ingest
+from complaints.ml.road_yolo_detector import RoadYOLODetector
+
+
+def encoded(size, mode='RGB', color=(200, 30, 10), format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class TestDecode:
+    def test_jpeg_is_draft_decoded_but_not_below_max_size(self):
+        decoded = image_ingest.decode(encoded((4000, 3000)), max_size=640)
+
+        assert decoded.original_size == (4000, 3000)
+        assert decoded.size == (1000, 750)
+        assert decoded.scale == 0.25
+
+    def test_full_size_without_max_size(self):
+        decoded = image_ingest.decode(encoded((1200, 900)))
+
+        assert decoded.size == (1200, 900)
+        assert decoded.scale == 1.0
+
+    def test_png_is_not_drafted(self):
+        decoded = image_ingest.decode(encoded((2000, 1000), format='PNG'), max_size=640)
+
+        assert decoded.size == (2000, 1000)
+
+    def test_transparency_is_flattened_onto_white(self):
+        decoded = image_ingest.decode(encoded((10, 10), mode='RGBA', color=(0, 0, 0, 0), format='PNG'))
+
+        assert decoded.image.mode == 'RGB'
+        assert decoded.image.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_array_is_bgr_and_reused(self):
+        decoded = image_ingest.decode(encoded((8, 6), color=(255, 0, 0), format='PNG'))
+
+        array = decoded.array()
+        assert array.shape == (6, 8, 3)
+        assert array.dtype == np.uint8
+        assert tuple(array[0, 0]) == (0, 0, 255)
+        assert decoded.array() is array
+
+    def test_data_url_is_bounded_jpeg(self):
+        decoded = image_ingest.decode(encoded((3000, 2000)), max_size=image_ingest.LLM_MAX_SIZE)
+
+        url = decoded.data_url()
+        assert url.startswith('data:image/jpeg;base64,')
+        reencoded = Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1])))
+        assert max(reencoded.size) == image_ingest.LLM_MAX_SIZE
+        # encoding does not shrink the shared image
+        assert decoded.size == (3000, 2000)
+
+
+class TestReadUpload:
+    def test_django_upload(self):
+        data = encoded((20, 20))
+        upload = SimpleUploadedFile('photo.jpg', data, content_type='image/jpeg')
+        upload.read(5)
+
+        assert image_ingest.read_upload(upload) == data
+
+    def test_plain_file_object(self):
+        assert image_ingest.read_upload(io.BytesIO(b'abc')) == b'abc'
+
+
+class TestYOLOUsesDecodedImage:
+    def test_boxes_are_reported_at_original_size(self):
+        RoadYOLODetector._instance = None
+        RoadYOLODetector._model = None
+        detector = RoadYOLODetector()
+
+        def tensor(values):
+            mock_tensor = Mock()
+            mock_tensor.cpu.return_value.numpy.return_value = np.array(values, dtype=np.float32)
+            return mock_tensor
+
+        result = Mock()
+        result.boxes = MagicMock()
+        result.boxes.__len__.return_value = 1
+        result.boxes.xyxy = tensor([[10.0, 10.0, 110.0, 60.0]])
+        result.boxes.conf = tensor([0.9])
+        result.boxes.cls = tensor([4])
+        detector._model = Mock()
+        detector._model.predict.return_value = [result]
+
+        with patch('complaints.http_client.get') as mock_get:
+            mock_get.return_value.content = encoded((2560, 1920))
+            features = detector.detect_road_damage("http://example.com/image.jpg", "road")
+
+        [frame] = detector._model.predict.call_args[0][0]
+        assert frame.shape == (960, 1280, 3)
+        assert features['detections'][0]['bbox'] == [20.0, 20.0, 220.0, 120.0]
+        assert features['image_area'] == 2560 * 1920
+        assert features['damage_proportion'] == (200 * 100) / (2560 * 1920)
+        RoadYOLODetector._instance = None
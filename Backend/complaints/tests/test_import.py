@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from complaints import geo, response_cache
+from complaints.models import Complaint, Upvote
+from complaints.services.address_enrichment_service import enrich_pending
+from complaints.services.complaint_import_service import ComplaintImportService, read_rows
+from users.models import Citizen, Department
+
+
+@pytest.fixture
+def people():
+    return {
+        name: Citizen.objects.create_user(username=name, password="pw", phone_number=f"98111{i:05d}")
+        for i, name in enumerate(['asha', 'ravi', 'meera'])
+    }
+
+
+CSV_INPUT = """content,address,pincode,latitude,longitude,status,posted_at,posted_by,department,is_anonymous,upvoters
+Broken pipe,"12 Ring Road, Surat 395003",,,,Pending,2021-04-01T10:00:00,asha,Water Works,,ravi;meera
+Dark street,,,21.1702,72.8311,Escalated,,ravi,,yes,
+No location,,,,,Pending,,asha,,,
+Bad vote,Somewhere 395001,,,,,,asha,,,nobody
+"""
+
+
+@pytest.mark.django_db
+class TestComplaintImport:
+    def test_csv_rows_are_bulk_created(self, people, tmp_path):
+        department = Department.objects.create(name="Water Works")
+        scope = [response_cache.department_scope(department.pk)]
+        path = tmp_path / "legacy.csv"
+        path.write_text(CSV_INPUT)
+        err = io.StringIO()
+        version = response_cache._versions(scope)
+
+        call_command('import_complaints', str(path), stdout=io.StringIO(), stderr=err)
+
+        assert response_cache._versions(scope) != version
+
+        pipe = Complaint.objects.get(content="Broken pipe")
+        assert pipe.pincode == '395003'
+        assert pipe.assigned_to_dept.name.lower() == "water works"
+        assert pipe.posted_at.year == 2021
+        assert pipe.upvotes_count == 2
+        assert set(Upvote.objects.filter(complaint=pipe).values_list('user__username', flat=True)) == {'ravi', 'meera'}
+        # legacy votes are dated to the complaint, not to the import
+        assert {vote.upvoted_at for vote in Upvote.objects.filter(complaint=pipe)} == {pipe.posted_at}
+
+        street = Complaint.objects.get(content="Dark street")
+        assert street.location_type == 'gps'
+        assert street.address is None
+        assert street.is_anonymous is True
+        assert street.geohash == geo.encode(21.1702, 72.8311)
+
+        assert Complaint.objects.count() == 2
+        assert "line 4: either address or GPS coordinates" in err.getvalue()
+        assert "line 5: unknown upvoters: nobody" in err.getvalue()
+
+    def test_jsonl_and_dry_run(self, people):
+        lines = "\n".join([
+            json.dumps({'content': "Garbage", 'address': "Market 380001", 'upvoters': ['asha']}),
+            "not json",
+            json.dumps({'content': "Pothole", 'latitude': 23.0, 'longitude': 95.0, 'pincode': '012345'}),
+        ])
+        stats = ComplaintImportService(chunk_size=2, dry_run=True).run(read_rows(io.StringIO(lines), 'jsonl'))
+
+        assert (stats.read, stats.imported, stats.skipped) == (3, 1, 2)
+        assert not Complaint.objects.exists()
+
+        stats = ComplaintImportService(chunk_size=2).run(read_rows(io.StringIO(lines), 'jsonl'))
+        assert stats.imported == 1 and stats.upvotes == 1
+        assert Complaint.objects.get().upvotes_count == 1
+
+    def test_gps_only_rows_are_queued_for_geocoding(self, people, monkeypatch):
+        ComplaintImportService().run(read_rows(io.StringIO(CSV_INPUT), 'csv'))
+        monkeypatch.setattr(Complaint, 'reverse_geocode_mapmyindia',
+                            lambda self: {'address': "Ring Road, Surat", 'pincode': '395001'})
+
+        assert enrich_pending(batch_size=1).enriched == 1
+
+        street = Complaint.objects.get(content="Dark street")
+        assert (street.address, street.pincode) == ("Ring Road, Surat", '395001')
@@ -0,0 +1,170 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+
+from complaints.ml import llm_cache
+from complaints.ml.department_classifier import DepartmentImageClassifier
+from complaints.ml.langchain_time_prediction import TimePredictionChain
+
+
+ANSWER = json.dumps({
+    'estimated_hours': 96,
+    'estimated_days': 4,
+    'urgency_tier': 'high',
+    'key_factors': ['Pothole patching'],
+    'weather_impact': 'None',
+    'explanation': 'Crew available this week',
+})
+
+
+class FakeLLM:
+    def __init__(self, content=ANSWER, model_name='llama-test', temperature=0.3):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.content = content
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=self.content)
+
+
+class BrokenCache:
+    def get(self, *args, **kwargs):
+        raise ConnectionError("redis down")
+
+    set = get
+
+
+def parse(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {'raw_response': text}
+
+
+@pytest.fixture(autouse=True)
+def llm_cache_on(settings, tmp_path):
+    settings.LLM_CACHE_TIMEOUT = 600
+    settings.LLM_CACHE_DIR = str(tmp_path / 'llm')
+    settings.LLM_CACHE_BYPASS = False
+    cache.clear()
+    llm_cache.reset()
+    llm_cache._disk_cache = None
+    yield
+    llm_cache._disk_cache = None
+
+
+class TestCacheKey:
+    def test_same_inputs_same_key(self):
+        assert llm_cache.cache_key('m', 0.3, 'p', b'img') == llm_cache.cache_key('m', 0.3, 'p', b'img')
+
+    @pytest.mark.parametrize('changed', [
+        ('m2', 0.3, 'p', b'img'),
+        ('m', 0.7, 'p', b'img'),
+        ('m', 0.3, 'p2', b'img'),
+        ('m', 0.3, 'p', b'img2'),
+        ('m', 0.3, 'p', None),
+    ])
+    def test_any_input_changes_key(self, changed):
+        assert llm_cache.cache_key(*changed) != llm_cache.cache_key('m', 0.3, 'p', b'img')
+
+    def test_fields_are_separated(self):
+        assert llm_cache.cache_key('m', 0.3, 'ab') != llm_cache.cache_key('m', 0.3, 'a', 'b')
+
+
+class TestInvoke:
+    def test_second_identical_call_is_a_hit(self):
+        llm = FakeLLM()
+        first = llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+        second = llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+
+        assert first == second == json.loads(ANSWER)
+        assert llm.calls == 1
+        counters = llm_cache.stats()
+        assert (counters['hits'], counters['misses'], counters['stores']) == (1, 1, 1)
+        assert counters['hit_ratio'] == 0.5
+
+    def test_different_image_misses(self):
+        llm = FakeLLM()
+        llm_cache.invoke(llm, ['msg'], prompt='prompt', image=b'one', parse=parse)
+        llm_cache.invoke(llm, ['msg'], prompt='prompt', image=b'two', parse=parse)
+
+        assert llm.calls == 2
+
+    def test_bypass_skips_read_but_refreshes_entry(self):
+        llm = FakeLLM()
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+        llm.content = json.dumps({'predicted_days': 9})
+
+        assert llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse, bypass=True) == {'predicted_days': 9}
+        assert llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse) == {'predicted_days': 9}
+        assert llm.calls == 2
+        assert llm_cache.stats()['bypassed'] == 1
+
+    def test_bypass_setting(self, settings):
+        settings.LLM_CACHE_BYPASS = True
+        llm = FakeLLM()
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+
+        assert llm.calls == 2
+
+    def test_unparseable_response_is_not_cached(self):
+        llm = FakeLLM(content='not json')
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+
+        assert llm.calls == 2
+        assert llm_cache.stats()['stores'] == 0
+
+    def test_disabled_when_timeout_is_zero(self, settings):
+        settings.LLM_CACHE_TIMEOUT = 0
+        llm = FakeLLM()
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+
+        assert llm.calls == 2
+        assert llm_cache.stats()['lookups'] == 0
+
+    def test_falls_back_to_file_cache(self, monkeypatch):
+        monkeypatch.setattr(llm_cache, '_primary', BrokenCache)
+        llm = FakeLLM()
+        llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+        result = llm_cache.invoke(llm, 'prompt', prompt='prompt', parse=parse)
+
+        assert result == json.loads(ANSWER)
+        assert llm.calls == 1
+        assert llm_cache.stats()['fallbacks'] >= 2
+
+
+class TestChainUsesCache:
+    def test_time_prediction_asks_llm_once(self, monkeypatch):
+        monkeypatch.setattr(TimePredictionChain, '__init__', lambda self: None)
+        chain = TimePredictionChain()
+        chain.llm = FakeLLM()
+        severity = {'severity_score': 70, 'issue_type': 'Pothole'}
+        weather = {'weather_available': False}
+
+        first = chain.predict(severity, None, weather)
+        second = chain.predict(severity, None, weather)
+
+        assert chain.llm.calls == 1
+        assert first == second
+        assert first['estimated_hours'] == 96
+
+    @pytest.mark.parametrize('answer', ['I think it is roads, 0.8', '{"department": "Roads", "confidence": "high"}'])
+    def test_classifier_fallback_is_not_cached(self, monkeypatch, answer):
+        monkeypatch.setattr(DepartmentImageClassifier, '__init__', lambda self: None)
+        classifier = DepartmentImageClassifier()
+        classifier.llm = FakeLLM(content=answer)
+        monkeypatch.setattr(classifier, '_image_to_data_url', lambda image: 'data:image/jpeg;base64,AAAA')
+
+        first = classifier.classify_from_file(SimpleNamespace(read=lambda: b'jpeg'), "pothole")
+        classifier.classify_from_file(SimpleNamespace(read=lambda: b'jpeg'), "pothole")
+
+        assert first['success'] is True
+        assert classifier.llm.calls == 2
+        assert llm_cache.stats()['stores'] == 0
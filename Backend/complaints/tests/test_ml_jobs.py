@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+import cloudinary.uploader
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+
+from complaints.models import ComplaintImage, MLJob
+from complaints.services import ml_job_service
+from complaints.services.complaint_prediction_service import ComplaintPredictionService
+from complaints.services.department_suggestion_service import DepartmentSuggestionService
+
+
+pytestmark = pytest.mark.django_db
+
+ASYNC = {'HTTP_PREFER': 'respond-async'}
+
+
+@pytest.fixture
+def complaint_with_image(monkeypatch, test_complaint):
+    monkeypatch.setattr(cloudinary.uploader, 'upload', lambda *a, **k: {
+        "public_id": "fake_public_id", "url": "http://fake.cloudinary.com/image.jpg",
+        "version": 1234567890, "type": "upload", "resource_type": "image",
+    })
+    ComplaintImage.objects.create(
+        complaint=test_complaint,
+        image=SimpleUploadedFile("pothole.jpg", b"filecontent", content_type="image/jpeg"),
+    )
+    return test_complaint
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    calls = []
+
+    def predict_resolution(**kwargs):
+        calls.append(kwargs)
+        if kwargs.get('description') == 'explode':
+            raise RuntimeError("Critical failure in severity analysis: boom")
+        return ({'severity_score': 7}, {'estimated_days': 3}, {'pipeline_steps': []})
+
+    monkeypatch.setattr(ComplaintPredictionService, 'predict_resolution', staticmethod(predict_resolution))
+    return calls
+
+
+def _predict(client, complaint, **extra):
+    return client.post(reverse('complaints:predict-resolution', args=[complaint.id]), {}, format='json', **extra)
+
+
+class TestPredictionJobs:
+    def test_async_request_is_queued_once(self, client, citizen_user, complaint_with_image, pipeline):
+        client.force_authenticate(user=citizen_user)
+
+        first = _predict(client, complaint_with_image, **ASYNC)
+        second = _predict(client, complaint_with_image, **ASYNC)
+
+        assert first.status_code == second.status_code == 202
+        assert first.data['status'] == 'queued'
+        assert first['Location'].endswith(f"/jobs/{first.data['job_id']}/")
+        assert second.data['job_id'] == first.data['job_id']
+        assert pipeline == []
+
+    def test_worker_runs_job_and_status_reports_result(self, client, citizen_user, complaint_with_image, pipeline):
+        client.force_authenticate(user=citizen_user)
+        job_id = _predict(client, complaint_with_image, **ASYNC).data['job_id']
+
+        stats = ml_job_service.run_pending()
+
+        assert (stats.claimed, stats.succeeded) == (1, 1)
+        response = client.get(reverse('complaints:ml-job-status', args=[job_id]))
+        assert response.status_code == 200
+        assert response.data['status'] == 'succeeded'
+        assert response.data['result']['time_prediction'] == {'estimated_days': 3}
+        assert response.data['result']['resolution_deadline'] is not None
+
+
+    def test_second_requester_can_follow_shared_job(self, client, citizen_user, other_citizen_user,
+                                                    complaint_with_image, pipeline):
+        client.force_authenticate(user=citizen_user)
+        job_id = _predict(client, complaint_with_image, **ASYNC).data['job_id']
+
+        client.force_authenticate(user=other_citizen_user)
+        response = _predict(client, complaint_with_image, **ASYNC)
+        assert response.data['job_id'] == job_id
+        assert client.get(reverse('complaints:ml-job-status', args=[job_id])).status_code == 200
+
+        ml_job_service.run_pending()
+        response = client.get(reverse('complaints:ml-job-status', args=[job_id]))
+        assert response.data['status'] == 'succeeded'
+
+    def test_failed_job_reports_error(self, client, citizen_user, complaint_with_image, pipeline):
+        complaint_with_image.content = 'explode'
+        complaint_with_image.save()
+        client.force_authenticate(user=citizen_user)
+        job_id = _predict(client, complaint_with_image, **ASYNC).data['job_id']
+
+        assert ml_job_service.run_pending().failed == 1
+        job = MLJob.objects.get(id=job_id)
+        assert job.status == MLJob.FAILED
+        assert 'severity analysis' in job.error
+
+    def test_sync_requests_still_answer_directly(self, client, citizen_user, complaint_with_image, pipeline):
+        client.force_authenticate(user=citizen_user)
+        response = _predict(client, complaint_with_image)
+        assert response.status_code == 200
+        assert not MLJob.objects.exists()
+
+
+class TestJobQueue:
+    def test_abandoned_job_is_retried_then_given_up(self, complaint_with_image, citizen_user, pipeline, settings):
+        settings.ML_JOB_MAX_ATTEMPTS = 2
+        job = ml_job_service.enqueue_prediction(complaint_with_image, citizen_user)
+        MLJob.objects.filter(pk=job.pk).update(
+            status=MLJob.RUNNING, attempts=1, lease_until=timezone.now() + timedelta(minutes=1)
+        )
+        assert ml_job_service.run_next() is None
+
+        MLJob.objects.filter(pk=job.pk).update(lease_until=timezone.now() - timedelta(seconds=1))
+        assert ml_job_service.run_next().status == MLJob.SUCCEEDED
+
+        job.refresh_from_db()
+        MLJob.objects.filter(pk=job.pk).update(status=MLJob.RUNNING, lease_until=timezone.now())
+        assert ml_job_service.run_next().status == MLJob.FAILED
+
+    def test_department_suggestion_job(self, client, citizen_user, monkeypatch):
+        seen = {}
+
+        def suggest(self, image_file, description=""):
+            seen['image'] = image_file.read()
+            seen['description'] = description
+            return {'department': 'Roads', 'confidence': 0.9}
+
+        monkeypatch.setattr(DepartmentSuggestionService, '__init__', lambda self: None)
+        monkeypatch.setattr(DepartmentSuggestionService, 'suggest', suggest)
+        client.force_authenticate(user=citizen_user)
+
+        response = client.post(
+            reverse('complaints:department-suggestion'),
+            {'image': SimpleUploadedFile("road.jpg", b"jpegbytes", content_type="image/jpeg"),
+             'description': "pothole"},
+            format='multipart', **ASYNC,
+        )
+        assert response.status_code == 202
+        ml_job_service.run_pending()
+
+        job = MLJob.objects.get(id=response.data['job_id'])
+        assert job.result == {'suggestion': {'department': 'Roads', 'confidence': 0.9}}
+        assert seen == {'image': b"jpegbytes", 'description': "pothole"}
+        assert job.image is None
+
+    def test_department_suggestion_job_is_private(self, client, citizen_user, other_citizen_user):
+        job = ml_job_service.enqueue_department_suggestion(
+            SimpleUploadedFile("road.jpg", b"jpegbytes", content_type="image/jpeg"), "pothole", citizen_user
+        )
+
+        client.force_authenticate(user=other_citizen_user)
+        assert client.get(reverse('complaints:ml-job-status', args=[job.id])).status_code == 404
@@ -10,6 +10,7 @@ from unittest.mock import Mock, patch, MagicMock, mock_open
 from PIL import Image
 import io
 import base64
+import numpy as np
 
 from complaints.ml.road_yolo_detector import RoadYOLODetector, RDD_CLASS_NAMES, RDD_CLASS_DESCRIPTIONS
 from complaints.ml.severity_pipeline import SeverityAnalysisChain
@@ -77,31 +78,24 @@ class TestRoadYOLODetector:
         img.save(img_bytes, format='JPEG')
         img_bytes = img_bytes.getvalue()
         
-        # Mock YOLO results
-        mock_box1 = Mock()
-        mock_box1.xyxy = [Mock()]
-        mock_box1.xyxy[0].cpu.return_value.numpy.return_value = [100, 100, 200, 200]
-        mock_box1.conf = [Mock()]
-        mock_box1.conf[0].cpu.return_value.numpy.return_value = 0.85
-        mock_box1.cls = [Mock()]
-        mock_box1.cls[0].cpu.return_value.numpy.return_value = 4  # D20 Pothole
-        
-        mock_box2 = Mock()
-        mock_box2.xyxy = [Mock()]
-        mock_box2.xyxy[0].cpu.return_value.numpy.return_value = [300, 300, 400, 400]
-        mock_box2.conf = [Mock()]
-        mock_box2.conf[0].cpu.return_value.numpy.return_value = 0.75
-        mock_box2.cls = [Mock()]
-        mock_box2.cls[0].cpu.return_value.numpy.return_value = 0  # D00 Longitudinal Crack
+        # Mock YOLO results: one tensor per field for all boxes
+        def tensor(values):
+            mock_tensor = Mock()
+            mock_tensor.cpu.return_value.numpy.return_value = np.array(values)
+            return mock_tensor
         
         mock_result = Mock()
-        mock_result.boxes = [mock_box1, mock_box2]
+        mock_result.boxes = MagicMock()
+        mock_result.boxes.__len__.return_value = 2
+        mock_result.boxes.xyxy = tensor([[100, 100, 200, 200], [300, 300, 400, 400]])
+        mock_result.boxes.conf = tensor([0.85, 0.75])
+        mock_result.boxes.cls = tensor([4.0, 0.0])  # D20 Pothole, D00 Longitudinal Crack
         
         mock_model = Mock()
         mock_model.predict.return_value = [mock_result]
         detector._model = mock_model
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.return_value.status_code = 200
             mock_get.return_value.content = img_bytes
             mock_get.return_value.raise_for_status = Mock()
@@ -117,6 +111,72 @@ class TestRoadYOLODetector:
         assert result['damage_proportion'] > 0
         assert result['severity_hint'] in ['low', 'moderate', 'high', 'critical']
     
+    def test_detect_batches_all_images(self, detector):
+        """Test one YOLO call over every complaint image, with per-image and total features"""
+        def jpeg(size):
+            buffer = io.BytesIO()
+            Image.new('RGB', size, color='gray').save(buffer, format='JPEG')
+            return buffer.getvalue()
+        
+        def tensor(values):
+            mock_tensor = Mock()
+            mock_tensor.cpu.return_value.numpy.return_value = np.array(values, dtype=np.float32)
+            return mock_tensor
+        
+        def result(xyxy, conf, cls):
+            mock_result = Mock()
+            mock_result.boxes = MagicMock()
+            mock_result.boxes.__len__.return_value = len(conf)
+            mock_result.boxes.xyxy = tensor(xyxy)
+            mock_result.boxes.conf = tensor(conf)
+            mock_result.boxes.cls = tensor(cls)
+            return mock_result
+        
+        empty = Mock()
+        empty.boxes = None
+        mock_model = Mock()
+        mock_model.predict.return_value = [
+            result([[0, 0, 100, 100], [0, 0, 50, 50], [10, 10, 20, 20]], [0.9, 0.7, 0.5], [4, 4, 0]),
+            empty,
+            result([[0, 0, 200, 100]], [0.6], [4]),
+        ]
+        detector._model = mock_model
+        
+        contents = {
+            'http://example.com/1.jpg': jpeg((400, 300)),
+            'http://example.com/2.jpg': jpeg((200, 100)),
+            'http://example.com/3.jpg': jpeg((400, 300)),
+        }
+        
+        def fake_get(url, **kwargs):
+            response = Mock()
+            response.content = contents[url]
+            return response
+        
+        with patch('complaints.http_client.get', side_effect=fake_get):
+            result = detector.detect_road_damage(list(contents), "road")
+        
+        mock_model.predict.assert_called_once()
+        frames = mock_model.predict.call_args[0][0]
+        assert [frame.shape for frame in frames] == [(300, 400, 3), (100, 200, 3), (300, 400, 3)]
+        
+        assert result['yolo_active'] is True
+        assert result['num_images'] == 3
+        assert result['num_detections'] == 4
+        assert result['image_area'] == 400 * 300 * 2 + 200 * 100
+        assert result['total_damage_area'] == 10000 + 2500 + 100 + 20000
+        assert result['avg_confidence'] == pytest.approx(0.675)
+        assert [d['image_index'] for d in result['detections']] == [0, 0, 0, 2]
+        assert result['damage_classes'][0] == {
+            'class_code': 'D20', 'description': 'Pothole', 'count': 3, 'avg_confidence': pytest.approx(0.7333, abs=1e-4)
+        }
+        assert result['damage_classes'][1]['class_code'] == 'D00'
+        
+        assert [image['num_detections'] for image in result['images']] == [3, 0, 1]
+        assert result['images'][0]['damage_proportion'] == pytest.approx(12600 / 120000)
+        assert result['images'][1]['severity_hint'] == 'low'
+        assert 'detections' not in result['images'][0]
+    
     def test_detect_no_detections(self, detector):
         """Test detection with no damage found"""
         img = Image.new('RGB', (640, 480), color='blue')
@@ -131,7 +191,7 @@ class TestRoadYOLODetector:
         mock_model.predict.return_value = [mock_result]
         detector._model = mock_model
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.return_value.status_code = 200
             mock_get.return_value.content = img_bytes
             mock_get.return_value.raise_for_status = Mock()
@@ -148,14 +208,14 @@ class TestRoadYOLODetector:
         mock_model = Mock()
         detector._model = mock_model
         
-        with patch('requests.get', side_effect=Exception("Network error")):
+        with patch('complaints.http_client.get', side_effect=Exception("Network error")):
             result = detector.detect_road_damage("http://example.com/image.jpg", "road")
         
         assert result['yolo_active'] is False
         assert 'error' in result
     
-    def test_detect_cleanup_temp_file(self, detector):
-        """Test temporary file cleanup"""
+    def test_detect_writes_no_temp_file(self, detector):
+        """Test the image is decoded in memory and YOLO gets the pixel array"""
         img = Image.new('RGB', (640, 480))
         img_bytes = io.BytesIO()
         img.save(img_bytes, format='JPEG')
@@ -167,20 +227,17 @@ class TestRoadYOLODetector:
         mock_model.predict.return_value = [mock_result]
         detector._model = mock_model
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.return_value.content = img_bytes
             mock_get.return_value.raise_for_status = Mock()
             
             with patch('tempfile.NamedTemporaryFile') as mock_temp:
-                mock_file = Mock()
-                mock_file.name = '/tmp/test.jpg'
-                mock_temp.return_value.__enter__.return_value = mock_file
-                
-                with patch('PIL.Image.open', return_value=img):
-                    with patch('os.path.exists', return_value=True):
-                        with patch('os.unlink') as mock_unlink:
-                            result = detector.detect_road_damage("http://example.com/image.jpg", "road")
-                            mock_unlink.assert_called()
+                result = detector.detect_road_damage("http://example.com/image.jpg", "road")
+                mock_temp.assert_not_called()
+        
+        assert result['yolo_active'] is True
+        frames = mock_model.predict.call_args[0][0]
+        assert [frame.shape for frame in frames] == [(480, 640, 3)]
     
     def test_compute_severity_hint_critical(self, detector):
         """Test severity hint computation - critical"""
@@ -227,7 +284,7 @@ class TestRoadYOLODetector:
         mock_model.predict.return_value = [mock_result]
         detector._model = mock_model
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.return_value.content = img_bytes
             mock_get.return_value.raise_for_status = Mock()
             
@@ -695,7 +752,7 @@ class TestWeatherContextFetcher:
             'location': {'name': 'Test City'}
         }
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.return_value.json.return_value = mock_response_data
             mock_get.return_value.raise_for_status = Mock()
             
@@ -711,7 +768,7 @@ class TestWeatherContextFetcher:
         """Test weather fetch with request exception"""
         fetcher.api_key = 'test-key'
         
-        with patch('requests.get', side_effect=Exception("Network error")):
+        with patch('complaints.http_client.get', side_effect=Exception("Network error")):
             result = fetcher.fetch_weather("Test City")
         
         assert result['weather_available'] is False
@@ -721,7 +778,7 @@ class TestWeatherContextFetcher:
         """Test weather fetch with API error"""
         fetcher.api_key = 'test-key'
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.return_value.raise_for_status.side_effect = Exception("API error")
             
             result = fetcher.fetch_weather("Test City")
@@ -762,7 +819,7 @@ class TestWeatherContextExceptions:
         fetcher = WeatherContextFetcher()
         fetcher.api_key = 'test-key'
         
-        with patch('requests.get') as mock_get:
+        with patch('complaints.http_client.get') as mock_get:
             mock_get.side_effect = requests.exceptions.RequestException("Network error")
             
             result = fetcher.fetch_weather("Test City")
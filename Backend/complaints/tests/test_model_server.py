@@ -0,0 +1,180 @@
+import io
+import socket
+import threading
+import time
+from unittest.mock import MagicMock, Mock, patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from complaints.ml import model_server
+from complaints.ml.road_yolo_detector import RemoteYOLODetector, RoadYOLODetector, get_detector
+
+
+def jpeg(size=(320, 240)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'gray').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def tensor(values):
+    mock_tensor = Mock()
+    mock_tensor.cpu.return_value.numpy.return_value = np.array(values, dtype=np.float32)
+    return mock_tensor
+
+
+class FakeModel:
+    """One pothole box per image; records the size of every batch."""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def predict(self, frames, **kwargs):
+        self.batches.append(len(frames))
+        time.sleep(self.delay)
+        results = []
+        for _ in frames:
+            result = Mock()
+            result.boxes = MagicMock()
+            result.boxes.__len__.return_value = 1
+            result.boxes.xyxy = tensor([[0, 0, 32, 24]])
+            result.boxes.conf = tensor([0.8])
+            result.boxes.cls = tensor([4])
+            results.append(result)
+        return results
+
+
+@pytest.fixture
+def detector():
+    RoadYOLODetector._instance = None
+    RoadYOLODetector._model = None
+    with patch.object(RoadYOLODetector, '_load_model', lambda self: None):
+        detector = RoadYOLODetector()
+    detector._model = FakeModel()
+    detector.backend = 'onnx'
+    yield detector
+    RoadYOLODetector._instance = None
+    RoadYOLODetector._model = None
+
+
+@pytest.fixture
+def server(detector, tmp_path, settings):
+    path = str(tmp_path / 'models.sock')
+    settings.MODEL_SERVER_SOCKET = path
+    settings.MODEL_SERVER_TIMEOUT = 5
+    settings.MODEL_SERVER_LOCAL_FALLBACK = False
+    server = model_server.ModelServer(path, detector, max_batch=8, max_wait=0.05)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def images(monkeypatch):
+    contents = {'http://example.com/a.jpg': jpeg(), 'http://example.com/b.jpg': jpeg((640, 480))}
+
+    def fake_get(url, **kwargs):
+        response = Mock()
+        response.content = contents[url]
+        return response
+
+    monkeypatch.setattr('complaints.http_client.get', fake_get)
+    return list(contents)
+
+
+class TestProtocol:
+    def test_frames_round_trip(self):
+        left, right = socket.socketpair()
+        with left, right:
+            model_server.send_frame(left, {'op': 'detect'}, [b'abc', b'', b'de'])
+            header, blobs = model_server.recv_frame(right)
+
+        assert header == {'op': 'detect'}
+        assert [bytes(blob) for blob in blobs] == [b'abc', b'', b'de']
+
+
+class TestServer:
+    def test_ping(self, server):
+        assert model_server.call({'op': 'ping'}) == {'ok': True, 'model_loaded': True, 'backend': 'onnx'}
+
+    def test_remote_detection_matches_local(self, server, detector, images):
+        remote = RemoteYOLODetector().detect_road_damage(images, 'road')
+        local = detector.detect_road_damage(images, 'road')
+
+        assert remote == local
+        assert remote['num_images'] == 2
+        assert remote['images'][1]['image_area'] == 640 * 480
+
+    def test_concurrent_requests_share_a_batch(self, server, detector, images):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(RemoteYOLODetector().detect_road_damage(images[0], 'road')))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [result['num_detections'] for result in results] == [1, 1, 1, 1]
+        assert sum(detector._model.batches) == 4
+        assert len(detector._model.batches) < 4
+
+    def test_batch_size_is_capped(self, detector):
+        batcher = model_server.MicroBatcher(detector, max_batch=2, max_wait=0.05)
+        decoded = [model_server.image_ingest.decode(jpeg())]
+        futures = [batcher.submit(decoded) for _ in range(3)]
+
+        assert all(future.result(timeout=5)['yolo_active'] for future in futures)
+        assert max(detector._model.batches) <= 2
+
+    def test_unknown_op(self, server):
+        with pytest.raises(model_server.ModelServerError, match='unknown op'):
+            model_server.call({'op': 'nope'})
+
+
+class TestClientFallback:
+    def test_server_down_skips_yolo(self, settings, tmp_path, images):
+        settings.MODEL_SERVER_SOCKET = str(tmp_path / 'missing.sock')
+        settings.MODEL_SERVER_LOCAL_FALLBACK = False
+
+        result = RemoteYOLODetector().detect_road_damage(images, 'road')
+
+        assert result['yolo_active'] is False
+        assert result['reason'] == 'model_server_unavailable'
+
+    def test_server_down_runs_locally(self, settings, tmp_path, images, detector):
+        settings.MODEL_SERVER_SOCKET = str(tmp_path / 'missing.sock')
+        settings.MODEL_SERVER_LOCAL_FALLBACK = True
+
+        result = RemoteYOLODetector().detect_road_damage(images, 'road')
+
+        assert result['yolo_active'] is True
+        assert detector._model.batches == [2]
+
+    def test_slow_server_times_out(self, server, detector, images, settings):
+        settings.MODEL_SERVER_TIMEOUT = 0.2
+        detector._model.delay = 1.0
+
+        result = RemoteYOLODetector().detect_road_damage(images[0], 'road')
+
+        assert result['reason'] == 'model_server_unavailable'
+
+    def test_non_road_is_not_sent(self, settings):
+        settings.MODEL_SERVER_SOCKET = '/nonexistent.sock'
+
+        assert RemoteYOLODetector().detect_road_damage('http://example.com/a.jpg', 'water')['reason'] == 'not_road_category'
+
+
+def test_get_detector(settings):
+    settings.MODEL_SERVER_SOCKET = ''
+    with patch.object(RoadYOLODetector, '_load_model', lambda self: None):
+        assert isinstance(get_detector(), RoadYOLODetector)
+
+    settings.MODEL_SERVER_SOCKET = '/run/cpcms/models.sock'
+    assert isinstance(get_detector(), RemoteYOLODetector)
+    RoadYOLODetector._instance = None
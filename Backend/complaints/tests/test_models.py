@@ -5,6 +5,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from users.models import Citizen, Department, Field_Worker
 import cloudinary.uploader
 from complaints.models import Complaint, ComplaintImage, Upvote, Fake_Confidence, Resolution, ResolutionImage
+from complaints.services.address_enrichment_service import enrich_pending
 
 @pytest.mark.django_db
 def test_create_complaint_with_minimal_data():
@@ -24,6 +25,10 @@ def test_create_complaint_with_gps_location(monkeypatch):
         return {'address': 'Gada Electronics, 560001', 'pincode': '560001'}
     monkeypatch.setattr(Complaint, 'reverse_geocode_mapmyindia', lambda self: fake_reverse())
     comp.save()
+    assert comp.address_status == 'pending'
+    enrich_pending()
+    comp.refresh_from_db()
+    assert comp.address_status == 'enriched'
     assert comp.address == 'Gada Electronics, 560001'
     assert comp.pincode == '560001'
 
@@ -48,17 +53,17 @@ def test_reverse_geocode_api_responses(monkeypatch):
             return self._json
 
     # success
-    monkeypatch.setattr('complaints.models.requests.get', lambda url, params, timeout=10: DummyResp(200, {'responseCode':200, 'results':[{'formatted_address':'Addr','pincode':'123456'}]}))
+    monkeypatch.setattr('complaints.http_client.get', lambda url, params, timeout=10: DummyResp(200, {'responseCode':200, 'results':[{'formatted_address':'Addr','pincode':'123456'}]}))
     r = comp.reverse_geocode_mapmyindia()
     assert r['address'] == 'Addr'
 
     # no results
-    monkeypatch.setattr('complaints.models.requests.get', lambda url, params, timeout=10: DummyResp(200, {'responseCode':404, 'results':[]}))
+    monkeypatch.setattr('complaints.http_client.get', lambda url, params, timeout=10: DummyResp(200, {'responseCode':404, 'results':[]}))
     r = comp.reverse_geocode_mapmyindia()
     assert r is None
 
     # api error
-    monkeypatch.setattr('complaints.models.requests.get', lambda url, params, timeout=10: DummyResp(500, {}, text='Server Error'))
+    monkeypatch.setattr('complaints.http_client.get', lambda url, params, timeout=10: DummyResp(500, {}, text='Server Error'))
     r = comp.reverse_geocode_mapmyindia()
     assert r is None
 
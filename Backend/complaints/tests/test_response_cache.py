@@ -0,0 +1,140 @@
+import cloudinary.uploader
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.response import Response
+
+from complaints import response_cache
+from complaints.models import Complaint, ComplaintImage, Fake_Confidence
+from users.models import Department
+
+
+@pytest.fixture
+def response_caching(settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 60
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('response_caching')
+class TestResponseCache:
+    def test_repeat_list_request_skips_database(self, client, test_complaint):
+        url = reverse('complaints:complaint-list')
+        first = client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(url)
+
+        assert second.json() == first.json()
+        assert len(queries) == 0
+
+    def test_upvote_invalidates_listings(self, client, test_complaint, other_citizen_user):
+        url = reverse('complaints:complaint-list')
+        assert client.get(url).json()[0]['upvotes_count'] == 0
+
+        client.force_authenticate(user=other_citizen_user)
+        client.post(reverse('complaints:complaint-upvote', args=[test_complaint.id]))
+        client.force_authenticate(user=None)
+
+        assert client.get(url).json()[0]['upvotes_count'] == 1
+
+    def test_status_change_invalidates_detail(self, client, test_complaint):
+        url = reverse('complaints:complaint-detail', args=[test_complaint.id])
+        assert client.get(url).json()['solved_status'] == 'unsolved'
+
+        test_complaint.status = 'In Progress'
+        test_complaint.save()
+
+        assert client.get(url).json()['solved_status'] == 'in_progress'
+
+    def test_moving_department_invalidates_both_departments(self, client, test_complaint, department):
+        other = Department.objects.create(name="Sanitation")
+        url = reverse('complaints:complaint-list')
+        assert len(client.get(url, {'department': department.id}).json()) == 1
+        assert len(client.get(url, {'department': other.id}).json()) == 0
+
+        complaint = Complaint.objects.get(pk=test_complaint.pk)
+        complaint.assigned_to_dept = other
+        complaint.save()
+
+        assert len(client.get(url, {'department': department.id}).json()) == 0
+        assert len(client.get(url, {'department': other.id}).json()) == 1
+
+    def test_image_delete_invalidates_detail(self, client, test_complaint, monkeypatch):
+        monkeypatch.setattr(cloudinary.uploader, 'upload', lambda *a, **k: {
+            "public_id": "fake_public_id", "url": "http://fake.cloudinary.com/image.jpg",
+            "version": 1234567890, "type": "upload", "resource_type": "image",
+        })
+        image = ComplaintImage.objects.create(
+            complaint=test_complaint,
+            image=SimpleUploadedFile("pothole.jpg", b"filecontent", content_type="image/jpeg"),
+        )
+        url = reverse('complaints:complaint-detail', args=[test_complaint.id])
+        assert client.get(url).json()['complaint']['thumbnail_url'] is not None
+
+        image.delete()
+
+        assert client.get(url).json()['complaint']['thumbnail_url'] is None
+
+    def test_fake_confidence_update_invalidates_detail(self, client, test_complaint, other_citizen_user):
+        url = reverse('complaints:complaint-detail', args=[test_complaint.id])
+        assert client.get(url).json()['complaint']['fake_confidence'] == 0
+
+        Fake_Confidence.objects.create(complaint=test_complaint, user=other_citizen_user, weight=1)
+        test_complaint.update_fake_confidence()
+
+        assert client.get(url).json()['complaint']['fake_confidence'] == 1
+
+    def test_query_string_order_does_not_matter(self, client, test_complaint):
+        url = reverse('complaints:complaint-list')
+        client.get(url + '?sort_by=latest&order=asc')
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url + '?order=asc&sort_by=latest')
+
+        assert len(queries) == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('response_caching')
+class TestSingleFlight:
+    def _request(self, rf):
+        from django.contrib.auth.models import AnonymousUser
+        from rest_framework.request import Request
+        request = Request(rf.get('/complaints/'))
+        request.user = AnonymousUser()
+        return request
+
+    def _lock_key(self, request):
+        key = response_cache._request_key(request, 'test', response_cache._versions([response_cache.GLOBAL]))
+        return key, f"{key}:lock"
+
+    def test_waiter_uses_result_of_the_builder(self, rf, monkeypatch):
+        request = self._request(rf)
+        key, lock_key = self._lock_key(request)
+        cache.add(lock_key, 1)
+        # the request holding the lock finishes while we wait
+        monkeypatch.setattr(response_cache.time, 'sleep', lambda _: cache.set(key, {'from': 'builder'}))
+
+        response = response_cache.cached_response(
+            request, 'test', [response_cache.GLOBAL], lambda: pytest.fail("built twice")
+        )
+
+        assert response.data == {'from': 'builder'}
+
+    def test_waiter_gives_up_and_builds(self, rf, monkeypatch):
+        request = self._request(rf)
+        key, lock_key = self._lock_key(request)
+        cache.add(lock_key, 1)
+        monkeypatch.setattr(response_cache, 'WAIT_TIMEOUT', 0)
+
+        response = response_cache.cached_response(
+            request, 'test', [response_cache.GLOBAL], lambda: Response({'from': 'fallback'})
+        )
+
+        assert response.data == {'from': 'fallback'}
@@ -253,6 +253,39 @@ class TestComplaintPredictionService:
         if yolo_step:
             assert yolo_step['status'] == 'failed'
     
+    def test_predict_resolution_runs_yolo_over_all_images(self, monkeypatch):
+        """YOLO gets every image in one call; the LLM looks at the first"""
+        seen = {}
+        
+        def mock_yolo_detect(self, image_urls, category):
+            seen['yolo'] = image_urls
+            return {'yolo_active': True, 'num_images': len(image_urls)}
+        
+        def mock_severity_analyze(self, **kwargs):
+            seen['severity'] = kwargs['image_url']
+            return {'severity_score': 60}
+        
+        monkeypatch.setattr('complaints.ml.road_yolo_detector.RoadYOLODetector.__init__', lambda self: None)
+        monkeypatch.setattr('complaints.ml.severity_pipeline.SeverityAnalysisChain.__init__', lambda self: None)
+        monkeypatch.setattr('complaints.ml.langchain_time_prediction.TimePredictionChain.__init__', lambda self: None)
+        monkeypatch.setattr('complaints.ml.road_yolo_detector.RoadYOLODetector.detect_road_damage', mock_yolo_detect)
+        monkeypatch.setattr('complaints.ml.severity_pipeline.SeverityAnalysisChain.analyze', mock_severity_analyze)
+        monkeypatch.setattr('complaints.ml.langchain_time_prediction.TimePredictionChain.predict', lambda *a, **k: {'estimated_days': 2})
+        monkeypatch.setattr('complaints.ml.weather_context.WeatherContextFetcher.fetch_weather', lambda *a, **k: {})
+        
+        urls = ["http://example.com/a.jpg", "http://example.com/b.jpg"]
+        _, _, metadata = ComplaintPredictionService.predict_resolution(
+            complaint_id=4,
+            category="Road",
+            description="Potholes",
+            address="Ring Road",
+            image_url=urls[0],
+            image_urls=urls
+        )
+        
+        assert seen == {'yolo': urls, 'severity': urls[0]}
+        assert metadata['yolo_features']['num_images'] == 2
+    
     def test_predict_resolution_severity_failure(self, monkeypatch):
         """Test behavior when severity analysis fails"""
         def mock_severity_fail(*args, **kwargs):
@@ -278,3 +311,108 @@ class TestComplaintPredictionService:
         except Exception as e:
             # Expected behavior - severity failure is critical
             assert 'LLM' in str(e) or 'error' in str(e).lower()
+
+
+class TestStageGraph:
+    """The stage runner behind ComplaintPredictionService.predict_resolution"""
+
+    def test_independent_stages_overlap(self):
+        import time as clock
+        from complaints.ml.stage_graph import Stage, run_stages
+
+        def slow(value):
+            def run(**inputs):
+                clock.sleep(0.2)
+                return value + sum(inputs.values())
+            return run
+
+        run = run_stages([
+            Stage('a', slow(1)),
+            Stage('b', slow(2)),
+            Stage('c', slow(3), requires=['a', 'b']),
+        ])
+
+        assert run.results == {'a': 1, 'b': 2, 'c': 6}
+        assert run.wall_time_ms < 550
+
+    def test_timeouts_use_fallback_or_raise(self):
+        import time as clock
+        from complaints.ml.stage_graph import Stage, StageTimeout, run_stages
+
+        run = run_stages([
+            Stage('slow', lambda: clock.sleep(1) or 'late', timeout=0.05, on_timeout=lambda: 'fallback'),
+            Stage('next', lambda slow: slow.upper(), requires=['slow']),
+        ])
+        assert run.results == {'slow': 'fallback', 'next': 'FALLBACK'}
+        assert run.timed_out == ['slow']
+
+        with pytest.raises(StageTimeout):
+            run_stages([Stage('slow', lambda: clock.sleep(1))], budget=0.05)
+
+    def test_unknown_requirement_is_rejected(self):
+        from complaints.ml.stage_graph import Stage, run_stages
+
+        with pytest.raises(ValueError):
+            run_stages([Stage('a', lambda b: b, requires=['b'])])
+
+
+class TestPredictionConcurrency:
+
+    @pytest.fixture
+    def slow_stages(self, monkeypatch):
+        import time as clock
+
+        def slow(result, delay=0.2):
+            def run(*args, **kwargs):
+                clock.sleep(delay)
+                return result
+            return run
+
+        # the chains' constructors need a Groq key
+        monkeypatch.setattr('complaints.ml.severity_pipeline.SeverityAnalysisChain.__init__', lambda self: None)
+        monkeypatch.setattr('complaints.ml.langchain_time_prediction.TimePredictionChain.__init__', lambda self: None)
+        monkeypatch.setattr('complaints.ml.severity_pipeline.SeverityAnalysisChain.analyze',
+                            slow({'severity_score': 6.0}))
+        monkeypatch.setattr('complaints.ml.langchain_time_prediction.TimePredictionChain.predict',
+                            slow({'estimated_days': 2}, delay=0))
+        return slow
+
+    def test_weather_runs_alongside_severity(self, monkeypatch, slow_stages):
+        monkeypatch.setattr('complaints.ml.weather_context.WeatherContextFetcher.fetch_weather',
+                            slow_stages({'weather_available': True}))
+
+        severity, time, metadata = ComplaintPredictionService.predict_resolution(
+            complaint_id=10, category="Water", description="Leak",
+            address="Test", image_url="http://example.com/leak.jpg"
+        )
+
+        assert metadata['wall_time_ms'] < 380
+        assert [s['step'] for s in metadata['pipeline_steps']] == [
+            'yolo_detection', 'severity_analysis', 'weather_context', 'time_prediction'
+        ]
+
+    def test_late_weather_is_dropped(self, monkeypatch, settings, slow_stages):
+        settings.PREDICTION_WEATHER_TIMEOUT = 0.05
+        monkeypatch.setattr('complaints.ml.weather_context.WeatherContextFetcher.fetch_weather',
+                            slow_stages({'weather_available': True}, delay=1))
+
+        severity, time, metadata = ComplaintPredictionService.predict_resolution(
+            complaint_id=11, category="Water", description="Leak",
+            address="Test", image_url="http://example.com/leak.jpg"
+        )
+
+        assert time == {'estimated_days': 2}
+        assert metadata['timed_out_stages'] == ['weather_context']
+        assert metadata['weather_data']['weather_available'] is False
+        weather_step = next(s for s in metadata['pipeline_steps'] if s['step'] == 'weather_context')
+        assert weather_step['status'] == 'timeout'
+
+    def test_late_severity_fails_the_pipeline(self, monkeypatch, settings, slow_stages):
+        settings.PREDICTION_SEVERITY_TIMEOUT = 0.05
+        monkeypatch.setattr('complaints.ml.weather_context.WeatherContextFetcher.fetch_weather', lambda *a, **k: {})
+
+        with pytest.raises(Exception, match="Critical failure in severity analysis"):
+            ComplaintPredictionService.predict_resolution(
+                complaint_id=12, category="Water", description="Leak",
+                address="Test", image_url="http://example.com/leak.jpg"
+            )
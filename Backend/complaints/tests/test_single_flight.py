@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from complaints import single_flight, trending
+
+
+class LeaseStore:
+    """Just enough of Redis for the lease commands and release script."""
+
+    def __init__(self):
+        self.strings = {}
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    def exists(self, key):
+        return int(key in self.strings)
+
+    def eval(self, script, numkeys, key, token):
+        assert script == single_flight.RELEASE_SCRIPT
+        if self.strings.get(key) == token:
+            del self.strings[key]
+            return 1
+        return 0
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class Results:
+    def __init__(self, delay=0.2, fail=False):
+        self.stored = {}
+        self.computed = 0
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def compute(self):
+        with self.lock:
+            self.computed += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("pipeline failed")
+        self.stored['value'] = 'result'
+        return 'result'
+
+    def lookup(self):
+        return self.stored.get('value')
+
+
+def run_concurrently(count, target):
+    outcomes = [None] * count
+
+    def call(i):
+        try:
+            outcomes[i] = target()
+        except Exception as exc:
+            outcomes[i] = exc
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+class TestSingleFlight:
+    def _run(self, results, **kwargs):
+        options = {'lease_timeout': 5, 'wait_timeout': 5, 'poll_interval': 0.01}
+        options.update(kwargs)
+        return single_flight.run('work:1', results.compute, results.lookup, **options)
+
+    def test_concurrent_callers_share_one_computation(self):
+        results = Results()
+        outcomes = run_concurrently(5, lambda: self._run(results))
+
+        assert results.computed == 1
+        assert sorted(computed for _, computed in outcomes) == [False, False, False, False, True]
+        assert {value for value, _ in outcomes} == {'result'}
+
+    def test_existing_result_is_reused_unless_refreshing(self):
+        results = Results(delay=0)
+        results.stored['value'] = 'old'
+
+        assert self._run(results) == ('old', False)
+        assert self._run(results, reuse=False) == ('result', True)
+        assert results.computed == 1
+
+    def test_waiter_takes_over_when_the_leader_fails(self):
+        results = Results(fail=True)
+        outcomes = run_concurrently(2, lambda: self._run(results))
+
+        assert results.computed == 2
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+        assert not cache.get('work:1')
+
+    def test_wait_is_bounded(self):
+        holder = single_flight.Lease('work:1', 5)
+        assert holder.acquire()
+
+        with pytest.raises(single_flight.InFlight):
+            self._run(Results(), wait_timeout=0.05)
+
+        holder.release()
+        assert self._run(Results(delay=0)) == ('result', True)
+
+    def test_redis_lease_is_only_released_by_its_owner(self, monkeypatch):
+        store = LeaseStore()
+        monkeypatch.setattr(trending, 'get_redis_client', lambda: store)
+
+        first, second = single_flight.Lease('work:1', 5), single_flight.Lease('work:1', 5)
+        assert first.acquire() and not second.acquire()
+        second.release()
+        assert first.held()
+        first.release()
+        assert not second.held()
@@ -0,0 +1,68 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+# cumulative import time of the URLconf, measured after django.setup(); about
+# 50ms on a laptop, so this only trips when something heavy is imported again
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '300'))
+HEAVY_MODULES = (
+    'langchain_core',
+    'langchain_groq',
+    'groq',
+    'torch',
+    'ultralytics',
+    'complaints.ml.department_classifier',
+    'complaints.ml.severity_pipeline',
+    'complaints.ml.langchain_time_prediction',
+    'complaints.services.complaint_prediction_service',
+    'complaints.services.department_suggestion_service',
+)
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| +(\S+)$")
+
+
+@pytest.fixture(scope='module')
+def url_imports():
+    """``{module: cumulative microseconds}`` for importing the URLconf in a fresh interpreter."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='CPCMS.settings_test', PYTHONDONTWRITEBYTECODE='1')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import django; django.setup(); import CPCMS.urls'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    imports = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        imports[match.group(2)] = int(match.group(1))
+    assert 'CPCMS.urls' in imports
+    return imports
+
+
+def test_web_startup_does_not_import_ml_stack(url_imports):
+    assert [name for name in HEAVY_MODULES if name in url_imports] == []
+
+
+def test_web_startup_import_time_budget(url_imports):
+    elapsed_ms = url_imports['CPCMS.urls'] / 1000
+
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS, (
+        f"importing the URLconf took {elapsed_ms:.0f}ms (budget {IMPORT_TIME_BUDGET_MS:.0f}ms)"
+    )
+
+
+def test_preload_imports_ml_modules(monkeypatch):
+    from complaints.services import ml
+
+    imported = []
+    monkeypatch.setattr(ml.importlib, 'import_module', imported.append)
+
+    assert ml.preload() >= 0
+    assert imported == list(ml.ML_MODULES)
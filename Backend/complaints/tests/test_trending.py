@@ -0,0 +1,178 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from complaints import trending
+from complaints.models import Complaint, Upvote
+from users.models import Citizen
+
+
+class SortedSetStore:
+    """Just enough of the redis-py client for TrendingIndex."""
+
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value).encode()
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self.zsets.pop(key, None)
+
+    def rename(self, src, dst):
+        self.zsets[dst] = self.zsets.pop(src)
+
+    def zadd(self, key, mapping, xx=False, incr=False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if xx and member not in zset:
+                continue
+            zset[member] = zset.get(member, 0.0) + score if incr else score
+
+    def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(member)
+
+    def zrevrange(self, key, start, stop):
+        ranked = sorted(self.zsets.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]), reverse=True)
+        return [member.encode() for member, _ in ranked[start:stop + 1]]
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    def __init__(self, store):
+        self.store = store
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        for name, args in self.calls:
+            getattr(self.store, name)(*args)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = SortedSetStore()
+    monkeypatch.setattr(trending, 'get_redis_client', lambda: store)
+    return store
+
+
+def _citizens(count):
+    return [
+        Citizen.objects.create_user(username=f"voter{i}", password="pw", phone_number=f"98765{i:05d}")
+        for i in range(count)
+    ]
+
+
+def _complaint(poster, content):
+    return Complaint.objects.create(posted_by=poster, content=content, address="Area 380001")
+
+
+def _upvote(user, complaint, age):
+    upvote = Upvote.objects.create(user=user, complaint=complaint)
+    Upvote.objects.filter(pk=upvote.pk).update(upvoted_at=timezone.now() - age)
+
+
+def _score(store, complaint):
+    return store.zscore(trending.TRENDING_KEY, trending._member(complaint.id))
+
+
+@pytest.mark.django_db
+class TestTrendingIndex:
+    def test_recent_upvotes_outrank_older_ones(self, store, settings):
+        settings.TRENDING_HALF_LIFE_HOURS = 24
+        voters = _citizens(3)
+        old = _complaint(voters[0], "Old pothole")
+        fresh = _complaint(voters[0], "Fresh pothole")
+        for voter in voters:
+            _upvote(voter, old, timedelta(days=5))
+        _upvote(voters[0], fresh, timedelta(hours=1))
+
+        call_command('rebuild_trending')
+
+        assert trending.get_trending_index().top_ids(2) == [fresh.id, old.id]
+        assert _score(store, old) == pytest.approx(3 * 2 ** -5, rel=1e-3)
+
+    def test_unbuilt_index_is_built_on_first_read(self, store):
+        complaint = _complaint(_citizens(1)[0], "Overflowing drain")
+
+        assert trending.get_trending_index().top_ids(3) == [complaint.id]
+        assert store.get(trending.EPOCH_KEY) is not None
+        assert store.get(trending.BUILD_LOCK_KEY) is None
+
+    def test_index_being_built_elsewhere_is_not_used(self, store):
+        store.set(trending.BUILD_LOCK_KEY, 1)
+
+        assert trending.get_trending_index().top_ids(3) is None
+
+    def test_old_epoch_is_rebuilt_before_weights_overflow(self, store, settings):
+        settings.TRENDING_HALF_LIFE_HOURS = 1
+        index = trending.get_trending_index()
+        index.rebuild()
+        old_epoch = timezone.now().timestamp() - (trending.MAX_EPOCH_HALF_LIVES + 1) * 3600
+        store.set(trending.EPOCH_KEY, repr(old_epoch))
+
+        index.top_ids(3)
+
+        assert index.epoch() > old_epoch + 3600
+
+    def test_upvote_and_status_change_update_index(self, store, client, django_capture_on_commit_callbacks):
+        voter, poster = _citizens(2)
+        complaint = _complaint(poster, "Broken streetlight")
+        trending.get_trending_index().rebuild()
+        assert _score(store, complaint) == 0
+
+        client.force_authenticate(user=voter)
+        url = reverse('complaints:complaint-upvote', args=[complaint.id])
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(url)
+        assert _score(store, complaint) == pytest.approx(1, rel=1e-3)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(url)
+        assert _score(store, complaint) == pytest.approx(0, abs=1e-6)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            complaint.status = 'In Progress'
+            complaint.save()
+        assert _score(store, complaint) is None
+
+    def test_view_serves_index_order_and_skips_stale_entries(self, store, client):
+        poster = _citizens(1)[0]
+        first = _complaint(poster, "First")
+        second = _complaint(poster, "Second")
+        stale = _complaint(poster, "Stale")
+        trending.get_trending_index().rebuild()
+        store.zadd(trending.TRENDING_KEY, {
+            trending._member(first.id): 1.0,
+            trending._member(second.id): 5.0,
+            trending._member(stale.id): 9.0,
+        })
+        # resolved behind the index's back
+        Complaint.objects.filter(pk=stale.pk).update(status='resolved')
+
+        response = client.get(reverse('complaints:trending-complaints'), {'limit': 2})
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == [second.id, first.id]
+
+    def test_rebuild_requires_redis(self):
+        from django.core.management.base import CommandError
+        with pytest.raises(CommandError):
+            call_command('rebuild_trending')
@@ -0,0 +1,289 @@
+import os
+
+import pytest
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.urls import reverse
+
+from complaints import trending, upvote_buffer
+from complaints.models import Upvote
+from users.models import Citizen
+
+
+class BufferStore:
+    """In-memory stand-in for Redis that runs the buffer's scripts in Python."""
+
+    def __init__(self):
+        self.strings = {}
+        self.sets = {}
+        self.hashes = {}
+
+    # plain commands
+    def exists(self, key):
+        return int(key in self.strings or key in self.sets or key in self.hashes)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    def get(self, key):
+        return self.strings.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            for store in (self.strings, self.sets, self.hashes):
+                store.pop(key, None)
+
+    def expire(self, key, seconds):
+        return True
+
+    def smembers(self, key):
+        return {str(m).encode() for m in self.sets.get(key, set())}
+
+    def srem(self, key, *members):
+        for member in members:
+            self.sets.get(key, set()).discard(str(member))
+
+    def scard(self, key):
+        return len(self.sets.get(key, set()))
+
+    def sismember(self, key, member):
+        return int(str(member) in self.sets.get(key, set()))
+
+    def pipeline(self, transaction=True):
+        store = self
+
+        class Pipeline:
+            calls = []
+
+            def __getattr__(self, name):
+                return lambda *args: self.calls.append(getattr(store, name)(*args))
+
+            def execute(self):
+                return list(self.calls)
+
+        pipe = Pipeline()
+        pipe.calls = []
+        return pipe
+
+    # scripts
+    def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], [str(a) for a in args[numkeys:]]
+        if script == upvote_buffer.SEED_SCRIPT:
+            if not self.exists(keys[0]):
+                self.sets.setdefault(keys[1], set()).update(argv)
+                self.strings[keys[0]] = 1
+            return 1
+        if script == upvote_buffer.TOGGLE_SCRIPT:
+            members = self.sets.setdefault(keys[0], set())
+            if argv[0] in members:
+                members.discard(argv[0])
+                state = b'0'
+            else:
+                members.add(argv[0])
+                state = b'1'
+            self.hashes.setdefault(keys[1], {})[argv[0]] = state
+            self.sets.setdefault(keys[2], set()).add(argv[1])
+            return [state, len(members)]
+        if script == upvote_buffer.CLAIM_SCRIPT:
+            if keys[1] not in self.hashes:
+                self.srem(keys[2], argv[0])
+                if keys[0] not in self.hashes:
+                    return []
+                self.hashes[keys[1]] = self.hashes.pop(keys[0])
+                self.sets.setdefault(keys[3], set()).add(argv[0])
+            flat = []
+            for field, value in self.hashes[keys[1]].items():
+                flat += [field.encode(), value]
+            return flat
+        raise AssertionError("unexpected script")
+
+
+@pytest.fixture
+def store(monkeypatch, settings):
+    settings.UPVOTE_BUFFERING = True
+    store = BufferStore()
+    monkeypatch.setattr(trending, 'get_redis_client', lambda: store)
+    return store
+
+
+@pytest.fixture
+def redis_store(monkeypatch, settings):
+    """The Redis at ``REDIS_URL``, so the Lua scripts themselves run; point it at a scratch instance."""
+    redis = pytest.importorskip('redis')
+    url = os.environ.get('REDIS_URL')
+    if not url:
+        pytest.skip("REDIS_URL is not set")
+    client = redis.Redis.from_url(url, socket_connect_timeout=1)
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip(f"no Redis reachable at {url}")
+
+    def clear():
+        keys = list(client.scan_iter('upv:*'))
+        if keys:
+            client.delete(*keys)
+
+    settings.UPVOTE_BUFFERING = True
+    monkeypatch.setattr(trending, 'get_redis_client', lambda: client)
+    clear()
+    yield client
+    clear()
+
+
+@pytest.fixture
+def response_caching(settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 60
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def voters():
+    return [
+        Citizen.objects.create_user(username=f"buf{i}", password="pw", phone_number=f"98700{i:05d}")
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestUpvoteBuffer:
+    def test_toggle_stays_out_of_database_until_flush(self, store, client, voters, test_complaint):
+        Upvote.objects.create(user=voters[0], complaint=test_complaint)
+        url = reverse('complaints:complaint-upvote', kwargs={'complaint_id': test_complaint.id})
+
+        client.force_authenticate(user=voters[1])
+        assert client.post(url).json()['likes_count'] == 2
+        client.force_authenticate(user=voters[0])
+        assert client.post(url).json()['detail'] == 'Upvote removed.'
+
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[0].id}
+
+        assert upvote_buffer.flush() == 1
+        test_complaint.refresh_from_db()
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[1].id}
+        assert test_complaint.upvotes_count == 1
+
+    def test_reads_are_served_from_buffer(self, store, client, voters, test_complaint):
+        client.force_authenticate(user=voters[0])
+        client.post(reverse('complaints:complaint-upvote', kwargs={'complaint_id': test_complaint.id}))
+
+        row = client.get(reverse('complaints:complaint-list')).json()[0]
+
+        assert row['upvotes_count'] == 1
+        assert row['is_upvoted'] is True
+
+    def test_cached_responses_show_live_counts(self, store, response_caching, client, voters, test_complaint):
+        list_url = reverse('complaints:complaint-list')
+        detail_url = reverse('complaints:complaint-detail', kwargs={'complaint_id': test_complaint.id})
+        client.force_authenticate(user=voters[0])
+        client.get(list_url)
+        client.get(detail_url)
+
+        client.post(reverse('complaints:complaint-upvote', kwargs={'complaint_id': test_complaint.id}))
+
+        row = client.get(list_url).json()[0]
+        detail = client.get(detail_url).json()['complaint']
+        assert (row['upvotes_count'], row['is_upvoted']) == (1, True)
+        assert (detail['upvotes_count'], detail['is_upvoted']) == (1, True)
+
+    def test_flush_invalidates_department_listings(self, store, monkeypatch, voters, test_complaint):
+        bumped = []
+        monkeypatch.setattr(upvote_buffer.response_cache, 'bump',
+                            lambda **scopes: bumped.append(scopes))
+        upvote_buffer.toggle(voters[0], test_complaint.id)
+
+        upvote_buffer.flush()
+
+        assert bumped == [{
+            'complaint_ids': [test_complaint.id],
+            'department_ids': [test_complaint.assigned_to_dept_id],
+        }]
+
+    def test_crashed_flush_is_replayed(self, store, monkeypatch, voters, test_complaint):
+        upvote_buffer.toggle(voters[0], test_complaint.id)
+        upvote_buffer.toggle(voters[1], test_complaint.id)
+
+        real_apply = upvote_buffer._apply
+
+        def crash(*args):
+            real_apply(*args)
+            raise RuntimeError("worker killed")
+
+        monkeypatch.setattr(upvote_buffer, '_apply', crash)
+        with pytest.raises(RuntimeError):
+            upvote_buffer.flush()
+
+        # a toggle that arrives after the crash must not overtake the in-flight batch
+        upvote_buffer.toggle(voters[0], test_complaint.id)
+        monkeypatch.setattr(upvote_buffer, '_apply', real_apply)
+        upvote_buffer.flush()
+        upvote_buffer.flush()
+
+        test_complaint.refresh_from_db()
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[1].id}
+        assert test_complaint.upvotes_count == 1
+        assert not store.smembers(upvote_buffer.INFLIGHT_KEY)
+
+    def test_deleted_voter_does_not_block_flush(self, store, voters, test_complaint):
+        upvote_buffer.toggle(voters[0], test_complaint.id)
+        upvote_buffer.toggle(voters[1], test_complaint.id)
+        voters[0].delete()
+
+        assert upvote_buffer.flush() == 1
+
+        test_complaint.refresh_from_db()
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[1].id}
+        assert test_complaint.upvotes_count == 1
+        assert upvote_buffer.toggle(voters[2], test_complaint.id) == (True, 2)
+
+    def test_rejected_batch_is_dropped(self, store, monkeypatch, voters, test_complaint):
+        upvote_buffer.toggle(voters[0], test_complaint.id)
+        real_apply = upvote_buffer._apply
+
+        def reject(*args):
+            raise IntegrityError("FOREIGN KEY constraint failed")
+
+        monkeypatch.setattr(upvote_buffer, '_apply', reject)
+        assert upvote_buffer.flush() == 0
+        assert not store.smembers(upvote_buffer.INFLIGHT_KEY)
+        assert not store.exists(upvote_buffer._loaded_key(test_complaint.id))
+
+        monkeypatch.setattr(upvote_buffer, '_apply', real_apply)
+        upvote_buffer.toggle(voters[1], test_complaint.id)
+        assert upvote_buffer.flush() == 1
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[1].id}
+
+    def test_unavailable_buffer_rejects_toggle(self, settings, client, voters, test_complaint):
+        settings.UPVOTE_BUFFERING = True
+        client.force_authenticate(user=voters[0])
+        response = client.post(reverse('complaints:complaint-upvote', kwargs={'complaint_id': test_complaint.id}))
+        assert response.status_code == 503
+        assert not Upvote.objects.exists()
+
+    def test_scripts_against_redis(self, redis_store, voters, test_complaint):
+        Upvote.objects.create(user=voters[0], complaint=test_complaint)
+
+        assert upvote_buffer.toggle(voters[1], test_complaint.id) == (True, 2)
+        assert upvote_buffer.toggle(voters[2], test_complaint.id) == (True, 3)
+        assert upvote_buffer.toggle(voters[0], test_complaint.id) == (False, 2)
+        assert upvote_buffer.toggle(voters[2], test_complaint.id) == (False, 1)
+        assert upvote_buffer._claim(redis_store, test_complaint.id) == {
+            voters[0].id: '0', voters[1].id: '1', voters[2].id: '0',
+        }
+        # the claimed batch stays in flight until it is applied
+        upvote_buffer.toggle(voters[2], test_complaint.id)
+
+        assert upvote_buffer.flush() == 1
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[1].id}
+        assert upvote_buffer.flush() == 1
+
+        test_complaint.refresh_from_db()
+        assert set(Upvote.objects.values_list('user_id', flat=True)) == {voters[1].id, voters[2].id}
+        assert test_complaint.upvotes_count == 2
+        assert not redis_store.smembers(upvote_buffer.DIRTY_KEY)
+        assert not redis_store.smembers(upvote_buffer.INFLIGHT_KEY)
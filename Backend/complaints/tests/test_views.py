@@ -16,6 +16,7 @@ from complaints.models import (
     Upvote,
     Fake_Confidence,
 )
+from complaints import http_client
 from notifications.models import Notification
 from users.models import Citizen, Government_Authority, Field_Worker, Department
 
@@ -184,7 +185,7 @@ class TestReverseGeocodeView:
     
     @pytest.fixture
     def mock_requests_get(self, monkeypatch):
-        """Mocks requests.get to return a controlled response."""
+        """Mocks the outbound HTTP client to return a controlled response."""
         class MockResponse:
             status_code = 200
             text = '{"results": [{"formatted_address": "Mock Address"}]}'
@@ -214,7 +215,7 @@ class TestReverseGeocodeView:
                 return MockResponse(status=500, json_data={"error": "failed"})
             return MockResponse()
 
-        monkeypatch.setattr(requests, "get", mock_get)
+        monkeypatch.setattr(http_client, "get", mock_get)
 
     def test_geocode_success(self, client, citizen_user, monkeypatch, mock_requests_get):
         client.force_authenticate(user=citizen_user )
@@ -448,7 +449,7 @@ class TestReverseGeocodeViewEdgeCases:
         def mock_timeout(*args, **kwargs):
             raise requests.exceptions.Timeout("Timeout")
         
-        monkeypatch.setattr(requests, 'get', mock_timeout)
+        monkeypatch.setattr(http_client, 'get', mock_timeout)
         monkeypatch.setattr(settings, 'MAPMYINDIA_API_KEY', 'fake_key')
         
         url = reverse('complaints:reverse-geocode')
@@ -519,7 +520,7 @@ class TestReverseGeocodeViewMoreEdgeCases:
         def mock_network_error(*args, **kwargs):
             raise requests.exceptions.RequestException("Network error")
         
-        monkeypatch.setattr(requests, 'get', mock_network_error)
+        monkeypatch.setattr(http_client, 'get', mock_network_error)
         monkeypatch.setattr(settings, 'MAPMYINDIA_API_KEY', 'fake_key')
         
         url = reverse('complaints:reverse-geocode')
@@ -538,7 +539,7 @@ class TestReverseGeocodeViewMoreEdgeCases:
                     "results": []
                 }
         
-        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: MockErrorResponse())
+        monkeypatch.setattr(http_client, 'get', lambda *args, **kwargs: MockErrorResponse())
         monkeypatch.setattr(settings, 'MAPMYINDIA_API_KEY', 'fake_key')
         
         url = reverse('complaints:reverse-geocode')
@@ -552,7 +553,7 @@ class TestReverseGeocodeViewMoreEdgeCases:
         def mock_unexpected_error(*args, **kwargs):
             raise Exception("Unexpected error")
         
-        monkeypatch.setattr(requests, 'get', mock_unexpected_error)
+        monkeypatch.setattr(http_client, 'get', mock_unexpected_error)
         monkeypatch.setattr(settings, 'MAPMYINDIA_API_KEY', 'fake_key')
         
         url = reverse('complaints:reverse-geocode')
@@ -1149,3 +1150,478 @@ class TestAssignComplaintNotificationHandling:
         
         # Should still assign successfully
         assert response.status_code == 200
+
+
+# Test keyset pagination on complaint listings
+class TestComplaintKeysetPagination:
+    @pytest.fixture
+    def many_complaints(self, citizen_user, department):
+        base = timezone.now()
+        complaints = []
+        for i in range(5):
+            complaints.append(Complaint.objects.create(
+                posted_by=citizen_user,
+                content=f"Paged complaint {i}",
+                address="123 Main St, Mumbai, 400001",
+                assigned_to_dept=department,
+                posted_at=base - timedelta(minutes=i),
+            ))
+        return complaints
+
+    def test_plain_request_keeps_flat_list(self, client, many_complaints):
+        url = reverse('complaints:complaint-list')
+        response = client.get(url)
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+        assert len(response.json()) == 5
+
+    def test_walks_pages_forward_and_back(self, client, many_complaints):
+        url = reverse('complaints:complaint-list')
+
+        first = client.get(url, {'page_size': 2}).json()
+        assert [c['id'] for c in first['results']] == [many_complaints[0].id, many_complaints[1].id]
+        assert first['prev'] is None
+        assert first['next']
+
+        second = client.get(url, {'page_size': 2, 'cursor': first['next']}).json()
+        assert [c['id'] for c in second['results']] == [many_complaints[2].id, many_complaints[3].id]
+        assert second['prev']
+
+        last = client.get(url, {'page_size': 2, 'cursor': second['next']}).json()
+        assert [c['id'] for c in last['results']] == [many_complaints[4].id]
+        assert last['next'] is None
+
+        back = client.get(url, {'page_size': 2, 'cursor': second['prev']}).json()
+        assert [c['id'] for c in back['results']] == [many_complaints[0].id, many_complaints[1].id]
+        assert back['prev'] is None
+
+    def test_ties_broken_by_id(self, client, citizen_user):
+        same_time = timezone.now()
+        ids = [
+            Complaint.objects.create(
+                posted_by=citizen_user, content="Tie", address="Area 400001", posted_at=same_time,
+            ).id
+            for _ in range(3)
+        ]
+        url = reverse('complaints:complaint-list')
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 1, 'sort_by': 'upvotes'}
+            if cursor:
+                params['cursor'] = cursor
+            page = client.get(url, params).json()
+            seen.extend(c['id'] for c in page['results'])
+            cursor = page['next']
+            if not cursor:
+                break
+        assert seen == sorted(ids, reverse=True)
+
+    def test_page_size_is_capped(self, client, many_complaints, settings):
+        settings.COMPLAINT_MAX_PAGE_SIZE = 3
+        url = reverse('complaints:complaint-list')
+        page = client.get(url, {'page_size': 50}).json()
+        assert page['page_size'] == 3
+        assert len(page['results']) == 3
+
+    def test_cursor_from_other_ordering_rejected(self, client, many_complaints):
+        url = reverse('complaints:complaint-list')
+        page = client.get(url, {'page_size': 2}).json()
+        response = client.get(url, {'page_size': 2, 'cursor': page['next'], 'order': 'asc'})
+        assert response.status_code == 400
+
+    def test_garbage_cursor_rejected(self, client, many_complaints):
+        url = reverse('complaints:complaint-search')
+        response = client.get(url, {'q': 'Paged', 'cursor': 'not-a-cursor'})
+        assert response.status_code == 400
+
+    def test_search_paginates(self, client, many_complaints):
+        url = reverse('complaints:complaint-search')
+        page = client.get(url, {'q': 'Paged', 'page_size': 4}).json()
+        assert len(page['results']) == 4
+        assert page['next']
+
+    def test_gov_home_paginates(self, client, gov_user, many_complaints):
+        client.force_authenticate(user=gov_user)
+        url = reverse('complaints:gov-home')
+        page = client.get(url, {'page_size': 3}).json()
+        assert len(page['results']) == 3
+        assert page['next']
+
+
+# Listing endpoints must not issue per-row queries
+class TestComplaintListQueryCount:
+    def _list_queries(self, client, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(ctx.captured_queries), response.json()
+
+    def _make_complaints(self, poster, department, field_worker, count):
+        for i in range(count):
+            complaint = Complaint.objects.create(
+                posted_by=poster,
+                content=f"Row {i}",
+                address="123 Main St, Mumbai, 400001",
+                assigned_to_dept=department,
+                assigned_to_fieldworker=field_worker,
+            )
+            Upvote.objects.create(user=poster, complaint=complaint)
+            Resolution.objects.create(
+                complaint=complaint, field_worker=field_worker,
+                description="Fixed", status='pending_approval',
+            )
+
+    def test_query_count_is_constant(self, client, citizen_user, department, field_worker_user):
+        client.force_authenticate(user=citizen_user)
+        url = reverse('complaints:complaint-list')
+
+        self._make_complaints(citizen_user, department, field_worker_user, 1)
+        small, _ = self._list_queries(client, url)
+
+        self._make_complaints(citizen_user, department, field_worker_user, 20)
+        large, data = self._list_queries(client, url)
+
+        assert large == small
+        assert len(data) == 21
+        row = data[0]
+        assert row['posted_by'] == {'username': citizen_user.username}
+        assert row['assigned_to_fieldworker'] == field_worker_user.username
+        assert row['has_pending_resolution'] is True
+        assert row['is_upvoted'] is True
+        assert row['upvotes_count'] == 1
+
+    def test_anonymous_poster_hidden(self, client, citizen_user):
+        Complaint.objects.create(
+            posted_by=citizen_user, content="Secret", address="Area 400001", is_anonymous=True,
+        )
+        _, data = self._list_queries(client, reverse('complaints:complaint-list'))
+        assert data[0]['posted_by'] is None
+
+    def test_list_serializer_refuses_unannotated_rows(self, test_complaint):
+        from complaints.serializers import ComplaintListSerializer
+
+        with pytest.raises(AttributeError):
+            ComplaintListSerializer(test_complaint).data
+
+
+# Full-text complaint search
+class TestComplaintFullTextSearch:
+    def test_matches_content_address_and_pincode(self, client, citizen_user):
+        by_content = Complaint.objects.create(posted_by=citizen_user, content="Deep pothole near school", address="Ring Road 380015")
+        by_address = Complaint.objects.create(posted_by=citizen_user, content="Broken light", address="Pothole Lane, Surat 395003")
+        by_pincode = Complaint.objects.create(posted_by=citizen_user, content="Garbage pile", address="Sector 5 560034")
+        url = reverse('complaints:complaint-search')
+
+        ids = {c['id'] for c in client.get(url, {'q': 'pothole'}).json()}
+        assert ids == {by_content.id, by_address.id}
+
+        ids = {c['id'] for c in client.get(url, {'q': '560034'}).json()}
+        assert ids == {by_pincode.id}
+
+    def test_prefix_and_all_terms_required(self, client, citizen_user):
+        both = Complaint.objects.create(posted_by=citizen_user, content="Water leakage on main road", address="Area 400001")
+        Complaint.objects.create(posted_by=citizen_user, content="Water supply stopped", address="Area 400002")
+        url = reverse('complaints:complaint-search')
+
+        ids = [c['id'] for c in client.get(url, {'q': 'leak water'}).json()]
+        assert ids == [both.id]
+
+    def test_index_follows_updates_and_deletes(self, client, citizen_user):
+        complaint = Complaint.objects.create(posted_by=citizen_user, content="Fallen tree", address="Area 400001")
+        url = reverse('complaints:complaint-search')
+
+        complaint.content = "Flooded underpass"
+        complaint.save()
+        assert client.get(url, {'q': 'tree'}).json() == []
+        assert [c['id'] for c in client.get(url, {'q': 'underpass'}).json()] == [complaint.id]
+
+        complaint.delete()
+        assert client.get(url, {'q': 'underpass'}).json() == []
+
+    def test_more_relevant_result_first(self, client, citizen_user):
+        weak = Complaint.objects.create(posted_by=citizen_user, content="Noise at night, also some garbage", address="Area 400001")
+        strong = Complaint.objects.create(posted_by=citizen_user, content="Garbage garbage garbage dumped", address="Area 400002")
+        url = reverse('complaints:complaint-search')
+
+        ids = [c['id'] for c in client.get(url, {'q': 'garbage'}).json()]
+        assert ids == [strong.id, weak.id]
+
+    def test_snippet_highlights_match(self, client, citizen_user):
+        Complaint.objects.create(posted_by=citizen_user, content="Streetlight flickering all night", address="Area 400001")
+        url = reverse('complaints:complaint-search')
+
+        row = client.get(url, {'q': 'streetlight'}).json()[0]
+        assert '<mark>Streetlight</mark>' in row['snippet']
+
+    def test_relevance_pagination(self, client, citizen_user):
+        ids = {
+            Complaint.objects.create(posted_by=citizen_user, content=f"Drain blocked {i}", address="Area 400001").id
+            for i in range(5)
+        }
+        url = reverse('complaints:complaint-search')
+
+        seen = []
+        params = {'q': 'drain', 'page_size': 2}
+        while True:
+            page = client.get(url, params).json()
+            seen.extend(c['id'] for c in page['results'])
+            if not page['next']:
+                break
+            params['cursor'] = page['next']
+        assert len(seen) == 5
+        assert set(seen) == ids
+
+    def test_punctuation_only_query_matches_nothing(self, client, test_complaint):
+        url = reverse('complaints:complaint-search')
+        assert client.get(url, {'q': '!!!'}).json() == []
+
+
+# Geohash-backed map queries
+class TestComplaintMapQueries:
+    @pytest.fixture
+    def located(self, citizen_user):
+        def make(content, lat, lng):
+            return Complaint.objects.create(
+                posted_by=citizen_user, content=content, address="Area 380001",
+                location_type='gps', latitude=lat, longitude=lng,
+            )
+        return {
+            'here': make("Here", 23.0225, 72.5714),
+            'close': make("Close", 23.0300, 72.5800),        # ~1.2 km away
+            'far': make("Far", 23.2156, 72.6369),            # Gandhinagar, ~23 km
+        }
+
+    def test_nearby_filters_by_radius_and_sorts(self, client, located):
+        url = reverse('complaints:complaint-nearby')
+        data = client.get(url, {'lat': 23.0225, 'lng': 72.5714, 'radius_km': 3}).json()
+        assert [c['id'] for c in data] == [located['here'].id, located['close'].id]
+        assert data[0]['distance_km'] == 0
+        assert 1 < data[1]['distance_km'] < 1.5
+
+    def test_nearby_requires_coordinates(self, client):
+        url = reverse('complaints:complaint-nearby')
+        assert client.get(url, {'lat': 'abc', 'lng': 72.5}).status_code == 400
+        assert client.get(url, {'lat': 23, 'lng': 72.5, 'radius_km': 500}).status_code == 400
+
+    def test_in_bounds_returns_viewport(self, client, located):
+        url = reverse('complaints:complaint-in-bounds')
+        data = client.get(url, {
+            'min_lat': 23.0, 'min_lng': 72.5, 'max_lat': 23.1, 'max_lng': 72.6,
+        }).json()
+        assert {c['id'] for c in data} == {located['here'].id, located['close'].id}
+
+    def test_in_bounds_rejects_inverted_box(self, client):
+        url = reverse('complaints:complaint-in-bounds')
+        response = client.get(url, {'min_lat': 23.1, 'min_lng': 72.5, 'max_lat': 23.0, 'max_lng': 72.6})
+        assert response.status_code == 400
+
+
+class TestAtomicUpvoteCounter:
+    def test_stale_save_keeps_counter(self, client, citizen_user, test_complaint):
+        stale = Complaint.objects.get(pk=test_complaint.pk)
+        client.force_authenticate(user=citizen_user)
+        client.post(reverse('complaints:complaint-upvote', kwargs={'complaint_id': test_complaint.id}))
+
+        stale.status = 'In Progress'
+        stale.save()
+
+        test_complaint.refresh_from_db()
+        assert test_complaint.status == 'In Progress'
+        assert test_complaint.upvotes_count == 1
+
+    def test_upvote_is_a_single_counter_update(self, client, citizen_user, test_complaint):
+        client.force_authenticate(user=citizen_user)
+        url = reverse('complaints:complaint-upvote', kwargs={'complaint_id': test_complaint.id})
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            client.post(url)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "complaints_complaint"')]
+        assert len(updates) == 1
+        assert '"upvotes_count" = ("complaints_complaint"."upvotes_count" + 1)' in updates[0]
+
+    def test_reconcile_repairs_drift(self, citizen_user, other_citizen_user, test_complaint):
+        from django.core.management import call_command
+        Upvote.objects.create(user=citizen_user, complaint=test_complaint)
+        Upvote.objects.create(user=other_citizen_user, complaint=test_complaint)
+        untouched = Complaint.objects.create(posted_by=citizen_user, content="No votes", address="Area 400002")
+        Complaint.objects.filter(pk=test_complaint.pk).update(upvotes_count=7)
+
+        call_command('reconcile_upvotes')
+
+        test_complaint.refresh_from_db()
+        untouched.refresh_from_db()
+        assert test_complaint.upvotes_count == 2
+        assert untouched.upvotes_count == 0
+
+    def test_reconcile_invalidates_department_listings(self, monkeypatch, citizen_user, test_complaint):
+        from complaints import response_cache, upvotes
+        bumped = []
+        monkeypatch.setattr(response_cache, 'bump',
+                            lambda **scopes: bumped.append({k: set(v) for k, v in scopes.items()}))
+        Upvote.objects.create(user=citizen_user, complaint=test_complaint)
+        Complaint.objects.filter(pk=test_complaint.pk).update(upvotes_count=7)
+
+        assert upvotes.reconcile_upvote_counts() == 1
+
+        assert bumped[-1] == {
+            'complaint_ids': {test_complaint.pk},
+            'department_ids': {test_complaint.assigned_to_dept_id},
+        }
+
+
+class TestDepartmentComplaintExport:
+    @pytest.fixture
+    def exported(self, citizen_user, department):
+        def make(content, status, pincode, days_ago, anonymous=False):
+            complaint = Complaint.objects.create(
+                posted_by=citizen_user, content=content, address=f"Area {pincode}",
+                assigned_to_dept=department, status=status, is_anonymous=anonymous,
+            )
+            Complaint.objects.filter(pk=complaint.pk).update(posted_at=timezone.now() - timedelta(days=days_ago))
+            return complaint
+        other = Department.objects.create(name="Elsewhere")
+        Complaint.objects.create(posted_by=citizen_user, content="Other dept", address="Area 400001",
+                                 assigned_to_dept=other)
+        return {
+            'old': make("Old, \"quoted\" pothole", 'Pending', '400001', 30),
+            'recent': make("Recent leak", 'Escalated', '400002', 1, anonymous=True),
+            'done': make("Fixed light", 'Completed', '400001', 2),
+        }
+
+    def _export(self, client, gov_user, **params):
+        client.force_authenticate(user=gov_user)
+        response = client.get(reverse('complaints:gov-export'), params)
+        body = b''.join(response.streaming_content).decode() if response.status_code == 200 else None
+        return response, body
+
+    def test_ndjson_streams_department_rows_in_id_order(self, client, gov_user, exported):
+        import json
+        response, body = self._export(client, gov_user)
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert [r['id'] for r in rows] == [exported['old'].id, exported['recent'].id, exported['done'].id]
+        assert rows[0]['posted_by'] == 'citizen'
+        assert rows[1]['posted_by'] is None
+
+    def test_filters(self, client, gov_user, exported):
+        import json
+        since = (timezone.now() - timedelta(days=7)).date().isoformat()
+        _, body = self._export(client, gov_user, status='Pending,Completed', pincode='400001', **{'from': since})
+        assert [json.loads(line)['id'] for line in body.splitlines()] == [exported['done'].id]
+
+    def test_csv(self, client, gov_user, exported):
+        import csv, io
+        response, body = self._export(client, gov_user, output='csv', status='Pending')
+        assert response['Content-Type'] == 'text/csv'
+        assert 'attachment;' in response['Content-Disposition']
+        rows = list(csv.reader(io.StringIO(body)))
+        assert rows[0][:3] == ['id', 'posted_at', 'status']
+        assert rows[1][3] == 'Old, "quoted" pothole'
+        assert len(rows) == 2
+
+    def test_rejects_bad_input(self, client, gov_user, exported):
+        assert self._export(client, gov_user, output='xml')[0].status_code == 400
+        assert self._export(client, gov_user, **{'from': '2024-13-40'})[0].status_code == 400
+        assert self._export(client, gov_user, **{'from': '2024-05-02', 'to': '2024-05-01'})[0].status_code == 400
+
+    def test_citizens_cannot_export(self, client, citizen_user):
+        client.force_authenticate(user=citizen_user)
+        assert client.get(reverse('complaints:gov-export')).status_code == 403
+
+
+class TestPredictComplaintResolutionView:
+    @pytest.fixture
+    def pipeline_runs(self, monkeypatch, mock_cloudinary_upload, test_complaint):
+        from complaints.services.complaint_prediction_service import ComplaintPredictionService
+
+        ComplaintImage.objects.create(
+            complaint=test_complaint,
+            image=SimpleUploadedFile("pothole.jpg", b"filecontent", content_type="image/jpeg"),
+        )
+        runs = []
+
+        def predict_resolution(**kwargs):
+            runs.append(kwargs)
+            return ({'severity_score': 7}, {'estimated_days': 3}, {'pipeline_steps': []})
+
+        monkeypatch.setattr(ComplaintPredictionService, 'predict_resolution', staticmethod(predict_resolution))
+        return runs
+
+    def _predict(self, client, complaint, **data):
+        return client.post(reverse('complaints:predict-resolution', args=[complaint.id]), data, format='json')
+
+    def test_prediction_is_stored_and_reused(self, client, citizen_user, test_complaint, pipeline_runs):
+        client.force_authenticate(user=citizen_user)
+
+        first = self._predict(client, test_complaint)
+        test_complaint.refresh_from_db()
+        deadline = test_complaint.resolution_deadline
+        second = self._predict(client, test_complaint)
+
+        assert first.status_code == second.status_code == 200
+        assert (first.data['cached'], second.data['cached']) == (False, True)
+        assert second.data['time_prediction'] == {'estimated_days': 3}
+        assert len(pipeline_runs) == 1
+        test_complaint.refresh_from_db()
+        assert test_complaint.resolution_deadline == deadline
+        assert test_complaint.predictions.count() == 1
+
+    def test_changed_inputs_or_force_rerun(self, client, citizen_user, test_complaint, pipeline_runs):
+        client.force_authenticate(user=citizen_user)
+        self._predict(client, test_complaint)
+
+        assert self._predict(client, test_complaint, force=True).data['cached'] is False
+        test_complaint.content = "Pothole is now much bigger"
+        test_complaint.save()
+        assert self._predict(client, test_complaint).data['cached'] is False
+
+        assert len(pipeline_runs) == 3
+        assert test_complaint.predictions.count() == 2
+
+    def test_partial_prediction_expires(self, client, citizen_user, test_complaint, pipeline_runs,
+                                        monkeypatch, settings):
+        from complaints.services.complaint_prediction_service import ComplaintPredictionService
+
+        def predict_resolution(**kwargs):
+            pipeline_runs.append(kwargs)
+            return ({'severity_score': 7}, {'estimated_days': 3}, {
+                'pipeline_steps': [{'step': 'weather_context', 'status': 'timeout'}],
+                'timed_out_stages': ['weather_context'],
+            })
+
+        monkeypatch.setattr(ComplaintPredictionService, 'predict_resolution', staticmethod(predict_resolution))
+        client.force_authenticate(user=citizen_user)
+
+        assert self._predict(client, test_complaint).data['metadata']['partial'] is True
+        assert self._predict(client, test_complaint).data['cached'] is True
+
+        settings.PREDICTION_PARTIAL_TTL = 0
+        assert self._predict(client, test_complaint).data['cached'] is False
+        assert len(pipeline_runs) == 2
+        assert test_complaint.predictions.count() == 1
+
+    def test_requires_an_image(self, client, citizen_user, test_complaint):
+        client.force_authenticate(user=citizen_user)
+        assert self._predict(client, test_complaint).status_code == 400
+
+    def test_busy_complaint_answers_503(self, client, citizen_user, test_complaint, pipeline_runs, settings):
+        from complaints.single_flight import Lease
+
+        settings.PREDICTION_WAIT_TIMEOUT = 0.05
+        client.force_authenticate(user=citizen_user)
+        lease = Lease(f"prediction:lease:{test_complaint.id}", 60)
+        assert lease.acquire()
+        try:
+            response = self._predict(client, test_complaint)
+        finally:
+            lease.release()
+
+        assert response.status_code == 503
+        assert response['Retry-After'] == '10'
+        assert pipeline_runs == []
@@ -0,0 +1,141 @@
+import io
+
+import pytest
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+
+from complaints import http_client
+from complaints.ml.weather_context import WeatherContextFetcher, location_key
+from complaints.models import Complaint
+from complaints.services.weather_prefetch_service import open_locations, prefetch_open_locations
+
+
+def forecast(name="Surat"):
+    return {
+        'location': {'name': name},
+        'current': {'condition': {'text': 'Sunny'}, 'temp_c': 31, 'humidity': 40,
+                    'wind_kph': 9, 'precip_mm': 0, 'cloud': 5},
+        'forecast': {'forecastday': [{
+            'date': '2026-10-17',
+            'day': {'maxtemp_c': 33, 'mintemp_c': 24, 'condition': {'text': 'Sunny'},
+                    'totalprecip_mm': 0, 'avghumidity': 45, 'maxwind_kph': 12},
+        }]},
+    }
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, json_data=None):
+        self.status_code = status_code
+        self._json = json_data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Server Error")
+
+    def json(self):
+        return self._json
+
+
+class FakeWeatherApi:
+    def __init__(self):
+        self.queries = []
+        self.status_code = 200
+
+    def get(self, url, params=None, **kwargs):
+        self.queries.append(params['q'])
+        return FakeResponse(self.status_code, forecast())
+
+    def __len__(self):
+        return len(self.queries)
+
+
+@pytest.fixture
+def weather_api(monkeypatch, settings):
+    settings.WEATHER_CACHE_TIMEOUT = 600
+    monkeypatch.setenv('WEATHER_API_KEY', 'test-key')
+    api = FakeWeatherApi()
+    monkeypatch.setattr(http_client, 'get', api.get)
+    cache.clear()
+    yield api
+    cache.clear()
+
+
+class TestLocationKey:
+    def test_pincode_in_address_wins(self):
+        first, _ = location_key("12 Ring Road, Surat 395003")
+        second, _ = location_key("Near station, SURAT - 395003", latitude=21.2, longitude=72.8)
+        assert first == second == "weather:v1:pin:395003"
+
+    def test_coordinates_are_rounded(self):
+        first, query = location_key("Somewhere", latitude='21.1702', longitude='72.8311')
+        second, _ = location_key("Elsewhere", latitude=21.1899, longitude=72.8012)
+        assert first == second == "weather:v1:ll:21.2,72.8"
+        assert query == "21.17,72.83"
+
+    def test_addresses_are_normalized(self):
+        assert location_key("Ring Road,  Surat")[0] == location_key("ring road surat.")[0]
+        assert location_key("Ring Road, Surat")[1] == "Ring Road, Surat"
+
+
+class TestWeatherCache:
+    def test_same_pincode_shares_one_call(self, weather_api):
+        fetcher = WeatherContextFetcher()
+        first = fetcher.fetch_weather("12 Ring Road, Surat 395003")
+        second = fetcher.fetch_weather("Market, Surat", pincode='395003')
+
+        assert first['weather_available'] is True
+        assert second == first
+        assert len(weather_api) == 1
+
+    def test_failures_are_not_cached(self, weather_api):
+        fetcher = WeatherContextFetcher()
+        weather_api.status_code = 503
+        assert fetcher.fetch_weather("Surat 395003")['weather_available'] is False
+
+        weather_api.status_code = 200
+        assert fetcher.fetch_weather("Surat 395003")['weather_available'] is True
+        assert len(weather_api) == 2
+
+    def test_refresh_bypasses_the_cache(self, weather_api):
+        fetcher = WeatherContextFetcher()
+        fetcher.fetch_weather("Surat 395003")
+        fetcher.fetch_weather("Surat 395003", refresh=True)
+        fetcher.fetch_weather("Surat 395003")
+        assert len(weather_api) == 2
+
+    def test_zero_timeout_disables_cache(self, weather_api, settings):
+        settings.WEATHER_CACHE_TIMEOUT = 0
+        fetcher = WeatherContextFetcher()
+        fetcher.fetch_weather("Surat 395003")
+        fetcher.fetch_weather("Surat 395003")
+        assert len(weather_api) == 2
+
+
+@pytest.mark.django_db
+class TestWeatherPrefetch:
+    @pytest.fixture
+    def complaints(self):
+        Complaint.objects.create(content="Pipe", address="Ring Road, Surat 395003", pincode='395003')
+        Complaint.objects.create(content="Light", address="Station Road, Surat 395003", pincode='395003',
+                                 latitude='21.2000', longitude='72.8400')
+        Complaint.objects.create(content="Drain", address="Navrangpura, Ahmedabad 380009", pincode='380009')
+        Complaint.objects.create(content="Done", address="Old City 380001", pincode='380001', status='Completed')
+
+    def test_one_row_per_open_pincode(self, complaints):
+        locations = {row['pincode']: row for row in open_locations()}
+        assert sorted(locations) == ['380009', '395003']
+        assert float(locations['395003']['latitude']) == pytest.approx(21.2)
+
+    def test_prefetch_warms_the_prediction_cache(self, weather_api, complaints):
+        stats = prefetch_open_locations(workers=2)
+        assert (stats.locations, stats.refreshed, stats.failed) == (2, 2, 0)
+        assert sorted(weather_api.queries) == ["21.20,72.84", "Navrangpura, Ahmedabad 380009"]
+
+        WeatherContextFetcher().fetch_weather("Ring Road, Surat 395003")
+        assert len(weather_api) == 2
+
+    def test_command(self, weather_api, complaints):
+        out = io.StringIO()
+        call_command('prefetch_weather', stdout=out)
+        assert "Refreshed weather for 2 of 2 pincodes" in out.getvalue()
@@ -0,0 +1,159 @@
+import io
+import json
+import sys
+import types
+from unittest.mock import Mock
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from complaints.ml import yolo_backends
+from complaints.ml.road_yolo_detector import RoadYOLODetector, warm_up_detector
+from complaints.services.complaint_prediction_service import model_version
+
+
+class FakeYOLO:
+    loaded = []
+
+    def __init__(self, path, task=None):
+        self.path = path
+        self.calls = []
+        FakeYOLO.loaded.append(path)
+
+    def predict(self, frames, **kwargs):
+        self.calls.append(frames)
+        return [Mock(boxes=None) for _ in frames]
+
+    def export(self, format, **kwargs):
+        stem = self.path.rsplit('.', 1)[0]
+        path = f"{stem}.onnx" if format == 'onnx' else f"{stem}_openvino_model"
+        with open(path, 'w') as f:
+            f.write(format)
+        self.exported = (format, kwargs)
+        return path
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch):
+    path = tmp_path / 'best.pt'
+    path.write_bytes(b'weights')
+    monkeypatch.setenv('YOLO_MODEL_PATH', str(path))
+    monkeypatch.delenv('YOLO_BACKEND', raising=False)
+    FakeYOLO.loaded = []
+    monkeypatch.setitem(sys.modules, 'ultralytics', types.SimpleNamespace(YOLO=FakeYOLO))
+    RoadYOLODetector._instance = None
+    RoadYOLODetector._model = None
+    yield path
+    RoadYOLODetector._instance = None
+    RoadYOLODetector._model = None
+
+
+class TestResolve:
+    def test_prefers_onnx_export(self, weights):
+        (weights.parent / 'best.onnx').write_bytes(b'onnx')
+
+        assert yolo_backends.resolve() == ('onnx', str(weights.parent / 'best.onnx'))
+
+    def test_falls_back_to_weights(self, weights):
+        assert yolo_backends.resolve() == ('torch', str(weights))
+
+    def test_named_backend_only(self, weights, monkeypatch):
+        (weights.parent / 'best.onnx').write_bytes(b'onnx')
+        monkeypatch.setenv('YOLO_BACKEND', 'torch')
+
+        assert yolo_backends.resolve() == ('torch', str(weights))
+        assert yolo_backends.resolve('openvino') is None
+
+    def test_nothing_found(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('YOLO_MODEL_PATH', str(tmp_path / 'missing.pt'))
+
+        assert yolo_backends.resolve() is None
+
+    def test_model_version_names_the_backend_in_use(self, weights, settings):
+        settings.PREDICTION_MODEL_VERSION = ''
+        assert model_version().endswith(':best.pt')
+
+        (weights.parent / 'best.onnx').write_bytes(b'onnx')
+        assert model_version().endswith(':best.onnx')
+
+
+class TestDetectorBackend:
+    def test_loads_onnx_when_exported(self, weights):
+        (weights.parent / 'best.onnx').write_bytes(b'onnx')
+
+        detector = RoadYOLODetector()
+
+        assert detector.backend == 'onnx'
+        assert FakeYOLO.loaded == [str(weights.parent / 'best.onnx')]
+
+    def test_warm_up_runs_blank_frame(self, weights):
+        detector = RoadYOLODetector()
+
+        assert warm_up_detector() is True
+        [frames] = detector._model.calls
+        assert frames[0].shape == (640, 640, 3)
+        assert not frames[0].any()
+
+    def test_web_warm_up_leaves_local_model_unloaded(self, weights, settings):
+        settings.MODEL_SERVER_SOCKET = ''
+
+        assert warm_up_detector(load_local=False) is False
+        assert FakeYOLO.loaded == []
+
+    def test_warm_up_without_model(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('YOLO_MODEL_PATH', str(tmp_path / 'missing.pt'))
+        RoadYOLODetector._instance = None
+        RoadYOLODetector._model = None
+
+        assert warm_up_detector() is False
+
+
+class TestExport:
+    def test_onnx_export_command(self, weights):
+        stdout = io.StringIO()
+        call_command('export_yolo', stdout=stdout)
+
+        assert (weights.parent / 'best.onnx').read_text() == 'onnx'
+        assert 'best.onnx' in stdout.getvalue()
+
+    def test_openvino_export(self, weights):
+        path = yolo_backends.export('openvino', int8=True, data='coco8.yaml')
+
+        assert path == str(weights.parent / 'best_openvino_model')
+
+    def test_rejects_torch(self, weights):
+        with pytest.raises(ValueError):
+            yolo_backends.export('torch')
+
+
+class TestBenchmark:
+    def test_reports_percentiles_and_memory(self, weights):
+        result = yolo_backends.benchmark('torch', runs=5, batch=2)
+
+        assert result.backend == 'torch'
+        assert result.runs == 5
+        assert 0 <= result.p50_ms <= result.p95_ms
+        assert result.rss_mb > 0
+
+    def test_missing_backend(self, weights):
+        with pytest.raises(FileNotFoundError):
+            yolo_backends.benchmark('onnx')
+
+    def test_command_json(self, weights):
+        stdout = io.StringIO()
+        call_command('benchmark_yolo', '--runs', '3', '--json', stdout=stdout)
+
+        result = json.loads(stdout.getvalue())
+        assert result['backend'] == 'torch'
+        assert set(result) >= {'load_ms', 'p50_ms', 'p95_ms', 'rss_mb', 'model_rss_mb'}
+
+    def test_command_without_models(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('YOLO_MODEL_PATH', str(tmp_path / 'missing.pt'))
+
+        with pytest.raises(CommandError):
+            call_command('benchmark_yolo', stdout=io.StringIO())
+
+
+def test_rss_is_positive():
+    assert yolo_backends.rss_mb() > 0
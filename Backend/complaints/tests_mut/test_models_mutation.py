@@ -22,6 +22,7 @@ from complaints.models import (
     Complaint, ComplaintImage, Upvote, Fake_Confidence, 
     Resolution, ResolutionImage, validate_image_size
 )
+from complaints.services.address_enrichment_service import enrich_pending
 from notifications.models import Notification
 from .conftest import create_test_image
 
@@ -185,6 +186,8 @@ class TestComplaintModelMutations:
         comp = Complaint(posted_by=poster, content='Test', location_type='gps',
                         latitude=12.9, longitude=77.6)
         comp.save()
+        enrich_pending()
+        comp.refresh_from_db()
         
         assert comp.address == 'Geocoded Address, 560009'
         assert comp.pincode == '560009'
@@ -249,7 +252,7 @@ class TestComplaintModelMutations:
         def mock_get(*args, **kwargs):
             return MockResponse()
         
-        monkeypatch.setattr('complaints.models.requests.get', mock_get)
+        monkeypatch.setattr('complaints.http_client.get', mock_get)
         
         poster = Citizen.objects.create_user(username='c22', password='p', phone_number='9876543235')
         comp = Complaint(posted_by=poster, content='Test', location_type='gps',
@@ -268,7 +271,7 @@ class TestComplaintModelMutations:
             def json(self):
                 return {'responseCode': 404, 'results': []}
         
-        monkeypatch.setattr('complaints.models.requests.get', lambda *a, **k: MockResponse())
+        monkeypatch.setattr('complaints.http_client.get', lambda *a, **k: MockResponse())
         
         poster = Citizen.objects.create_user(username='c23', password='p', phone_number='9876543236')
         comp = Complaint(posted_by=poster, content='Test', location_type='gps',
@@ -286,7 +289,7 @@ class TestComplaintModelMutations:
             def json(self):
                 return {}
         
-        monkeypatch.setattr('complaints.models.requests.get', lambda *a, **k: MockResponse())
+        monkeypatch.setattr('complaints.http_client.get', lambda *a, **k: MockResponse())
         
         poster = Citizen.objects.create_user(username='c24', password='p', phone_number='9876543237')
         comp = Complaint(posted_by=poster, content='Test', location_type='gps',
@@ -312,7 +315,7 @@ class TestComplaintModelMutations:
                     }]
                 }
         
-        monkeypatch.setattr('complaints.models.requests.get', lambda *a, **k: MockResponse())
+        monkeypatch.setattr('complaints.http_client.get', lambda *a, **k: MockResponse())
         
         poster = Citizen.objects.create_user(username='c25', password='p', phone_number='9876543238')
         comp = Complaint(posted_by=poster, content='Test', location_type='gps',
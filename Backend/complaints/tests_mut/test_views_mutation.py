@@ -25,6 +25,7 @@ from complaints.models import (
     Complaint, ComplaintImage, Upvote, Fake_Confidence,
     Resolution, ResolutionImage
 )
+from complaints import http_client
 from notifications.models import Notification
 
 
@@ -289,7 +290,7 @@ class TestReverseGeocodeViewMutations:
                     }]
                 }
         
-        monkeypatch.setattr(requests, 'get', lambda *a, **k: MockResponse())
+        monkeypatch.setattr(http_client, 'get', lambda *a, **k: MockResponse())
         
         response = api_client.post(reverse('complaints:reverse-geocode'),
                                    {'latitude': '12.9', 'longitude': '77.6'})
@@ -310,7 +311,7 @@ class TestReverseGeocodeViewMutations:
             def json(self):
                 return {'responseCode': 404, 'results': []}
         
-        monkeypatch.setattr(requests, 'get', lambda *a, **k: MockResponse())
+        monkeypatch.setattr(http_client, 'get', lambda *a, **k: MockResponse())
         
         response = api_client.post(reverse('complaints:reverse-geocode'),
                                    {'latitude': '0.0', 'longitude': '0.0'})
@@ -326,7 +327,7 @@ class TestReverseGeocodeViewMutations:
         def mock_get(*a, **k):
             raise requests.exceptions.Timeout('Timeout')
         
-        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(http_client, 'get', mock_get)
         
         response = api_client.post(reverse('complaints:reverse-geocode'),
                                    {'latitude': '12.9', 'longitude': '77.6'})
@@ -0,0 +1,180 @@
+"""
+Time-decayed trending index for complaints, kept in a Redis sorted set.
+
+Every upvote contributes ``2 ** ((upvoted_at - epoch) / half_life)`` to its
+complaint's score, so a vote cast one half-life ago is worth half a vote cast
+now. Because all contributions shrink at the same rate, ranking never needs
+"now": an upvote is a single ZADD INCR and the top N is a ZREVRANGE, both
+O(log n). Contributions grow as time moves away from ``epoch``; the periodic
+rebuild (``manage.py rebuild_trending --loop``) recomputes every score against
+a fresh epoch, which keeps the numbers small and repairs any drift from missed
+updates. A read finding the index never built, or its epoch so old that the
+weights approach float overflow, builds it first.
+
+Only complaints that can still trend (pending and not yet assigned to a field
+worker) are members of the set. When Redis is not the configured cache the
+index is unavailable and callers fall back to the database.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+TRENDING_KEY = 'trending:complaints'
+EPOCH_KEY = 'trending:epoch'
+REBUILD_KEY = 'trending:complaints:rebuild'
+DEFAULT_HALF_LIFE_HOURS = 24
+REBUILD_BATCH = 2000
+BUILD_LOCK_KEY = 'trending:build-lock'
+BUILD_LOCK_SECONDS = 300
+# 2 ** 1024 overflows a float; rebuild long before the weights get there
+MAX_EPOCH_HALF_LIVES = 64
+
+
+def half_life_seconds() -> float:
+    hours = float(getattr(settings, 'TRENDING_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS))
+    return hours * 3600
+
+
+def upvote_weight(upvoted_at, epoch: float) -> float:
+    return 2.0 ** ((upvoted_at.timestamp() - epoch) / half_life_seconds())
+
+
+def is_trending_candidate(complaint) -> bool:
+    return complaint.status == 'Pending' and complaint.assigned_to_fieldworker_id is None
+
+
+def _member(complaint_id: int) -> str:
+    # zero-padded so that equal scores tie-break by newest id, as the SQL
+    # ordering ('-upvotes', '-id') does
+    return f"{complaint_id:012d}"
+
+
+def get_redis_client():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return None
+
+
+class TrendingIndex:
+
+    def __init__(self, client):
+        self.client = client
+
+    def epoch(self) -> Optional[float]:
+        raw = self.client.get(EPOCH_KEY)
+        return float(raw) if raw is not None else None
+
+    def _current_epoch(self) -> Optional[float]:
+        """
+        The epoch, after building the index if it has none or it is too old.
+        While another process holds the build lock a stale epoch is still
+        returned, and a missing one stays None.
+        """
+        epoch = self.epoch()
+        if epoch is not None and timezone.now().timestamp() - epoch < MAX_EPOCH_HALF_LIVES * half_life_seconds():
+            return epoch
+        if not self.client.set(BUILD_LOCK_KEY, 1, nx=True, ex=BUILD_LOCK_SECONDS):
+            return epoch
+        try:
+            self.rebuild()
+        finally:
+            self.client.delete(BUILD_LOCK_KEY)
+        return self.epoch()
+
+    def top_ids(self, limit: int) -> Optional[List[int]]:
+        """Highest scoring complaint ids, or None while the index is being built for the first time."""
+        if self._current_epoch() is None:
+            return None
+        members = self.client.zrevrange(TRENDING_KEY, 0, limit - 1)
+        return [int(member) for member in members]
+
+    def record_upvote(self, complaint_id: int, upvoted_at, removed: bool = False, votes: int = 1):
+        epoch = self.epoch()
+        if epoch is None:
+            return
+        weight = upvote_weight(upvoted_at, epoch) * votes
+        # XX: membership already means "can trend", so complaints that were
+        # taken off the set are never brought back by a late vote
+        self.client.zadd(TRENDING_KEY, {_member(complaint_id): -weight if removed else weight}, xx=True, incr=True)
+
+    def refresh(self, complaint):
+        """Re-score one complaint from the database, or drop it if it can no longer trend."""
+        epoch = self.epoch()
+        if epoch is None:
+            return
+        if not is_trending_candidate(complaint):
+            self.client.zrem(TRENDING_KEY, _member(complaint.id))
+            return
+        upvoted = complaint.upvotes.values_list('upvoted_at', flat=True)
+        score = sum(upvote_weight(at, epoch) for at in upvoted)
+        self.client.zadd(TRENDING_KEY, {_member(complaint.id): score})
+
+    def remove(self, complaint_id: int):
+        self.client.zrem(TRENDING_KEY, _member(complaint_id))
+
+    def rebuild(self) -> int:
+        """
+        Recompute every score against a new epoch and swap the result in
+        atomically. Returns the number of complaints indexed.
+        """
+        from complaints.models import Complaint, Upvote
+
+        epoch = timezone.now().timestamp()
+        scores: Dict[int, float] = dict.fromkeys(
+            Complaint.objects.filter(status='Pending', assigned_to_fieldworker__isnull=True)
+            .values_list('id', flat=True)
+            .iterator(chunk_size=REBUILD_BATCH),
+            0.0,
+        )
+        upvotes = Upvote.objects.filter(
+            complaint__status='Pending', complaint__assigned_to_fieldworker__isnull=True,
+        ).values_list('complaint_id', 'upvoted_at')
+        for complaint_id, upvoted_at in upvotes.iterator(chunk_size=REBUILD_BATCH):
+            if complaint_id in scores:
+                scores[complaint_id] += upvote_weight(upvoted_at, epoch)
+
+        self.client.delete(REBUILD_KEY)
+        for batch in _chunks(list(scores.items()), REBUILD_BATCH):
+            self.client.zadd(REBUILD_KEY, {_member(pk): score for pk, score in batch})
+
+        pipe = self.client.pipeline(transaction=True)
+        if scores:
+            pipe.rename(REBUILD_KEY, TRENDING_KEY)
+        else:
+            pipe.delete(TRENDING_KEY)
+        pipe.set(EPOCH_KEY, repr(epoch))
+        pipe.execute()
+        return len(scores)
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_trending_index() -> Optional[TrendingIndex]:
+    client = get_redis_client()
+    return TrendingIndex(client) if client is not None else None
+
+
+def safely(action, *args, **kwargs):
+    """
+    Apply an index update without letting a Redis outage break the request
+    that triggered it; the next rebuild picks up whatever was missed.
+    """
+    index = get_trending_index()
+    if index is None:
+        return None
+    try:
+        return getattr(index, action)(*args, **kwargs)
+    except Exception as exc:
+        logger.warning("Trending index %s failed: %s", action, exc)
+        return None
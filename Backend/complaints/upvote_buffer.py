@@ -0,0 +1,305 @@
+"""
+Write-behind buffering of upvote toggles in Redis.
+
+With ``UPVOTE_BUFFERING`` on, a toggle never touches the database. Each
+complaint's current voters live in a Redis set, seeded from the Upvote table
+the first time the complaint is touched; its size is ``likes_count``. Each
+toggle atomically flips set membership and records the user's new state in a
+per-complaint ``ops`` hash (last state wins, so repeated toggles collapse).
+
+``manage.py flush_upvotes`` drains the hashes into the database in batches.
+A batch is first renamed to an in-flight key and only deleted after its
+transaction commits, so a crashed flusher leaves it to be re-applied on the
+next run. Applying a batch is idempotent: it inserts missing Upvote rows,
+deletes removed ones and recounts ``upvotes_count`` from the table.
+
+Redis must persist (the compose file runs it with appendonly) for buffered
+votes to survive a Redis restart. While buffering is on, upvotes should only
+change through the buffer; a direct write is not reflected in the seeded set.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from complaints import response_cache, trending
+
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'upv:dirty'
+INFLIGHT_KEY = 'upv:inflight'
+FLUSH_LOCK_KEY = 'upv:flush-lock'
+FLUSH_LOCK_SECONDS = 60
+ADDED = '1'
+REMOVED = '0'
+
+
+class BufferUnavailable(Exception):
+    """Raised when buffering is enabled but Redis cannot be reached."""
+
+
+def _members_key(complaint_id) -> str:
+    return f"upv:members:{complaint_id}"
+
+
+def _loaded_key(complaint_id) -> str:
+    return f"upv:loaded:{complaint_id}"
+
+
+def _ops_key(complaint_id) -> str:
+    return f"upv:ops:{complaint_id}"
+
+
+def _flushing_key(complaint_id) -> str:
+    return f"upv:flushing:{complaint_id}"
+
+
+# KEYS: loaded, members   ARGV: user ids that have upvoted in the database
+SEED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    for i = 1, #ARGV, 1000 do
+        redis.call('SADD', KEYS[2], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+    end
+    redis.call('SET', KEYS[1], 1)
+end
+return 1
+"""
+
+# KEYS: members, ops, dirty   ARGV: user id, complaint id
+TOGGLE_SCRIPT = """
+local state
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('SREM', KEYS[1], ARGV[1])
+    state = '0'
+else
+    redis.call('SADD', KEYS[1], ARGV[1])
+    state = '1'
+end
+redis.call('HSET', KEYS[2], ARGV[1], state)
+redis.call('SADD', KEYS[3], ARGV[2])
+return {state, redis.call('SCARD', KEYS[1])}
+"""
+
+# KEYS: ops, flushing, dirty, inflight   ARGV: complaint id
+# An unfinished in-flight batch is returned again instead of claiming newer
+# ops, so batches for one complaint are always applied in order.
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[1])
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    redis.call('SADD', KEYS[4], ARGV[1])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'UPVOTE_BUFFERING', False))
+
+
+def _client():
+    client = trending.get_redis_client()
+    if client is None:
+        raise BufferUnavailable("Upvote buffering needs the default cache to be Redis.")
+    return client
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _ensure_seeded(client, complaint_id: int):
+    if client.exists(_loaded_key(complaint_id)):
+        return
+    from complaints.models import Upvote
+    voters = list(Upvote.objects.filter(complaint_id=complaint_id).values_list('user_id', flat=True))
+    client.eval(SEED_SCRIPT, 2, _loaded_key(complaint_id), _members_key(complaint_id), *voters)
+
+
+def toggle(user, complaint_id: int) -> Tuple[bool, int]:
+    """Buffered equivalent of ``upvotes.toggle_upvote``."""
+    try:
+        client = _client()
+        _ensure_seeded(client, complaint_id)
+        state, likes_count = client.eval(
+            TOGGLE_SCRIPT, 3,
+            _members_key(complaint_id), _ops_key(complaint_id), DIRTY_KEY,
+            user.pk, complaint_id,
+        )
+    except BufferUnavailable:
+        raise
+    except Exception as exc:
+        raise BufferUnavailable(str(exc)) from exc
+    return _decode(state) == ADDED, int(likes_count)
+
+
+def _live_state(ids: List[int], user=None) -> Dict[int, Tuple[int, Optional[bool]]]:
+    """
+    ``{complaint id: (likes_count, is_upvoted)}`` for the complaints in
+    ``ids`` that have buffered state, read in one round trip. ``is_upvoted``
+    is None for anonymous users.
+    """
+    with_user = user is not None and user.is_authenticated
+    client = _client()
+    pipe = client.pipeline(transaction=False)
+    for complaint_id in ids:
+        pipe.exists(_loaded_key(complaint_id))
+        pipe.scard(_members_key(complaint_id))
+        if with_user:
+            pipe.sismember(_members_key(complaint_id), user.pk)
+    results = iter(pipe.execute())
+
+    state = {}
+    for complaint_id in ids:
+        loaded, likes_count = next(results), next(results)
+        upvoted = bool(next(results)) if with_user else None
+        if loaded:
+            state[complaint_id] = (int(likes_count), upvoted)
+    return state
+
+
+def overlay(complaints: Iterable, user=None) -> List:
+    """
+    Replace ``upvotes_count`` and ``is_upvoted`` on complaints that have
+    buffered state with the live values from Redis, in one round trip.
+    """
+    if not is_enabled():
+        return complaints
+    complaints = list(complaints)
+    if not complaints:
+        return complaints
+    try:
+        state = _live_state([complaint.pk for complaint in complaints], user)
+    except Exception as exc:
+        logger.warning("Upvote buffer overlay skipped: %s", exc)
+        return complaints
+
+    for complaint in complaints:
+        if complaint.pk in state:
+            complaint.upvotes_count, upvoted = state[complaint.pk]
+            if upvoted is not None:
+                complaint.is_upvoted = upvoted
+    return complaints
+
+
+def overlay_response(response, user=None):
+    """
+    ``overlay`` for an already serialized complaint list, page or detail
+    response, so payloads served from the response cache (which toggles do
+    not invalidate) still carry the live counts.
+    """
+    if not is_enabled() or response.status_code != 200:
+        return response
+    data = response.data
+    if isinstance(data, dict):
+        rows = data.get('results') if 'results' in data else [data.get('complaint')]
+    else:
+        rows = data
+    rows = [row for row in rows or () if isinstance(row, dict) and 'id' in row]
+    if not rows:
+        return response
+    try:
+        state = _live_state([row['id'] for row in rows], user)
+    except Exception as exc:
+        logger.warning("Upvote buffer overlay skipped: %s", exc)
+        return response
+
+    for row in rows:
+        if row['id'] in state:
+            row['upvotes_count'], upvoted = state[row['id']]
+            if upvoted is not None:
+                row['is_upvoted'] = upvoted
+    return response
+
+
+def _apply(client, complaint_id: int, ops: Dict[int, str]) -> int:
+    """Write one claimed batch; returns the number of Upvote rows inserted."""
+    from complaints.models import Complaint, Upvote
+    from complaints.upvotes import actual_upvote_counts
+    from users.models import ParentUser
+
+    added = [user_id for user_id, state in ops.items() if state == ADDED]
+    removed = [user_id for user_id, state in ops.items() if state == REMOVED]
+
+    with transaction.atomic():
+        department_ids = list(
+            Complaint.objects.filter(pk=complaint_id).values_list('assigned_to_dept_id', flat=True)
+        )
+        if not department_ids:
+            client.delete(_members_key(complaint_id), _loaded_key(complaint_id))
+            return 0
+        new_voters = set(added) - set(
+            Upvote.objects.filter(complaint_id=complaint_id, user_id__in=added).values_list('user_id', flat=True)
+        )
+        # a voter deleted since the toggle would fail the foreign key check at commit
+        existing = set(ParentUser.objects.filter(pk__in=new_voters).values_list('pk', flat=True))
+        if new_voters - existing:
+            client.srem(_members_key(complaint_id), *(new_voters - existing))
+            new_voters &= existing
+        Upvote.objects.bulk_create(
+            [Upvote(complaint_id=complaint_id, user_id=user_id) for user_id in new_voters],
+            ignore_conflicts=True,
+        )
+        if removed:
+            Upvote.objects.filter(complaint_id=complaint_id, user_id__in=removed).delete()
+        # recount rather than add deltas so re-applying a batch is harmless
+        Complaint.objects.filter(pk=complaint_id).update(upvotes_count=actual_upvote_counts())
+
+    # bulk_create skips the model signals, so update their listeners here
+    if new_voters:
+        trending.safely('record_upvote', complaint_id, timezone.now(), votes=len(new_voters))
+    response_cache.bump(complaint_ids=[complaint_id], department_ids=department_ids)
+    return len(new_voters)
+
+
+def _claim(client, complaint_id: int) -> Dict[int, str]:
+    raw = client.eval(
+        CLAIM_SCRIPT, 4,
+        _ops_key(complaint_id), _flushing_key(complaint_id), DIRTY_KEY, INFLIGHT_KEY,
+        complaint_id,
+    )
+    pairs = [_decode(value) for value in raw]
+    return {int(pairs[i]): pairs[i + 1] for i in range(0, len(pairs), 2)}
+
+
+def flush(limit: Optional[int] = None) -> int:
+    """
+    Write buffered toggles to the database. Batches left in flight by a
+    crashed run are applied first; a batch the database rejects is dropped and
+    the complaint's voters are reseeded from the table on its next toggle.
+    Returns the number of complaints flushed.
+    """
+    client = _client()
+    if not client.set(FLUSH_LOCK_KEY, 1, nx=True, ex=FLUSH_LOCK_SECONDS):
+        logger.info("Another upvote flusher is running")
+        return 0
+
+    flushed = 0
+    try:
+        pending = [int(_decode(pk)) for pk in client.smembers(INFLIGHT_KEY)]
+        pending += [int(_decode(pk)) for pk in client.smembers(DIRTY_KEY)]
+        for complaint_id in dict.fromkeys(pending):
+            if limit is not None and flushed >= limit:
+                break
+            ops = _claim(client, complaint_id)
+            if ops:
+                try:
+                    _apply(client, complaint_id, ops)
+                    flushed += 1
+                except IntegrityError as exc:
+                    # retrying would fail the same way and hold up every later batch
+                    logger.error("Dropping buffered upvotes for complaint %s: %s", complaint_id, exc)
+                    client.delete(_members_key(complaint_id), _loaded_key(complaint_id))
+            client.delete(_flushing_key(complaint_id))
+            client.srem(INFLIGHT_KEY, complaint_id)
+            client.expire(FLUSH_LOCK_KEY, FLUSH_LOCK_SECONDS)
+    finally:
+        client.delete(FLUSH_LOCK_KEY)
+    return flushed
@@ -0,0 +1,82 @@
+"""
+Upvote toggling with an atomically maintained ``Complaint.upvotes_count``.
+
+The counter is only ever changed by ``UPDATE ... SET upvotes_count =
+upvotes_count +/- 1``, issued from the Upvote save/delete signals in the same
+transaction as the row change, so concurrent toggles on a busy complaint
+never read-modify-write the complaint. ``manage.py reconcile_upvotes``
+repairs the counter if it ever drifts, e.g. after raw SQL or bulk writes.
+"""
+
+from typing import Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from complaints import response_cache
+from complaints.models import Complaint, Upvote
+
+
+def adjust_upvote_count(complaint_id: int, delta: int):
+    counter = Complaint.objects.filter(pk=complaint_id)
+    if delta < 0:
+        counter = counter.filter(upvotes_count__gte=-delta)
+    counter.update(upvotes_count=F('upvotes_count') + delta)
+
+
+def toggle_upvote(user, complaint: Complaint) -> Tuple[bool, int]:
+    """
+    Add the user's upvote, or remove it if it already exists. Returns
+    ``(upvoted, likes_count)`` as of this transaction.
+    """
+    with transaction.atomic():
+        removed, _ = Upvote.objects.filter(user=user, complaint=complaint).delete()
+        upvoted = not removed
+        if upvoted:
+            try:
+                with transaction.atomic():
+                    Upvote.objects.create(user=user, complaint=complaint)
+            except IntegrityError:
+                # a concurrent request from the same user got there first
+                pass
+
+        likes_count = Complaint.objects.filter(pk=complaint.pk).values_list('upvotes_count', flat=True).get()
+
+    complaint.upvotes_count = likes_count
+    return upvoted, likes_count
+
+
+def actual_upvote_counts():
+    return Coalesce(
+        Subquery(
+            Upvote.objects.filter(complaint=OuterRef('pk'))
+            .order_by()
+            .values('complaint')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def reconcile_upvote_counts(batch_size: int = 1000) -> int:
+    """
+    Rewrite ``upvotes_count`` wherever it disagrees with the Upvote rows.
+    Returns the number of complaints repaired.
+    """
+    repaired = 0
+    drifted = (
+        Complaint.objects
+        .annotate(actual=actual_upvote_counts())
+        .exclude(upvotes_count=F('actual'))
+        .values_list('pk', 'assigned_to_dept_id')
+    )
+    pending = list(drifted.iterator(chunk_size=batch_size))
+    for start in range(0, len(pending), batch_size):
+        batch = dict(pending[start:start + batch_size])
+        # recount inside the UPDATE so toggles made since the scan are kept
+        Complaint.objects.filter(pk__in=batch).update(upvotes_count=actual_upvote_counts())
+        response_cache.bump(complaint_ids=batch.keys(), department_ids=batch.values())
+        repaired += len(batch)
+    return repaired
@@ -3,11 +3,13 @@ from django.urls import path
 from .views import (ComplaintListView,ComplaintCreateView,UpvoteComplaintView,
                     ComplaintDeleteView,ReverseGeocodeView,ComplaintSearchView,
                     PastComplaintsView,GovernmentHomePageView,FieldWorkerHomePageView,
+                    DepartmentComplaintExportView,
                     AssignComplaintView,AvailableFieldWorkersView,ComplaintImageView,
                     FakeConfidenceView,SubmitResolutionView,CitizenResolutionResponseView,
                     AutoApproveResolutionsView,ComplaintResolutionView,TrendingComplaintsView,
-                    TopFieldworkersView,PredictComplaintResolutionView, ApproveDeleteComplaintView)
-from .views import ComplaintDetailView,DepartmentSuggestionView
+                    TopFieldworkersView,PredictComplaintResolutionView, ApproveDeleteComplaintView,
+                    NearbyComplaintsView,ComplaintsInBoundsView)
+from .views import ComplaintDetailView,DepartmentSuggestionView,MLJobStatusView
 
 
 app_name = 'complaints' 
@@ -21,8 +23,11 @@ urlpatterns = [
 
     path('reverse-geocode/',ReverseGeocodeView.as_view(),name='reverse-geocode'),
     path('search/',ComplaintSearchView.as_view(),name='complaint-search'),
+    path('nearby/',NearbyComplaintsView.as_view(),name='complaint-nearby'),
+    path('in-bounds/',ComplaintsInBoundsView.as_view(),name='complaint-in-bounds'),
     path('past/',PastComplaintsView.as_view(),name='past-complaints'),
     path('govhome/',GovernmentHomePageView.as_view(),name='gov-home' ),
+    path('govhome/export/',DepartmentComplaintExportView.as_view(),name='gov-export' ),
     path('fieldhome/',FieldWorkerHomePageView.as_view(),name='fw-home' ),
     path('assign/<int:complaint_id>/',AssignComplaintView.as_view(),name= 'complaint-assign'),
     path('available-workers/',AvailableFieldWorkersView.as_view(), name='available-workers'),
@@ -39,4 +44,5 @@ urlpatterns = [
     path('top-fieldworkers/', TopFieldworkersView.as_view(), name='top-fieldworkers'),
     path('<int:complaint_id>/predict-resolution/', PredictComplaintResolutionView.as_view(), name='predict-resolution'),
     path('department-suggestion/', DepartmentSuggestionView.as_view(), name='department-suggestion'),
+    path('jobs/<uuid:job_id>/', MLJobStatusView.as_view(), name='ml-job-status'),
 ]
\ No newline at end of file
@@ -4,19 +4,25 @@ from rest_framework import status, permissions
 from rest_framework.parsers import MultiPartParser, FormParser
 
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.http import StreamingHttpResponse
 import re, requests, json
-from django.db.models import Q, Count, Exists, OuterRef, Value, BooleanField
+from django.db.models import Q, F, Count, Exists, OuterRef, Value, BooleanField
 
-from complaints.services.department_suggestion_service import DepartmentSuggestionService
+from complaints.services import ml, ml_job_service
 from users.models import Government_Authority, Department,Field_Worker
-from .models import Complaint, ComplaintImage, Upvote, Fake_Confidence,Notification,Resolution
-from .serializers import (ComplaintSerializer, ComplaintCreateSerializer, 
+from .models import Complaint, ComplaintImage, MLJob, Upvote, Fake_Confidence,Notification,Resolution
+from .serializers import (ComplaintSerializer, ComplaintListSerializer, ComplaintSearchResultSerializer,
+                          ComplaintMapSerializer, ComplaintCreateSerializer, 
                           UpvoteSerializer,FieldWorkerSerializer,ComplaintImageSerializer,
                           FakeConfidenceSerializer,
                           ResolutionSerializer,CitizenResolutionResponseSerializer,ResolutionCreateSerializer)
+from .pagination import InvalidCursor, get_page_size, is_paginated_request, paginate_keyset
+from .search import attach_snippets, search_complaints
+from .upvotes import toggle_upvote
+from . import export, gazetteer, geo, geocoding, response_cache, trending, upvote_buffer
 from CPCMS import settings
 from django.utils import timezone
-from datetime import timedelta
 
 
 def auto_approve_due_resolutions():
@@ -51,14 +57,25 @@ def auto_approve_due_resolutions():
         except Exception:
             pass
 
-# Helper to build an optimized annotated queryset for complaints listings
+# Helper to build an optimized annotated queryset for complaints listings.
+# Pair it with ComplaintListSerializer: everything the serializer reads per row
+# is annotated here, so a page costs one query plus the images prefetch.
 def base_complaint_queryset(request):
     user = getattr(request, 'user', None)
     qs = (Complaint.objects
-          .select_related('posted_by', 'assigned_to_dept', 'assigned_to_fieldworker', 'current_resolution')
+          .select_related('assigned_to_dept', 'current_resolution')
           .prefetch_related('images'))
 
-    qs = qs.annotate(computed_upvotes_count=Count('upvotes', distinct=True))
+    # upvotes_count is read straight from the column kept current by
+    # complaints.upvotes; no per-row COUNT over the upvotes table.
+    qs = qs.annotate(
+        # only the usernames are rendered, so skip joining the full user rows
+        poster_username=F('posted_by__username'),
+        fieldworker_username=F('assigned_to_fieldworker__username'),
+        has_pending_resolution=Exists(
+            Resolution.objects.filter(complaint=OuterRef('pk'), status='pending_approval')
+        ),
+    )
 
     if user and getattr(user, 'is_authenticated', False):
         qs = qs.annotate(
@@ -72,6 +89,71 @@ def base_complaint_queryset(request):
     return qs
 
 
+# map user-friendly sort keys → actual DB fields
+COMPLAINT_SORT_FIELDS = {
+    'latest': 'posted_at',                  # default
+    'upvotes': 'upvotes_count',
+    'oldest': 'posted_at',
+}
+
+
+def resolve_complaint_sort(request, sort_fields=COMPLAINT_SORT_FIELDS, default='latest'):
+    """Return the ``(field, descending)`` pair requested via sort_by/order."""
+    sort_by = request.query_params.get('sort_by', default)
+    order = request.query_params.get('order', 'desc')        # asc/desc
+    field = sort_fields.get(sort_by, sort_fields[default])   # fallback
+    return field, order != 'asc'
+
+
+def complaint_list_response(request, qs, sort_fields=COMPLAINT_SORT_FIELDS, default_sort='latest',
+                            serializer_class=ComplaintListSerializer, prepare_rows=None,
+                            live_upvotes=True):
+    """Serialize a complaint listing, keyset-paginated when the client asks for it.
+
+    Requests carrying ``cursor`` or ``page_size`` get a
+    ``{results, next, prev, page_size}`` envelope; everything else keeps the
+    flat list response. ``prepare_rows`` runs on the rows actually being
+    returned, right before serialization. Cached callers pass
+    ``live_upvotes=False`` and overlay buffered upvotes on the cached payload
+    themselves.
+    """
+    field, descending = resolve_complaint_sort(request, sort_fields, default_sort)
+
+    if not is_paginated_request(request):
+        qs = qs.order_by(f'-{field}', '-id') if descending else qs.order_by(field, 'id')
+        rows = prepare_rows(qs) if prepare_rows else qs
+        if live_upvotes:
+            rows = upvote_buffer.overlay(rows, request.user)
+        serializer = serializer_class(rows, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    try:
+        page = paginate_keyset(
+            qs,
+            field,
+            descending=descending,
+            cursor=request.query_params.get('cursor') or None,
+            page_size=get_page_size(request),
+        )
+    except InvalidCursor as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = prepare_rows(page.results) if prepare_rows else page.results
+    if live_upvotes:
+        rows = upvote_buffer.overlay(rows, request.user)
+    serializer = serializer_class(rows, many=True, context={'request': request})
+    return Response({
+        'results': serializer.data,
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+        'page_size': page.page_size,
+    }, status=status.HTTP_200_OK)
+
+
+# extra ids read from the trending index to cover entries that are stale
+TRENDING_SLACK = 10
+
+
 class TrendingComplaintsView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -83,21 +165,44 @@ class TrendingComplaintsView(APIView):
         except ValueError:
             limit = 3
 
-        qs = (
+        response = response_cache.cached_response(
+            request, 'trending', [response_cache.GLOBAL],
+            lambda: self._trending_response(request, limit),
+        )
+        return upvote_buffer.overlay_response(response, request.user)
+
+    def _trending_response(self, request, limit):
+        candidates = (
             base_complaint_queryset(request)
-            .exclude(status='resolved')
             .filter(status='Pending')
             .filter(assigned_to_fieldworker__isnull=True)
-            .order_by('-computed_upvotes_count', '-id')[:limit]
         )
 
-        serializer = ComplaintSerializer(qs, many=True, context={'request': request})
+        # Ranked by the time-decayed index when it is available; otherwise by
+        # raw upvote count straight from the database.
+        ranked_ids = trending.safely('top_ids', limit + TRENDING_SLACK)
+        if ranked_ids is None:
+            qs = candidates.order_by('-upvotes_count', '-id')[:limit]
+        else:
+            # the index can briefly lag a status change, so re-check eligibility
+            by_id = candidates.in_bulk(ranked_ids)
+            qs = [by_id[pk] for pk in ranked_ids if pk in by_id][:limit]
+
+        serializer = ComplaintListSerializer(qs, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class ComplaintListView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request):
+        department_id = request.query_params.get('department')
+        response = response_cache.cached_response(
+            request, 'complaint-list', response_cache.listing_scopes(department_id),
+            lambda: self._list_response(request),
+        )
+        return upvote_buffer.overlay_response(response, request.user)
+
+    def _list_response(self, request):
         qs = base_complaint_queryset(request).exclude(status='resolved')
 
         # filtering
@@ -111,33 +216,7 @@ class ComplaintListView(APIView):
         if pincode:
             qs = qs.filter(pincode=pincode)
 
-       
-        #sorting
-        sort_by = request.query_params.get('sort_by', 'latest')  # default
-        order = request.query_params.get('order', 'desc')        # asc/desc
-
-        # map user-friendly sort keys → actual DB fields
-        sort_fields = {
-            'latest': 'posted_at',                  # default
-            'upvotes': 'computed_upvotes_count',
-            'oldest': 'posted_at',
-        }
-
-        if sort_by in sort_fields:
-            field = sort_fields[sort_by]
-        else:
-            field = 'posted_at'  # fallback
-
-        # ASC/DESC logic
-        if order == 'asc':
-            qs = qs.order_by(field)
-        else:
-            qs = qs.order_by(f'-{field}')
-        
-        # serialize&return
-       
-        serializer = ComplaintSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return complaint_list_response(request, qs, live_upvotes=False)
 
 class ComplaintCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -170,24 +249,25 @@ class UpvoteComplaintView(APIView):
 
     def post(self, request, complaint_id):
         complaint = get_object_or_404(Complaint, id=complaint_id)
-        upvote, created = Upvote.objects.get_or_create(user=request.user, complaint=complaint)
-
-        if not created:
-            # Remove upvote
-            upvote.delete()
-            # Recalculate the count from the database
-            complaint.upvotes_count = complaint.upvotes.count()
-            complaint.save(update_fields=['upvotes_count'])
+        if upvote_buffer.is_enabled():
+            try:
+                upvoted, likes_count = upvote_buffer.toggle(request.user, complaint.id)
+            except upvote_buffer.BufferUnavailable:
+                return Response(
+                    {"error": "Upvoting is temporarily unavailable. Please try again."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+        else:
+            upvoted, likes_count = toggle_upvote(request.user, complaint)
+
+        if not upvoted:
             return Response(
-                {'detail': 'Upvote removed.', 'likes_count': complaint.upvotes_count}, 
+                {'detail': 'Upvote removed.', 'likes_count': likes_count}, 
                 status=status.HTTP_200_OK
             )
         else:
-            # Add upvote
-            complaint.upvotes_count = complaint.upvotes.count()
-            complaint.save(update_fields=['upvotes_count'])
             return Response(
-                {"message": 'Complaint upvoted.', "likes_count": complaint.upvotes_count},
+                {"message": 'Complaint upvoted.', "likes_count": likes_count},
                 status=status.HTTP_200_OK
             )
 
@@ -222,14 +302,6 @@ class ReverseGeocodeView(APIView):
             return False
         return True
 
-    def _build_params(self, latitude, longitude, api_key):
-        return {
-            'lat': float(latitude),
-            'lng': float(longitude),
-            'access_token': api_key,
-            'region': 'IND'
-        }
-
     def _extract_address(self, result):
         address = result.get('formatted_address', '') or ''
         pincode = result.get('pincode', '') or ''
@@ -269,6 +341,15 @@ class ReverseGeocodeView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        place = gazetteer.lookup(latitude, longitude)
+        if place:
+            return Response({'success': True, 'data': place.as_address()})
+        if not geocoding.mapmyindia_fallback_enabled():
+            return Response(
+                {'success': False, 'error': 'No address found for these coordinates'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
         api_key = self._get_api_key()
         print(f"API Key present: {bool(api_key)}")
         if not api_key:
@@ -278,24 +359,13 @@ class ReverseGeocodeView(APIView):
             )
 
         try:
-            url = "https://search.mappls.com/search/address/rev-geocode"
-            params = self._build_params(latitude, longitude, api_key)
-            print(f"Calling MapmyIndia API with params: {params}")
-
-            response = requests.get(url, params=params, timeout=10)
-            print(f"MapmyIndia response status: {response.status_code}")
-            print(f"MapmyIndia response text: {response.text}")
-
-            if response.status_code != 200:
-                return self._handle_api_error(f'MapmyIndia API HTTP error: {response.status_code}')
+            # the user is waiting: one attempt, no retry backoff
+            lookup = geocoding.reverse_geocode(latitude, longitude, api_key, retries=0)
 
-            data = response.json()
-            print(f"MapmyIndia API response data: {data}")
+            if lookup['result'] is None:
+                return self._handle_api_error(f"No results found. Response code: {lookup['responseCode']}", http_status=status.HTTP_404_NOT_FOUND)
 
-            if data.get('responseCode') != 200 or not data.get('results'):
-                return self._handle_api_error(f"No results found. Response code: {data.get('responseCode')}", http_status=status.HTTP_404_NOT_FOUND)
-
-            result = data['results'][0]
+            result = lookup['result']
             print(f"MapmyIndia result: {result}")
 
             address, pincode, city, state, district = self._extract_address(result)
@@ -311,6 +381,8 @@ class ReverseGeocodeView(APIView):
                     'district': district
                 }
             })
+        except geocoding.GeocodeError as e:
+            return self._handle_api_error(str(e))
         except requests.exceptions.Timeout:
             error_msg = 'MapmyIndia API request timeout'
             print(f"Error: {error_msg}")
@@ -333,14 +405,109 @@ class ComplaintSearchView(APIView):
         query = (request.query_params.get('q') or '').strip()
         complaints = base_complaint_queryset(request)
 
-        if query:
-            complaints = complaints.filter(
-                Q(content__icontains=query) | Q(address__icontains=query)
+        if not query:
+            return complaint_list_response(request, complaints)
+
+        # full-text match over content, address and pincode; ranked by
+        # relevance plus recency unless another sort_by is requested
+        complaints = search_complaints(complaints, query)
+        return complaint_list_response(
+            request,
+            complaints,
+            sort_fields={**COMPLAINT_SORT_FIELDS, 'relevance': 'search_score'},
+            default_sort='relevance',
+            serializer_class=ComplaintSearchResultSerializer,
+            prepare_rows=lambda rows: attach_snippets(rows, query),
+        )
+
+# Columns needed to render map markers
+MAP_FIELDS = ('id', 'content', 'latitude', 'longitude', 'pincode', 'status', 'upvotes_count', 'posted_at')
+MAP_DEFAULT_LIMIT = 200
+MAP_MAX_LIMIT = 1000
+NEARBY_DEFAULT_RADIUS_KM = 2.0
+NEARBY_MAX_RADIUS_KM = 25.0
+
+
+def _map_limit(request):
+    try:
+        limit = int(request.query_params.get('limit', MAP_DEFAULT_LIMIT))
+    except ValueError:
+        limit = MAP_DEFAULT_LIMIT
+    if limit < 1:
+        limit = MAP_DEFAULT_LIMIT
+    return min(limit, MAP_MAX_LIMIT)
+
+
+def map_complaint_queryset():
+    return Complaint.objects.exclude(status='resolved').only(*MAP_FIELDS)
+
+
+class NearbyComplaintsView(APIView):
+    """Complaints within ``radius_km`` of ``lat``/``lng``, nearest first."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        latitude = geo.parse_coordinate(request.query_params.get('lat'), -90, 90)
+        longitude = geo.parse_coordinate(request.query_params.get('lng'), -180, 180)
+        if latitude is None or longitude is None:
+            return Response(
+                {"error": "Valid lat and lng query parameters are required."},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer = ComplaintSerializer(complaints, many=True, context={'request': request})
+        radius_km = geo.parse_coordinate(
+            request.query_params.get('radius_km', NEARBY_DEFAULT_RADIUS_KM), 0, NEARBY_MAX_RADIUS_KM
+        )
+        if not radius_km:
+            return Response(
+                {"error": f"radius_km must be greater than 0 and at most {NEARBY_MAX_RADIUS_KM}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # geohash prefix pruning and the bounding box run in SQL; the exact
+        # haversine check only sees the complaints inside the box
+        min_lat, min_lng, max_lat, max_lng = geo.radius_bounds(latitude, longitude, radius_km)
+        candidates = map_complaint_queryset().filter(
+            geo.within_bounds_filter(min_lat, min_lng, max_lat, max_lng)
+        )
+        nearby = geo.sort_by_distance(candidates, latitude, longitude, radius_km)[:_map_limit(request)]
+
+        serializer = ComplaintMapSerializer(nearby, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+
+class ComplaintsInBoundsView(APIView):
+    """Complaints inside the map viewport given by min/max lat and lng."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        min_lat = geo.parse_coordinate(params.get('min_lat'), -90, 90)
+        max_lat = geo.parse_coordinate(params.get('max_lat'), -90, 90)
+        min_lng = geo.parse_coordinate(params.get('min_lng'), -180, 180)
+        max_lng = geo.parse_coordinate(params.get('max_lng'), -180, 180)
+
+        if None in (min_lat, max_lat, min_lng, max_lng):
+            return Response(
+                {"error": "Valid min_lat, min_lng, max_lat and max_lng query parameters are required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if min_lat > max_lat or min_lng > max_lng:
+            return Response(
+                {"error": "Minimum bounds must not exceed maximum bounds."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        complaints = (
+            map_complaint_queryset()
+            .filter(geo.within_bounds_filter(min_lat, min_lng, max_lat, max_lng))
+            .order_by('-upvotes_count', '-id')[:_map_limit(request)]
+        )
+
+        serializer = ComplaintMapSerializer(complaints, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class PastComplaintsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -391,8 +558,7 @@ class GovernmentHomePageView(APIView):
                 assigned_to_dept=user_department
             )
             
-            serializer = ComplaintSerializer(complaints, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return complaint_list_response(request, complaints)
             
         except Government_Authority.DoesNotExist:
             return Response(
@@ -400,6 +566,53 @@ class GovernmentHomePageView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+class DepartmentComplaintExportView(APIView):
+    """Stream the authority's department complaints as NDJSON (default) or CSV.
+
+    Query params: ``output`` (ndjson|csv), ``status`` (comma separated),
+    ``from``/``to`` (inclusive YYYY-MM-DD dates on posted_at) and ``pincode``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            gov_user = Government_Authority.objects.get(id=request.user.id)
+        except Government_Authority.DoesNotExist:
+            return Response(
+                {"error": "User is not a government authority."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        department = gov_user.assigned_department
+        if not department:
+            return Response(
+                {"error": "No department assigned to this user."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        output = request.query_params.get('output', 'ndjson').lower()
+        if output not in export.FORMATS:
+            return Response(
+                {"error": f"Unsupported output '{output}'. Use one of: {', '.join(export.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            qs = export.filter_export_queryset(
+                Complaint.objects.filter(assigned_to_dept=department), request.query_params
+            )
+        except export.ExportFilterError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export.STREAMERS[output](export.export_rows(qs)),
+            content_type=export.FORMATS[output],
+        )
+        filename = f"complaints-dept{department.id}-{timezone.now():%Y%m%d}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class FieldWorkerHomePageView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -417,8 +630,7 @@ class FieldWorkerHomePageView(APIView):
                     {"message": "No pending complaints assigned to you."},
                     status=status.HTTP_200_OK
                 )
-            serializer = ComplaintSerializer(complaints, many=True, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return complaint_list_response(request, complaints)
             
         except Field_Worker.DoesNotExist:
             return Response(
@@ -567,6 +779,13 @@ class ComplaintDetailView(APIView):
             # Non-fatal; we still return complaint data even if auto-approve fails
             pass
 
+        response = response_cache.cached_response(
+            request, 'complaint-detail', [response_cache.complaint_scope(complaint_id)],
+            lambda: self._detail_response(request, complaint_id),
+        )
+        return upvote_buffer.overlay_response(response, request.user)
+
+    def _detail_response(self, request, complaint_id):
         complaint = get_object_or_404(Complaint, id=complaint_id)
 
         # Basic serialized complaint (includes images, upvotes_count, fake_confidence, resolutions)
@@ -949,6 +1168,13 @@ class TopFieldworkersView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
+        department_id = request.query_params.get('department')
+        return response_cache.cached_response(
+            request, 'top-fieldworkers', response_cache.listing_scopes(department_id),
+            lambda: self._ranking_response(request),
+        )
+
+    def _ranking_response(self, request):
         # Get department filter from query params
         department_id = request.query_params.get('department')
         
@@ -984,6 +1210,36 @@ class TopFieldworkersView(APIView):
 
         return Response(data, status=status.HTTP_200_OK)
 
+def wants_async(request) -> bool:
+    """Clients opt in to the job API with `Prefer: respond-async` (RFC 7240)."""
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return True
+    return bool(getattr(settings, 'ML_JOBS_ASYNC_BY_DEFAULT', False))
+
+
+def job_accepted(request, job):
+    status_url = request.build_absolute_uri(reverse('complaints:ml-job-status', args=[job.id]))
+    data = ml_job_service.job_status(job)
+    data['status_url'] = status_url
+    return Response(
+        data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': status_url, 'Preference-Applied': 'respond-async'},
+    )
+
+
+class MLJobStatusView(APIView):
+    # Progress and result of a queued prediction or department suggestion
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(MLJob, id=job_id)
+        if not ml_job_service.can_view(job, request.user):
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ml_job_service.job_status(job), status=status.HTTP_200_OK)
+
+
 class DepartmentSuggestionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -997,7 +1253,11 @@ class DepartmentSuggestionView(APIView):
             )
 
         description = request.data.get('description', '')
-        service = DepartmentSuggestionService()
+        if wants_async(request):
+            job = ml_job_service.enqueue_department_suggestion(image_file, description, request.user)
+            return job_accepted(request, job)
+
+        service = ml.department_suggestion_service()
         suggestion = service.suggest(image_file=image_file, description=description)
         return Response({"suggestion": suggestion}, status=status.HTTP_200_OK)
 
@@ -1007,59 +1267,45 @@ class PredictComplaintResolutionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, complaint_id):
-        from complaints.services.complaint_prediction_service import ComplaintPredictionService
+        from complaints.single_flight import InFlight
+
+        ComplaintPredictionService = ml.prediction_service()
         
         try:
             complaint = get_object_or_404(Complaint, id=complaint_id)
             
-            
-            images = ComplaintImage.objects.filter(complaint=complaint)
-            if not images.exists():
+            first_image = ComplaintImage.objects.filter(complaint=complaint).first()
+            if first_image is None:
                 return Response(
                     {"error": "Complaint must have at least one image for ML prediction"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-           
-            first_image = images.first()
-            image_url = first_image.image.url  # Cloudinary URL
-            
+            force = str(request.data.get('force', request.query_params.get('force', ''))).lower() in ('1', 'true', 'yes')
+            if wants_async(request):
+                job = ml_job_service.enqueue_prediction(complaint, request.user, force=force)
+                return job_accepted(request, job)
             
-            category = str(complaint.assigned_to_dept)
-            description = complaint.content or ""
-            address = complaint.address or "Unknown location"
+            image_url = first_image.image.url  # Cloudinary URL
+            image_urls = [image.image.url for image in ComplaintImage.objects.filter(complaint=complaint)]
             
-            # Run the ML prediction pipeline
-            severity_analysis, time_prediction, metadata = ComplaintPredictionService.predict_resolution(
-                complaint_id=complaint.id,
-                category=category,
-                description=description,
-                address=address,
-                image_url=image_url
-            )
-            # Try to get estimated days, or calculate from hours
-            estimated_days = time_prediction.get('estimated_days')
+            # Reuse the stored prediction unless the inputs changed or a refresh was asked for
+            try:
+                prediction, created = ComplaintPredictionService.predict_for_complaint(
+                    complaint, image_url, force=force, image_urls=image_urls
+                )
+            except InFlight:
+                return Response(
+                    {"error": "A prediction for this complaint is still running. Try again shortly."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '10'}
+                )
+            severity_analysis = prediction.severity_analysis
+            time_prediction = prediction.time_prediction
+            metadata = prediction.metadata
             
-            if not estimated_days:
-                estimated_hours = time_prediction.get('estimated_hours')
-                if estimated_hours:
-                    try:
-                        estimated_days = float(estimated_hours) / 24.0
-                    except (ValueError, TypeError):
-                        pass
-
-            if estimated_days:
-                try:
-                    # Ensure we have a float
-                    days_val = float(estimated_days)
-                    # Minimum 1 day if prediction is very short but positive
-                    if days_val < 1 and days_val > 0:
-                        days_val = 1
-                        
-                    complaint.resolution_deadline = timezone.now() + timedelta(days=days_val)
-                    complaint.save()
-                except (ValueError, TypeError):
-                    pass
+            if created:
+                ComplaintPredictionService.apply_resolution_deadline(complaint, time_prediction)
 
             # Serialize the updated complaint to return full data
             serializer = ComplaintSerializer(complaint, context={'request': request})
@@ -1073,6 +1319,8 @@ class PredictComplaintResolutionView(APIView):
                     "severity_analysis": severity_analysis,
                     "time_prediction": time_prediction,
                     "metadata": metadata,
+                    "cached": not created,
+                    "predicted_at": prediction.updated_at,
                     # "resolution_deadline": complaint.resolution_deadline, # Commented out to stop frontend loop
                     "complaint": serializer.data
                 },
@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for the web service; command line options override them.
+
+The app is loaded in the master before forking (``preload_app``), with
+ML_PRELOAD importing the ML modules there too, so workers start without
+importing anything and share those pages copy-on-write. Set ML_PRELOAD=False
+to load the app in each worker instead.
+"""
+
+import os
+
+os.environ.setdefault('ML_PRELOAD', 'True')
+
+preload_app = os.environ['ML_PRELOAD'].lower() == 'true'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+timeout = 120
+
+
+def post_worker_init(worker):
+    # Pings the model server; an in-process model (YOLO_WARMUP_WEB) is loaded
+    # after the fork, since torch's thread pools do not survive it
+    from django.conf import settings
+
+    if preload_app and settings.YOLO_WARMUP:
+        from complaints.ml.road_yolo_detector import warm_up_detector
+
+        warm_up_detector(load_local=settings.YOLO_WARMUP_WEB)